@@ -1,8 +1,13 @@
-from typing import Optional
+from typing import Optional, Union
 
 from app.ai.llm import _llm_service
+from app.ai.prompt_assembly import render_profile
 from app.schemas.classification_schema import MemoryClassificationSchema
 
+# Langfuse prompt names (also preloaded at startup)
+CLASSIFIER_PROMPT = "MemoryFactClassifier"
+CHAT_PROMPT = "neura_qa_v1"
+
 
 def classify_fact_structured(user_message: str, user_facts: str) -> MemoryClassificationSchema:
     """
@@ -16,7 +21,7 @@ def classify_fact_structured(user_message: str, user_facts: str) -> MemoryClassi
         MemoryClassificationSchema with category, key, value, and storage decision.
     """
     return _llm_service.invoke(
-        prompt_name="MemoryFactClassifier",
+        prompt_name=CLASSIFIER_PROMPT,
         user_content=f"User statement: {user_message} , User old facts: {user_facts}",
         trace_name="fact_classifier",
         structured_output=MemoryClassificationSchema,
@@ -25,7 +30,7 @@ def classify_fact_structured(user_message: str, user_facts: str) -> MemoryClassi
 
 def ai_response(
     user_message: str,
-    user_facts: str,
+    user_facts: Union[dict, str],
     context: Optional[str] = None,
     conversation_id: Optional[str] = None,
 ) -> str:
@@ -34,21 +39,30 @@ def ai_response(
 
     Args:
         user_message: The user's message.
-        user_facts: Structured profile information about the user.
+        user_facts: The user's profile (rendered into the system prompt).
         context: Optional semantic context from memory retrieval.
         conversation_id: Optional ID for short-term conversation memory.
 
     Returns:
         AI response as a string.
     """
-    user_content = (
-        f"Context:\n{context}\n\nMessage:\n{user_message}\n\nInformation about user:\n{user_facts}"
-    )
-
     return _llm_service.invoke(
-        prompt_name="neura_qa_v1",
-        user_content=user_content,
+        prompt_name=CHAT_PROMPT,
+        user_content=chat_user_content(user_message, context),
         trace_name="qa_session",
         conversation_id=conversation_id,
         use_short_term_memory=True,
+        profile=render_profile(user_facts),
     )
+
+
+def chat_user_content(user_message: str, context: Optional[str] = None) -> str:
+    """
+    The user turn sent to the chat model: retrieved context, then the message.
+
+    Only per-turn content belongs here; the profile goes into the system
+    prompt so it stays part of the cacheable prefix.
+    """
+    if not context:
+        return f"Message:\n{user_message}"
+    return f"Context:\n{context}\n\nMessage:\n{user_message}"
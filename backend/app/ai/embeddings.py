@@ -0,0 +1,146 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+class EmbeddingBackend(ABC):
+    """Turns texts into embedding vectors for a given model."""
+
+    name = "base"
+
+    @abstractmethod
+    def embed(self, texts: List[str], model: str) -> List[List[float]]: ...
+
+
+class RemoteEmbeddingBackend(EmbeddingBackend):
+    """Embeddings from the HuggingFace Inference API (one HTTP call per batch)."""
+
+    name = "remote"
+
+    def __init__(self, hf_token: Optional[str] = None):
+        self.hf_token = hf_token
+
+    def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+        client = HuggingFaceEndpointEmbeddings(
+            model=model,
+            task="feature-extraction",
+            huggingfacehub_api_token=self.hf_token,
+        )
+        if len(texts) == 1:
+            return [client.embed_query(texts[0])]
+        return client.embed_documents(texts)
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    In-process CPU embeddings with ONNX Runtime.
+
+    Runs the ONNX export published with sentence-transformers models (optionally
+    int8-quantized) and applies the same mean pooling + L2 normalization as the
+    sentence-transformers pipeline, so vectors are compatible with the ones
+    produced by the remote endpoint. Large batches are split across a thread
+    pool sized to the machine's cores.
+
+    Requires `onnxruntime` (not installed by default).
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        onnx_file: Optional[str] = None,
+        max_length: int = 384,
+        workers: Optional[int] = None,
+        hf_token: Optional[str] = None,
+    ):
+        self.onnx_file = onnx_file or os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+        self.max_length = max_length
+        self.workers = workers or int(os.getenv("EMBEDDING_WORKERS", "0")) or os.cpu_count() or 1
+        self.hf_token = hf_token
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._models: Dict[str, tuple] = {}
+        # Concurrent first calls would otherwise each download and open the model
+        self._load_lock = threading.Lock()
+
+    def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        if not texts:
+            return []
+        session, tokenizer = self._load(model)
+
+        # One chunk per worker; ONNX Runtime releases the GIL while running
+        chunk_size = max(1, -(-len(texts) // self.workers))
+        chunks = [texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        if len(chunks) == 1:
+            return self._embed_chunk(session, tokenizer, chunks[0])
+
+        results = self.executor.map(lambda c: self._embed_chunk(session, tokenizer, c), chunks)
+        return [vector for chunk in results for vector in chunk]
+
+    def _embed_chunk(self, session, tokenizer, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        encodings = tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        input_names = {i.name for i in session.get_inputs()}
+        if "token_type_ids" in input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        feeds = {k: v for k, v in feeds.items() if k in input_names}
+        token_embeddings = session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def _load(self, model: str) -> tuple:
+        """Download (once) and open the ONNX session and tokenizer for a model."""
+        loaded = self._models.get(model)
+        if loaded is not None:
+            return loaded
+        with self._load_lock:
+            if model not in self._models:
+                self._models[model] = self._open(model)
+            return self._models[model]
+
+    def _open(self, model: str) -> tuple:
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=local requires onnxruntime: pip install onnxruntime"
+            ) from e
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        model_path = hf_hub_download(model, self.onnx_file, token=self.hf_token)
+        tokenizer_path = hf_hub_download(model, "tokenizer.json", token=self.hf_token)
+
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        tokenizer.enable_truncation(max_length=self.max_length)
+        tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+        print(f"[EMBEDDING] Loaded local ONNX model {model} ({self.onnx_file})")
+        return session, tokenizer
+
+
+def create_embedding_backend(hf_token: Optional[str] = None) -> EmbeddingBackend:
+    """Pick the embedding backend from EMBEDDING_BACKEND (remote | local)."""
+    backend = os.getenv("EMBEDDING_BACKEND", "remote").lower()
+    if backend == "local":
+        return LocalEmbeddingBackend(hf_token=hf_token)
+    return RemoteEmbeddingBackend(hf_token=hf_token)
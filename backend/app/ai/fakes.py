@@ -0,0 +1,140 @@
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.ai.embeddings import EmbeddingBackend
+from app.core.traffic import current_replay
+
+
+class FakeChatEndpoint(BaseChatModel):
+    """
+    Stand-in for a HuggingFace chat endpoint with injectable latency and errors.
+
+    Plug it into LLMService through `model_factory` to exercise deadlines,
+    hedging, circuit breakers and fallbacks without network access:
+
+        LLMService(model_factory=lambda repo_id: FakeChatEndpoint(latency=2.0))
+
+    `respond` computes the reply from the messages instead of cycling through
+    `responses`. Replies carry word-count token usage so usage accounting
+    can be exercised too.
+    """
+
+    responses: List[str] = ["This is a fake response."]
+    respond: Optional[Callable[[List[BaseMessage]], str]] = None
+    latency: float = 0.0  # Seconds added to every call
+    jitter: float = 0.0  # Extra random latency in [0, jitter)
+    slow_rate: float = 0.0  # Probability of a call taking `slow_latency` instead
+    slow_latency: float = 10.0
+    error_rate: float = 0.0  # Probability of a call raising
+    fail_first: int = 0  # The first N calls always raise
+    seed: Optional[int] = None
+    calls: int = 0
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-endpoint"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self._lock:
+            call_number = self.calls
+            self.calls += 1
+            slow = self._rng.random() < self.slow_rate
+            fail = call_number < self.fail_first or self._rng.random() < self.error_rate
+            delay = (self.slow_latency if slow else self.latency) + self._rng.random() * self.jitter
+            content = self.responses[call_number % len(self.responses)]
+
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"Injected failure on call {call_number}")
+        if self.respond is not None:
+            content = self.respond(messages)
+
+        input_tokens = sum(len(str(m.content).split()) for m in messages)
+        output_tokens = len(content.split())
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayChatEndpoint(BaseChatModel):
+    """
+    Stand-in for a chat or classification endpoint that answers with the
+    responses and timings of a captured flow (see app.core.traffic and
+    app.cli.replay). Outside a replayed flow, or once the flow has no
+    recorded answer left, it returns `fallback` at once.
+    """
+
+    model_id: str
+    stage: str = "chat"  # "chat" or "classification", as recorded by LLMService
+    fallback: str = "No recorded response."
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat-endpoint"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        flow = current_replay()
+        event = flow.take(self.stage, self.model_id) if flow else None
+        if event is None:
+            message = AIMessage(content=self.fallback)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        output = event["response"]["output"]
+        content = output if isinstance(output, str) else json.dumps(output)
+        usage = event["response"].get("usage") or {}
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": usage.get("input", 0),
+                "output_tokens": usage.get("output", 0),
+                "total_tokens": usage.get("input", 0) + usage.get("output", 0),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayEmbeddingBackend(EmbeddingBackend):
+    """Embeddings with the recorded timing and size of a captured flow (pseudo-random vectors)."""
+
+    name = "replay"
+
+    def __init__(self, dimensions: int = 768):
+        self.dimensions = dimensions
+
+    def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        flow = current_replay()
+        event = flow.take("embedding", model) if flow else None
+        dimensions = self.dimensions
+        if event is not None:
+            dimensions = (event["response"]["output"] or {}).get("dimensions") or dimensions
+        rng = random.Random("\n".join(texts))
+        return [[rng.gauss(0.0, 0.05) for _ in range(dimensions)] for _ in texts]
@@ -1,17 +1,25 @@
+import asyncio
+import hashlib
 import os
 import json
-from typing import Optional, List
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, List
 
 from pydantic import BaseModel
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain.agents import create_agent
-from langchain_huggingface import (
-    HuggingFaceEndpoint,
-    ChatHuggingFace,
-    HuggingFaceEndpointEmbeddings,
-)
 
+# langchain, langgraph and langchain_huggingface are imported on first use (or during
+# warm-up) so importing the app stays fast and never needs model credentials
+from app.ai.embeddings import create_embedding_backend
+from app.ai.prompt_assembly import ChatPrompt, assemble_chat_prompt, prefix_cache_stats
+from app.ai.resilience import ResilientInvoker, model_chain
+from app.core.cache import get_cache
+from app.core.singleflight import SingleFlight
+from app.core.traffic import traffic_recorder
+from app.core.usage import usage_aggregator
 from app.intergrations.langfuse import LangfuseConfig
+from app.intergrations.tracing import tracer
 
 
 class LLMService:
@@ -22,30 +30,103 @@ class LLMService:
     Models used:
         - Chat: DeepSeek-V3 (via HuggingFace Inference API)
         - Classification: Qwen2.5-72B-Instruct (via HuggingFace Inference API)
-        - Embeddings: all-mpnet-base-v2 (via HuggingFace Endpoint)
+        - Embeddings: all-mpnet-base-v2 (via HuggingFace Endpoint, or local ONNX on CPU)
+
+    Chat and classification calls go through a ResilientInvoker: per-model
+    deadline, circuit breaker and a fallback chain (CHAT_FALLBACK_MODELS /
+    CLASSIFICATION_FALLBACK_MODELS). Chat falls back on errors only, since a
+    timed-out agent run keeps writing to its thread. Stateless classification
+    calls are also hedged once they run past the model's p95 latency.
     """
 
     # Model identifiers
     CHAT_MODEL = "deepseek-ai/DeepSeek-V3"
     CLASSIFICATION_MODEL = "Qwen/Qwen2.5-72B-Instruct"
-    EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
 
     def __init__(
         self,
         model_name: str = CHAT_MODEL,
         temperature: float = 0.4,
+        model_factory: Optional[Callable[[str], Any]] = None,
     ):
         self.model_name = model_name
         self.temperature = temperature
+        # Override model creation (e.g. with app.ai.fakes.FakeChatEndpoint in tests)
+        self.model_factory = model_factory
         self.api_key = os.getenv("GEMINI_API_KEY")
         self.hf_token = os.getenv("HUGGINGFACE_API_KEY")
-        self.memory_saver = InMemorySaver()
+        self._memory_saver = None
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.embedding_backend = create_embedding_backend(self.hf_token)
+        # Concurrent requests embedding the same text share one call
+        self._embedding_flight = SingleFlight("embedding")
+        # Embeddings are deterministic per (model, text), so every worker can reuse them
+        self._embedding_cache = get_cache(
+            "embedding",
+            max_items=4096,
+            shared_ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+        )
+
+        # Deleting a conversation drops its checkpointer thread on every worker
+        self._thread_channel = get_cache(
+            "chat_threads", max_items=1, on_invalidate=self._drop_thread
+        )
+
+        self.chat_models = model_chain(self.model_name, "CHAT_FALLBACK_MODELS")
+        self.classification_models = model_chain(
+            self.CLASSIFICATION_MODEL, "CLASSIFICATION_FALLBACK_MODELS"
+        )
+        # Chat is neither hedged nor retried on another model after a timeout:
+        # duplicate agent runs would both write a turn to the checkpointer thread
+        self.chat_invoker = ResilientInvoker(
+            "chat",
+            deadline=float(os.getenv("CHAT_DEADLINE_SECONDS", "60")),
+            fallback_after_timeout=False,
+        )
+        self.classification_invoker = ResilientInvoker(
+            "classification",
+            deadline=float(os.getenv("CLASSIFICATION_DEADLINE_SECONDS", "30")),
+            hedge=os.getenv("CLASSIFICATION_HEDGING", "true").lower() == "true",
+        )
+
+    @property
+    def memory_saver(self):
+        """LangGraph short-term memory, shared by every chat thread."""
+        if self._memory_saver is None:
+            from langgraph.checkpoint.memory import InMemorySaver
+
+            with self._lock:
+                if self._memory_saver is None:
+                    self._memory_saver = InMemorySaver()
+        return self._memory_saver
+
+    def forget_thread(self, conversation_id: str) -> None:
+        """Drop a conversation's short-term memory here and on every other worker."""
+        self._thread_channel.invalidate(conversation_id)
+
+    def _drop_thread(self, conversation_id: str) -> None:
+        if self._memory_saver is not None:
+            self._memory_saver.delete_thread(conversation_id)
 
     # ── Model Factories ──────────────────────────────────────────────
 
-    def _create_huggingface_model(self, repo_id: Optional[str] = None) -> ChatHuggingFace:
-        """Create a HuggingFace Chat model using the Inference API."""
+    def _create_huggingface_model(self, repo_id: Optional[str] = None):
+        """Get the HuggingFace Chat model for a repo (created once, then reused)."""
         model_id = repo_id or self.model_name
+        model = self._models.get(model_id)
+        if model is None:
+            model = self._build_model(model_id)
+            with self._lock:
+                model = self._models.setdefault(model_id, model)
+        return model
+
+    def _build_model(self, model_id: str):
+        if self.model_factory:
+            return self.model_factory(model_id)
+        from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
         llm = HuggingFaceEndpoint(
             repo_id=model_id,
             huggingfacehub_api_token=self.hf_token,
@@ -55,6 +136,14 @@ class LLMService:
         )
         return ChatHuggingFace(llm=llm)
 
+    def warm_up(self) -> None:
+        """Import the agent stack and create the clients of every chat/classification model."""
+        from langchain.agents import create_agent  # noqa: F401
+
+        _ = self.memory_saver
+        for model_id in [*self.chat_models, *self.classification_models]:
+            self._create_huggingface_model(model_id)
+
     # ── Core Invoke ──────────────────────────────────────────────────
 
     def invoke(
@@ -65,6 +154,7 @@ class LLMService:
         structured_output: Optional[BaseModel] = None,
         conversation_id: Optional[str] = None,
         use_short_term_memory: Optional[bool] = False,
+        profile: Optional[str] = None,
     ) -> str:
         """
         Invoke the appropriate HuggingFace model.
@@ -72,37 +162,108 @@ class LLMService:
         For classification (structured_output is set):
             Uses Qwen to extract JSON matching the Pydantic schema.
         For chat (default):
-            Uses DeepSeek-V3 with LangGraph agent and short-term memory.
+            Uses DeepSeek-V3 with LangGraph agent and short-term memory. The
+            prompt and the rendered `profile` form the system message, ahead
+            of the history and of `user_content` (see app.ai.prompt_assembly).
         """
         langfuse_config = LangfuseConfig()
         prompt_template = langfuse_config.get_prompt(prompt_name).prompt[0]["content"]
 
         # ── Classification Path ──────────────────────────────────────
         if structured_output:
-            return self._invoke_classification(prompt_template, user_content, structured_output)
+            return self._invoke_classification(
+                prompt_template, user_content, structured_output, trace_name
+            )
 
         # ── Chat Path ────────────────────────────────────────────────
-        return self._invoke_chat(
-            prompt_template, user_content, trace_name, conversation_id, langfuse_config
-        )
+        prompt = self._chat_prompt(prompt_template, profile, user_content, conversation_id)
+        return self._invoke_chat(prompt, trace_name, conversation_id)
+
+    def stream(
+        self,
+        prompt_name: str,
+        user_content: str,
+        trace_name: str,
+        conversation_id: Optional[str] = None,
+        profile: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Chat like `invoke`, yielding the answer as text chunks while it is generated.
+
+        The agent writes the finished turn to the checkpointer as usual, so
+        streamed and non-streamed turns share one conversation history.
+        """
+        from langchain.agents import create_agent
+        from langchain_core.messages import AIMessageChunk
+
+        prompt_template = LangfuseConfig().get_prompt(prompt_name).prompt[0]["content"]
+        prompt = self._chat_prompt(prompt_template, profile, user_content, conversation_id)
+
+        def run_agent(model_id: str, callbacks: list):
+            agent = create_agent(
+                model=self._create_huggingface_model(model_id),
+                system_prompt=prompt.system,
+                checkpointer=self.memory_saver,
+            )
+            for chunk, _ in agent.stream(
+                {"messages": [{"role": "user", "content": prompt.turn}]},
+                config={
+                    "callbacks": callbacks,
+                    "run_name": trace_name,
+                    "configurable": {"thread_id": conversation_id},
+                },
+                stream_mode="messages",
+            ):
+                if isinstance(chunk, AIMessageChunk):
+                    yield chunk
+
+        with self._observe(
+            "chat",
+            trace_name,
+            model=self.chat_models[0],
+            input=prompt.turn,
+            session_id=conversation_id,
+            metadata=self._prompt_metadata(prompt),
+        ) as span:
+            callbacks = tracer.langchain_callbacks(span)
+            parts, usage = [], None
+            for chunk in self.chat_invoker.stream(
+                lambda model_id: run_agent(model_id, callbacks), self.chat_models
+            ):
+                usage = self._usage(chunk) or usage
+                if isinstance(chunk.content, str) and chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+            span.output = "".join(parts)
+            span.usage = usage
+            prefix_cache_stats.record_usage(usage)
 
     # ── Private Helpers ──────────────────────────────────────────────
 
-    def _invoke_classification(self, prompt_template: str, user_content: str, structured_output):
+    def _invoke_classification(
+        self, prompt_template: str, user_content: str, structured_output, trace_name: str
+    ):
         """Run classification via Qwen with JSON schema enforcement."""
-        model = self._create_huggingface_model(self.CLASSIFICATION_MODEL)
-
         schema_str = json.dumps(structured_output.model_json_schema(), indent=2)
         system_instruction = (
             f"{prompt_template}\n\n"
-            f"IMPORTANT: You MUST respond ONLY with valid JSON that matches the following schema:\n{schema_str}"
+            "IMPORTANT: You MUST respond ONLY with valid JSON that matches the following schema:\n"
+            f"{schema_str}"
         )
 
         messages = [
             {"role": "system", "content": system_instruction},
             {"role": "user", "content": user_content},
         ]
-        response = model.invoke(messages)
+        with self._observe(
+            "classification", trace_name, model=self.classification_models[0], input=messages
+        ) as span:
+            response = self.classification_invoker.invoke(
+                lambda model_id: self._create_huggingface_model(model_id).invoke(messages),
+                self.classification_models,
+            )
+            span.output = response.content
+            span.usage = self._usage(response)
 
         try:
             content = response.content
@@ -123,47 +284,158 @@ class LLMService:
             reason="Parse error — could not extract valid JSON from model response",
         )
 
-    def _invoke_chat(
-        self, prompt_template, user_content, trace_name, conversation_id, langfuse_config
-    ):
+    def _invoke_chat(self, prompt: ChatPrompt, trace_name: str, conversation_id):
         """Run chat via DeepSeek-V3 with LangGraph agent + short-term memory."""
-        model = self._create_huggingface_model()
-        agent = create_agent(model=model, checkpointer=self.memory_saver)
-
-        response = agent.invoke(
-            {
-                "messages": [
-                    {"role": "assistant", "content": prompt_template},
-                    {"role": "user", "content": user_content},
-                ]
-            },
-            config={
-                "callbacks": [langfuse_config._initialize_with_langchain()],
-                "run_name": trace_name,
-                "configurable": {"thread_id": conversation_id},
-            },
-        )
 
-        # Extract content from last non-empty message
-        last_msg = response["messages"][-1]
-        content = getattr(last_msg, "content", "") or ""
-        if not content.strip() and len(response["messages"]) > 1:
-            content = getattr(response["messages"][-2], "content", "") or ""
+        from langchain.agents import create_agent
+
+        def run_agent(model_id: str, callbacks: list):
+            agent = create_agent(
+                model=self._create_huggingface_model(model_id),
+                system_prompt=prompt.system,
+                checkpointer=self.memory_saver,
+            )
+            return agent.invoke(
+                {"messages": [{"role": "user", "content": prompt.turn}]},
+                config={
+                    "callbacks": callbacks,
+                    "run_name": trace_name,
+                    "configurable": {"thread_id": conversation_id},
+                },
+            )
+
+        with self._observe(
+            "chat",
+            trace_name,
+            model=self.chat_models[0],
+            input=prompt.turn,
+            session_id=conversation_id,
+            metadata=self._prompt_metadata(prompt),
+        ) as span:
+            callbacks = tracer.langchain_callbacks(span)
+            response = self.chat_invoker.invoke(
+                lambda model_id: run_agent(model_id, callbacks), self.chat_models
+            )
+
+            # Extract content from last non-empty message
+            last_msg = response["messages"][-1]
+            content = getattr(last_msg, "content", "") or ""
+            if not content.strip() and len(response["messages"]) > 1:
+                content = getattr(response["messages"][-2], "content", "") or ""
+            span.output = content
+            span.usage = self._usage(last_msg)
+            prefix_cache_stats.record_usage(span.usage)
         return content
 
+    @staticmethod
+    def _chat_prompt(
+        prompt_template: str, profile: Optional[str], user_content: str, conversation_id
+    ) -> ChatPrompt:
+        """
+        Static-to-volatile layout of a chat turn.
+
+        The system prompt is passed to the agent on every call rather than
+        stored in the thread, so the history holds only user/assistant turns
+        and every turn's input starts with the same bytes as the last one.
+        """
+        prompt = assemble_chat_prompt(prompt_template, profile, user_content)
+        prefix_cache_stats.observe(conversation_id, prompt)
+        return prompt
+
+    @staticmethod
+    def _prompt_metadata(prompt: ChatPrompt) -> dict:
+        return {
+            "prefix_hash": prompt.prefix_hash,
+            "prefix_tokens": prompt.prefix_tokens,
+            "prefix_cacheable": prompt.cacheable,
+        }
+
+    @staticmethod
+    @contextmanager
+    def _observe(feature: str, name: str, model: str, **span_args):
+        """Trace the call, record its tokens and wall time for the current user, and capture it."""
+        span = None
+        started = time.monotonic()
+        try:
+            with tracer.span(name, model=model, **span_args) as span:
+                yield span
+        finally:
+            if span is not None:
+                usage_aggregator.record(
+                    feature, model, span.usage, span.latency, error=span.error is not None
+                )
+                traffic_recorder.capture(
+                    feature,
+                    model,
+                    {"output": span.output, "usage": span.usage},
+                    started,
+                    span.error,
+                )
+
+    @staticmethod
+    def _usage(message) -> Optional[dict]:
+        """Token counts reported by the endpoint, in Langfuse usage_details form."""
+        usage = getattr(message, "usage_metadata", None)
+        if not usage:
+            return None
+        details = {"input": usage.get("input_tokens", 0), "output": usage.get("output_tokens", 0)}
+        # Input tokens the provider served from its prompt cache, when it reports them
+        cache_read = (usage.get("input_token_details") or {}).get("cache_read")
+        if cache_read:
+            details["cache_read"] = cache_read
+        return details
+
     # ── Embeddings ───────────────────────────────────────────────────
 
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """Generate an embedding vector for the given text."""
-        embeddings = HuggingFaceEndpointEmbeddings(
-            model=self.EMBEDDING_MODEL,
-            task="feature-extraction",
-            huggingfacehub_api_token=self.hf_token,
+        model = model or self.EMBEDDING_MODEL
+        return self._embedding_cache.get_or_load_sync(
+            self._embedding_key(text, model),
+            lambda: self._embedding_flight.do_sync((model, text), self._embed_one, text, model),
         )
-        emb = embeddings.embed_query(text)
+
+    async def aget_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Generate an embedding off the event loop, coalescing identical concurrent calls."""
+        model = model or self.EMBEDDING_MODEL
+        return await self._embedding_cache.get_or_load(
+            self._embedding_key(text, model),
+            lambda: self._embedding_flight.do(
+                (model, text), asyncio.to_thread, self._embed_one, text, model
+            ),
+        )
+
+    @staticmethod
+    def _embedding_key(text: str, model: str) -> str:
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _embed_one(self, text: str, model: str) -> List[float]:
+        emb = self._embed([text], model)[0]
         print(f"[EMBEDDING] Text: {text[:30]}... | Dimensions: {len(emb)}")
         return emb
 
+    def get_embeddings(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Generate embedding vectors for a batch of texts in one call."""
+        if not texts:
+            return []
+        return self._embed(texts, model or self.EMBEDDING_MODEL)
+
+    def _embed(self, texts: List[str], model: str) -> List[List[float]]:
+        # Only sizes are traced: texts can be large and vectors are not useful in a trace
+        with self._observe(
+            "embedding",
+            "embedding",
+            model=model,
+            input={"texts": len(texts), "chars": sum(len(t) for t in texts)},
+            metadata={"backend": self.embedding_backend.name},
+            slow_seconds=2.0,
+        ) as span:
+            vectors = self.embedding_backend.embed(texts, model)
+            span.output = {"dimensions": len(vectors[0]) if vectors else 0}
+            # Embedding endpoints report no usage; ~4 characters per token is close enough to bill
+            span.usage = {"input": sum(len(t) for t in texts) // 4, "output": 0}
+        return vectors
+
 
 # Singleton instance for reuse across the app
 _llm_service = LLMService()
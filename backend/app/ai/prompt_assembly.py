@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shortest prefix providers will cache (OpenAI and Anthropic both start at 1024 tokens)
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+# Profile sections in render order; anything else follows, sorted by name
+_PROFILE_SECTIONS = ("personal", "preferences", "projects")
+
+
+@dataclass(frozen=True)
+class ChatPrompt:
+    """
+    A chat turn laid out from most static to most volatile.
+
+    `system` (prompt template, then the rendered profile) is sent as the
+    system message and stays byte-identical across a user's turns until
+    the template or the profile changes. The conversation history follows
+    it, append-only in the checkpointer, and `turn` (retrieved context,
+    then the message) comes last. Everything before `turn` is a prefix
+    the provider can reuse from its KV/prompt cache.
+    """
+
+    system: str
+    turn: str
+    prefix_hash: str
+    prefix_tokens: int  # Estimated at ~4 characters per token
+
+    @property
+    def cacheable(self) -> bool:
+        """Long enough for the provider to cache on its own, before any history."""
+        return self.prefix_tokens >= PROMPT_CACHE_MIN_TOKENS
+
+
+def render_profile(profile: Union[dict, str, None]) -> str:
+    """
+    Render the user profile deterministically.
+
+    Facts come back from the database in an order that shifts as they are
+    touched, and `str(dict)` would carry that into the prompt; sorting
+    sections and facts keeps the same profile rendering to the same bytes.
+    Strings are taken as already rendered.
+    """
+    if not profile:
+        return ""
+    if isinstance(profile, str):
+        return profile
+
+    sections = [s for s in _PROFILE_SECTIONS if s in profile]
+    sections += sorted(s for s in profile if s not in _PROFILE_SECTIONS)
+    lines = []
+    for section in sections:
+        items = profile[section]
+        if not items:
+            continue
+        lines.append(f"[{section}]")
+        for item in sorted(items, key=_item_key):
+            lines.append(f"- {_render_item(item)}")
+    return "\n".join(lines)
+
+
+def assemble_chat_prompt(template: str, profile: Optional[str], turn: str) -> ChatPrompt:
+    """Lay out one chat turn (`turn` from chat_engine.chat_user_content); see ChatPrompt."""
+    system = template.rstrip()
+    if profile:
+        system = f"{system}\n\nInformation about user:\n{profile}"
+    return ChatPrompt(
+        system=system,
+        turn=turn,
+        prefix_hash=hashlib.sha256(system.encode("utf-8")).hexdigest()[:16],
+        prefix_tokens=len(system) // 4,
+    )
+
+
+def _item_key(item) -> str:
+    return str(item.get("key", "")) if isinstance(item, dict) else str(item)
+
+
+def _render_item(item) -> str:
+    if not isinstance(item, dict):
+        return str(item)
+    text = f"{item.get('key', '')}: {item.get('value', '')}"
+    extras = [f"{name}={item[name]}" for name in sorted(item) if name not in ("key", "value")]
+    return f"{text} ({'; '.join(extras)})" if extras else text
+
+
+# ── Prefix Cache Stats ───────────────────────────────────────────────
+
+
+class PrefixCacheStats:
+    """
+    How often chat turns could reuse a provider's prefix cache.
+
+    A turn reuses the prefix when its system prefix hash matches the previous
+    turn of the same conversation (the history after it only ever grows).
+    `cached_tokens` adds up the cache reads providers report in usage.
+    """
+
+    def __init__(self, max_conversations: int = 10_000):
+        self.max_conversations = max_conversations
+        self._last_prefix: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            "turns": 0,
+            "cacheable": 0,
+            "prefix_reused": 0,
+            "prefix_changed": 0,
+            "cached_tokens": 0,
+        }
+
+    def observe(self, conversation_id: Optional[str], prompt: ChatPrompt) -> bool:
+        """Count a turn; True when its prefix matches the conversation's previous turn."""
+        with self._lock:
+            self.counters["turns"] += 1
+            self.counters["cacheable"] += int(prompt.cacheable)
+            if conversation_id is None:
+                return False
+            previous = self._last_prefix.pop(conversation_id, None)
+            self._last_prefix[conversation_id] = prompt.prefix_hash
+            if len(self._last_prefix) > self.max_conversations:
+                self._last_prefix.popitem(last=False)
+            if previous is None:
+                return False
+            reused = previous == prompt.prefix_hash
+            self.counters["prefix_reused" if reused else "prefix_changed"] += 1
+            return reused
+
+    def record_usage(self, usage: Optional[dict]) -> None:
+        if usage and usage.get("cache_read"):
+            with self._lock:
+                self.counters["cached_tokens"] += usage["cache_read"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            followups = self.counters["prefix_reused"] + self.counters["prefix_changed"]
+            return {
+                **self.counters,
+                "reuse_rate": round(self.counters["prefix_reused"] / followups, 4)
+                if followups
+                else None,
+                "min_cacheable_tokens": PROMPT_CACHE_MIN_TOKENS,
+                "conversations_tracked": len(self._last_prefix),
+            }
+
+
+prefix_cache_stats = PrefixCacheStats()
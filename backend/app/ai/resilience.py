@@ -0,0 +1,276 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+_END = object()
+
+
+class ModelUnavailableError(Exception):
+    """Every model in a fallback chain failed, timed out or had its circuit open."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """A model call ran past its deadline and was abandoned while still running."""
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    closed     Calls flow; consecutive failures are counted.
+    open       After `failure_threshold` failures calls are rejected for `reset_timeout`.
+    half_open  Once the timeout passes, a single probe call is let through:
+               success closes the circuit, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after one that ended without a verdict."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of call latencies, used to pick the hedging delay."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < 20:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientInvoker:
+    """
+    Runs a model call with a deadline, optional tail-latency hedging, a circuit
+    breaker per model and a fallback chain.
+
+    For each model in the chain (skipping models whose circuit is open):
+        1. Start the call on a worker thread
+        2. If it is still running after the model's p95 latency, fire one hedged
+           duplicate and take whichever finishes first (stateless calls only)
+        3. Give up on the model at its deadline and fall through to the next one
+
+    Timed-out calls cannot be interrupted; they finish in the background and
+    their result is discarded. With `fallback_after_timeout=False` (stateful
+    calls, whose abandoned run still writes its side effects) a timeout ends
+    the chain instead of starting a second run next to the first.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        deadline: float = 60.0,
+        hedge: bool = False,
+        fallback_after_timeout: bool = True,
+        min_hedge_delay: float = 1.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_workers: int = 16,
+    ):
+        self.name = name
+        self.deadline = deadline
+        self.hedge = hedge
+        self.fallback_after_timeout = fallback_after_timeout
+        self.min_hedge_delay = min_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.counters = {"calls": 0, "hedged": 0, "timeouts": 0, "fallbacks": 0, "rejected": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+    def invoke(self, call: Callable[[str], T], models: List[str]) -> T:
+        """Call `call(model)` for each model in the chain until one succeeds."""
+        errors = []
+        for position, model in enumerate(models):
+            breaker = self._breaker(model)
+            if not breaker.allow():
+                self._count("rejected")
+                errors.append(f"{model}: circuit open")
+                continue
+            if position > 0:
+                self._count("fallbacks")
+                print(f"[RESILIENCE] {self.name}: falling back to {model}")
+
+            try:
+                result = self._call_with_deadline(call, model)
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(f"{model}: {type(e).__name__}: {e}")
+                print(f"[RESILIENCE] {self.name}: {model} failed ({type(e).__name__})")
+                if isinstance(e, DeadlineExceededError) and not self.fallback_after_timeout:
+                    break
+                continue
+
+            breaker.record_success()
+            return result
+
+        raise ModelUnavailableError(f"All {self.name} models failed: " + "; ".join(errors))
+
+    def stream(self, call: Callable[[str], Iterator[T]], models: List[str]) -> Iterator[T]:
+        """
+        Yield the chunks of `call(model)` from the first model that starts streaming.
+
+        Falls back to the next model only until the first chunk arrives; once
+        output has reached the caller, a failure is raised instead of replayed.
+        There is no deadline, since the client sees progress as it happens.
+        """
+        errors = []
+        for position, model in enumerate(models):
+            breaker = self._breaker(model)
+            if not breaker.allow():
+                self._count("rejected")
+                errors.append(f"{model}: circuit open")
+                continue
+            if position > 0:
+                self._count("fallbacks")
+                print(f"[RESILIENCE] {self.name}: falling back to {model} for streaming")
+
+            self._count("calls")
+            started = time.monotonic()
+            try:
+                chunks = iter(call(model))
+                first = next(chunks, _END)
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(f"{model}: {type(e).__name__}: {e}")
+                print(f"[RESILIENCE] {self.name}: {model} failed to stream ({type(e).__name__})")
+                continue
+
+            finished = False
+            try:
+                if first is not _END:
+                    yield first
+                    yield from chunks
+                finished = True
+            except Exception:
+                finished = True
+                breaker.record_failure()
+                raise
+            finally:
+                # Closed by the consumer mid-stream (GeneratorExit): no verdict on the model
+                if not finished:
+                    breaker.release_probe()
+            breaker.record_success()
+            self.latencies.setdefault(model, LatencyTracker()).record(time.monotonic() - started)
+            return
+
+        raise ModelUnavailableError(f"All {self.name} models failed: " + "; ".join(errors))
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "circuits": {model: b.state for model, b in self.breakers.items()},
+            "p95_seconds": {model: t.percentile(0.95) for model, t in self.latencies.items()},
+        }
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    def _call_with_deadline(self, call: Callable[[str], T], model: str) -> T:
+        self._count("calls")
+        tracker = self.latencies.setdefault(model, LatencyTracker())
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+
+        pending = {self._submit(call, model, tracker)}
+        if self.hedge:
+            p95 = tracker.percentile(0.95)
+            hedge_delay = max(self.min_hedge_delay, p95) if p95 else None
+            if hedge_delay and hedge_delay < self.deadline:
+                done, _ = wait(pending, timeout=hedge_delay)
+                if not done:
+                    self._count("hedged")
+                    pending.add(self._submit(call, model, tracker))
+
+        last_error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+
+        if last_error is not None and not pending:
+            raise last_error
+        self._count("timeouts")
+        raise DeadlineExceededError(f"{model} did not answer within {self.deadline:.0f}s")
+
+    def _submit(self, call: Callable[[str], T], model: str, tracker: LatencyTracker) -> Future:
+        def timed() -> T:
+            started = time.monotonic()
+            result = call(model)
+            tracker.record(time.monotonic() - started)
+            return result
+
+        # Run in the caller's context so per-request state (replayed flows) follows the call
+        return self._executor.submit(contextvars.copy_context().run, timed)
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[model]
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+
+def model_chain(primary: str, fallbacks_env: str) -> List[str]:
+    """Primary model followed by the comma-separated fallbacks from an env var."""
+    fallbacks = [m.strip() for m in os.getenv(fallbacks_env, "").split(",") if m.strip()]
+    return [primary, *(m for m in fallbacks if m != primary)]
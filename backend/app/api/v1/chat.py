@@ -1,17 +1,36 @@
-from fastapi import APIRouter
+import asyncio
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse
+from app.core.idempotency import idempotency_store, request_fingerprint
+from app.core.serialization import json_response
 from app.schemas.chat_models import ChatRequest, ChatResponse
-from app.schemas.conversations import Conversation, ConversationUpdate
-from app.schemas.messages import Message
+from app.schemas.conversations import Conversation, ConversationList, ConversationUpdate
+from app.schemas.messages import Message, MessageList
 from app.services.chat_service import ChatService
+from app.services.deletion import deletion_worker
 from app.database.repositories.conversations import ConversationRepository
 from app.database.repositories.messages import MessageRepository
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+async def chat(req: ChatRequest, idempotency_key: Optional[str] = Header(None)):
+    key = idempotency_key or req.idempotency_key
+    if not key:
+        return await _respond(req)
+
+    async def respond():
+        return (await _respond(req)).model_dump()
+
+    # A retried POST replays (or waits for) the first answer instead of generating it again
+    fingerprint = request_fingerprint(req.message, req.conversation_id)
+    return await idempotency_store.run(req.user_id, key, fingerprint, respond)
+
+
+async def _respond(req: ChatRequest) -> ChatResponse:
     chat_service = ChatService()
     if req.conversation_id:
         # existing conversation
@@ -22,24 +41,42 @@ async def chat(req: ChatRequest):
 
 
 @router.get("/conversations/{user_id}", response_model=List[Conversation])
-async def get_conversations(user_id: str):
-    """Get all conversations for a user"""
+async def get_conversations(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+):
+    """
+    Get a user's conversations, most recently active first, each with its last
+    message preview and message count. The cursor for the next page comes
+    back in the X-Next-Cursor header (absent on the last page).
+    """
     conversation_repo = ConversationRepository()
-    return conversation_repo.get_conversations(user_id)
+    try:
+        # The query and row validation run off the event loop
+        conversations, next_cursor = await asyncio.to_thread(
+            conversation_repo.list_conversations, user_id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_response(conversations, ConversationList, headers=headers)
 
 
 @router.get("/conversation/{conversation_id}", response_model=Conversation)
 async def get_conversation(conversation_id: str):
     """Get conversation details"""
     conversation_repo = ConversationRepository()
-    return conversation_repo.get_conversation(conversation_id)
+    conversation = await asyncio.to_thread(conversation_repo.get_conversation, conversation_id)
+    return json_response(conversation)
 
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[Message])
 async def get_messages(conversation_id: str):
     """Get all messages for a conversation"""
     message_repo = MessageRepository()
-    return message_repo.get_messages(conversation_id, limit=100)
+    messages = await asyncio.to_thread(message_repo.get_messages, conversation_id, 100)
+    return json_response(messages, MessageList)
 
 
 @router.post("/test", response_model=ChatResponse)
@@ -57,7 +94,11 @@ async def update_conversation(conversation_id: str, update: ConversationUpdate):
 
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
-    """Delete a conversation"""
-    repo = ConversationRepository()
-    repo.delete_conversation(conversation_id)
-    return {"status": "success"}
+    """
+    Delete a conversation with its messages and short-term memory. The
+    conversation leaves the list right away; rows are deleted in the background.
+    """
+    job = await deletion_worker.enqueue_conversation(conversation_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return JSONResponse(status_code=202, content={"status": "accepted", "job_id": job["id"]})
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from app.services.deletion import deletion_worker
+
+router = APIRouter()
+
+
+@router.delete("/users/{user_id}/data")
+async def purge_user_data(user_id: str):
+    """
+    Delete everything stored for a user: facts, embeddings, project rollups,
+    conversations and messages. Returns at once; follow the job for progress.
+    """
+    try:
+        job = await deletion_worker.enqueue_user(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse(status_code=202, content={"status": "accepted", "job_id": job["id"]})
+
+
+@router.get("/users/{user_id}/deletions")
+async def get_user_deletions(user_id: str, limit: int = Query(20, ge=1, le=100)):
+    """A user's deletion jobs, newest first."""
+    return await deletion_worker.repository.get_user_jobs(user_id, limit)
+
+
+@router.get("/deletions/{job_id}")
+async def get_deletion(job_id: str):
+    """
+    Progress of a deletion job: status (pending, running, done, failed),
+    the step it reached and rows deleted per dataset.
+    """
+    job = await deletion_worker.repository.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return job
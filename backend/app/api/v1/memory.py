@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from app.core.serialization import json_response
 from app.database.repositories.memory import MemoryRepository
-from app.schemas.memory import MemoryFact, MemoryType
+from app.memory.manager import MemoryManager
+from app.schemas.memory import MemoryFact, MemoryFactList, MemoryPage, MemoryTier, MemoryType
+from datetime import datetime
 from typing import List, Optional
 
 router = APIRouter()
@@ -15,20 +19,94 @@ async def get_memories(user_id: str, category: Optional[MemoryType] = None):
     repo = MemoryRepository()
     try:
         facts = await repo.get_facts(user_id, category=category, limit=100)
-        return facts
+        return json_response(facts, MemoryFactList)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{user_id}/search", response_model=MemoryPage)
+async def search_memories(
+    user_id: str,
+    q: Optional[str] = Query(None, description="Text to find in fact keys or values"),
+    category: Optional[MemoryType] = None,
+    key_prefix: Optional[str] = Query(None, description="e.g. project_x_milestone_"),
+    min_importance: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_importance: Optional[float] = Query(None, ge=0.0, le=1.0),
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    tier: Optional[MemoryTier] = Query(MemoryTier.HOT, description="hot | archive"),
+    all_tiers: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. key,value"),
+    sort: str = Query("recent", description="recent | importance | key"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """
+    Search, filter and page through all of a user's facts on the server.
+    Follow next_cursor until it is null to walk every match.
+    """
+    repo = MemoryRepository()
+    try:
+        items, next_cursor = await repo.search_facts(
+            user_id,
+            text=q,
+            category=category,
+            key_prefix=key_prefix,
+            min_importance=min_importance,
+            max_importance=max_importance,
+            updated_after=updated_after,
+            updated_before=updated_before,
+            tier=None if all_tiers else tier,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    # Rows are plain JSON from PostgREST: encode them as-is instead of re-validating a MemoryPage
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@router.post("/{user_id}/restore")
+async def restore_memories(user_id: str, fact_ids: List[str] = Body(..., embed=True)):
+    """
+    Restore archived (decayed) facts to the hot tier,
+    so they show up in the profile and retrieval again.
+    """
+    manager = MemoryManager()
+    try:
+        restored = await manager.restore_facts(user_id, fact_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "restored": restored}
+
+
+@router.get("/{user_id}/projects/{project_key}/milestones", response_model=List[MemoryFact])
+async def get_project_milestones(user_id: str, project_key: str):
+    """
+    Get the full milestone history of a project, newest first.
+    Profiles only carry the latest milestones of each project.
+    """
+    manager = MemoryManager()
+    try:
+        milestones = await manager.get_project_history(user_id, project_key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return json_response(milestones, MemoryFactList)
+
+
 @router.delete("/{fact_id}")
 async def delete_memory(fact_id: str, user_id: str):
     """
     Delete a specific memory fact.
     Requires user_id to ensure ownership.
     """
-    repo = MemoryRepository()
+    manager = MemoryManager()
     try:
-        success = await repo.delete_fact(fact_id, user_id)
+        success = await manager.delete_fact(fact_id, user_id)
         if not success:
             raise HTTPException(status_code=404, detail="Fact not found or not owned by user")
         return {"status": "success"}
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.usage import summarize_usage, usage_aggregator
+from app.database.repositories.usage import UsageRepository
+
+router = APIRouter()
+
+TOP_ORDERS = ("cost", "tokens", "seconds", "slow_calls")
+
+
+@router.get("/top")
+async def get_top_users(
+    days: int = Query(1, ge=1, le=90),
+    order: str = Query("cost", description="cost | tokens | seconds | slow_calls"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    Users driving the most spend, tokens or model wall time over the last `days`.
+    Usage from the last USAGE_FLUSH_SECONDS may not be included yet.
+    """
+    if order not in TOP_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of {', '.join(TOP_ORDERS)}")
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    try:
+        users = await UsageRepository().get_top_users(since, order, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"since": since.isoformat(), "order": order, "users": users}
+
+
+@router.get("/{user_id}")
+async def get_user_usage(user_id: str, days: int = Query(7, ge=1, le=90)):
+    """
+    A user's model calls, tokens, cost and latency over the last `days`,
+    by feature (chat, classification, embedding) and by model, plus their
+    standing against the daily token quota.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    try:
+        rows = await UsageRepository().get_user_usage(user_id, since)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    day_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    today = sum(
+        r["input_tokens"] + r["output_tokens"]
+        for r in rows
+        if datetime.fromisoformat(r["bucket_start"]) >= day_start
+    )
+    return {
+        "user_id": user_id,
+        "since": since.isoformat(),
+        **summarize_usage(rows),
+        "hourly": rows,
+        "quota": {"daily_tokens": usage_aggregator.daily_token_quota, "used_today": today},
+    }
@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.services.chat_session import ChatSession
+
+router = APIRouter()
+
+
+@router.websocket("/ws/chat/{user_id}")
+async def chat_socket(websocket: WebSocket, user_id: str, conversation_id: Optional[str] = None):
+    """
+    Chat over one long-lived connection.
+
+    Client sends {"message": "..."} per turn (optionally {"conversation_id": ...}
+    first, to switch threads); the server streams token / done / memory /
+    error events as described in ChatSession.
+    """
+    await websocket.accept()
+    session = ChatSession(user_id, emit=websocket.send_json, conversation_id=conversation_id)
+    try:
+        await session.open()
+        await session.push({"type": "ready", "conversation_id": session.conversation_id})
+        while True:
+            data = await websocket.receive_json()
+            if "conversation_id" in data:
+                session.conversation_id = data["conversation_id"]
+            message = (data.get("message") or "").strip()
+            if message:
+                await session.send(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
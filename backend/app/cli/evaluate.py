@@ -0,0 +1,309 @@
+"""
+Offline batch evaluation of the chat answer and memory extraction path.
+
+Usage:
+    python -m app.cli.evaluate run --dataset eval.jsonl [--concurrency 8] [--output results.jsonl]
+    python -m app.cli.evaluate run --dataset eval.jsonl --backend stub --stub-latency 0.5
+
+Each dataset line is one conversation turn:
+
+    {"id": "t1", "user_id": "eval-user", "message": "I finished the NeuraDesk backend",
+     "profile": {"projects": [{"key": "project_neuradesk", "value": "..."}]},
+     "memories": [{"key": "...", "value": "...", "category": "project"}],
+     "expected": {"should_store": true, "category": "project_milestone",
+                  "key": "project_neuradesk", "project_key": "project_neuradesk"}}
+
+Items are streamed through the chat answer (`ai_response`) and then
+`MemoryManager.extract_fact`, the classify / entity resolution / key part of
+`process_query`. The profile and memories come from the dataset and nothing
+is written, so runs are repeatable and safe against production data.
+
+Reported per item and in aggregate: chat, classification and total latency;
+model calls and tokens; classifier agreement (should_store, category); key
+accuracy (milestones compare their base project key); and entity resolution
+accuracy (resolved existing project vs `expected.project_key`).
+
+Backends:
+    real  HuggingFace endpoints and Langfuse prompts, as configured in .env
+    stub  FakeChatEndpoint with injectable latency and errors; the classifier
+          answers with the item's expected labels, so scores isolate the
+          deterministic resolution steps and timings show pipeline overhead
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+from app.ai.chat_engine import CHAT_PROMPT, CLASSIFIER_PROMPT, ai_response
+from app.ai.llm import _llm_service
+from app.core.admission import admission_controller
+from app.intergrations.tracing import meter_usage, tracer
+from app.memory.manager import MemoryManager
+from app.schemas.memory import MemoryFact
+
+_STATEMENT_PREFIX = "User statement: "
+_STATEMENT_SUFFIX = " , User old facts: "
+
+
+# ── Dataset ──────────────────────────────────────────────────────────
+
+
+def iter_dataset(path: str, limit: Optional[int] = None) -> Iterator[dict]:
+    """Stream dataset items; blank lines and `#` comments are skipped."""
+    count = 0
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            item = json.loads(line)
+            item.setdefault("id", str(line_number))
+            yield item
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+def _memories(item: dict) -> List[MemoryFact]:
+    defaults = {"category": "personal", "importance": 0.5}
+    return [
+        MemoryFact(**{**defaults, **m, "user_id": item["user_id"]})
+        for m in item.get("memories", [])
+    ]
+
+
+# ── Backends ─────────────────────────────────────────────────────────
+
+
+def use_stub_backend(
+    labels: Dict[str, dict], latency: float, jitter: float, error_rate: float, seed: int
+) -> None:
+    """Point the shared LLMService at fake endpoints and local stub prompts."""
+    from app.ai.fakes import FakeChatEndpoint
+
+    def classify(messages) -> str:
+        content = str(messages[-1].content)
+        statement = content.removeprefix(_STATEMENT_PREFIX).split(_STATEMENT_SUFFIX)[0]
+        expected = labels.get(statement, {})
+        should_store = expected.get("should_store", False)
+        return json.dumps(
+            {
+                "category": expected.get("category", "ephemeral"),
+                "importance": 0.8 if should_store else 0.0,
+                "should_store": should_store,
+                "key": expected.get("key"),
+                "value": expected.get("value", statement),
+                "reason": "stub label",
+            }
+        )
+
+    def factory(model_id: str):
+        respond = classify if model_id in _llm_service.classification_models else None
+        return FakeChatEndpoint(
+            respond=respond,
+            responses=["Noted, thanks for the update."],
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            seed=seed,
+        )
+
+    _llm_service.model_factory = factory
+    _llm_service._models.clear()
+    use_stub_prompts("You are an evaluation stub.")
+
+
+def use_stub_prompts(content: str) -> None:
+    """Serve every prompt from this process (no Langfuse client, shared cache tier or tracing)."""
+    from app.intergrations import langfuse
+
+    stub_prompt = SimpleNamespace(prompt=[{"content": content}])
+    langfuse.LangfuseClientSingleton._instance = SimpleNamespace(
+        get_prompt=lambda name, **kwargs: stub_prompt
+    )
+    langfuse._prompt_cache.shared = None
+    tracer.enabled = False
+
+
+# ── Runner ───────────────────────────────────────────────────────────
+
+
+class EvaluationRunner:
+    """Streams dataset items through the pipeline with bounded parallelism."""
+
+    def __init__(self, concurrency: int = 8, skip_chat: bool = False):
+        self.concurrency = concurrency
+        self.skip_chat = skip_chat
+        self.memory_manager = MemoryManager()
+
+    async def run(self, items: Iterator[dict], output: Optional[str] = None) -> List[dict]:
+        """Evaluate every item; results are written as they complete."""
+        results: List[dict] = []
+        sink = open(output, "w", encoding="utf-8") if output else None
+        lock = asyncio.Lock()
+
+        async def worker():
+            for item in items:
+                result = await self.evaluate(item)
+                async with lock:
+                    results.append(result)
+                    if sink:
+                        sink.write(json.dumps(result) + "\n")
+                    if len(results) % 25 == 0:
+                        print(f"[EVAL] {len(results)} items evaluated")
+
+        try:
+            # Workers share one iterator, so the dataset is never loaded whole
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if sink:
+                sink.close()
+        return results
+
+    async def evaluate(self, item: dict) -> dict:
+        user_id, message = item["user_id"], item["message"]
+        profile = item.get("profile", {})
+        memories = _memories(item)
+        result = {"id": item["id"], "user_id": user_id}
+        started = time.perf_counter()
+
+        with meter_usage() as usage:
+            try:
+                if not self.skip_chat:
+                    context = "\n".join(m.value for m in memories)
+                    # The classifier below takes its own slot, so only the chat call holds one
+                    async with admission_controller.admit_batch():
+                        chat_started = time.perf_counter()
+                        answer = await asyncio.to_thread(
+                            ai_response, message, user_facts=profile, context=context
+                        )
+                        result["chat_seconds"] = round(time.perf_counter() - chat_started, 4)
+                    result["answer_chars"] = len(answer or "")
+
+                classify_started = time.perf_counter()
+                classification, project_key, fact = await self.memory_manager.extract_fact(
+                    user_id, message, profile, memories
+                )
+                result["classify_seconds"] = round(time.perf_counter() - classify_started, 4)
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            else:
+                result.update(
+                    self._score(item.get("expected", {}), classification, project_key, fact)
+                )
+
+        result["total_seconds"] = round(time.perf_counter() - started, 4)
+        result.update(usage)
+        return result
+
+    @staticmethod
+    def _score(expected: dict, classification, project_key, fact) -> dict:
+        """Compare the pipeline output with the item's expected labels (skipping missing ones)."""
+        scores = {
+            "should_store": classification.should_store,
+            "category": fact.category.value if fact is not None else classification.category,
+            "key": getattr(fact, "key", None),
+            "project_key": project_key,
+        }
+        if "should_store" in expected:
+            scores["store_match"] = classification.should_store == expected["should_store"]
+        if "category" in expected and classification.should_store:
+            scores["category_match"] = scores["category"] == expected["category"]
+        if "key" in expected and fact is not None:
+            # Milestone keys carry a date and digest; only their base project key is stable
+            scores["key_match"] = fact.key.split("_milestone_")[0] == expected["key"]
+        if "project_key" in expected:
+            scores["entity_match"] = project_key == expected["project_key"]
+        return scores
+
+
+# ── Report ───────────────────────────────────────────────────────────
+
+
+def summarize(results: List[dict], elapsed: float) -> dict:
+    """Aggregate latency percentiles, token totals and accuracy rates."""
+    ok = [r for r in results if "error" not in r]
+    summary = {
+        "items": len(results),
+        "errors": len(results) - len(ok),
+        "elapsed_seconds": round(elapsed, 2),
+        "items_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "model_calls": sum(r["calls"] for r in results),
+        "input_tokens": sum(r["input_tokens"] for r in results),
+        "output_tokens": sum(r["output_tokens"] for r in results),
+    }
+    for stage in ("chat_seconds", "classify_seconds", "total_seconds"):
+        values = sorted(r[stage] for r in ok if stage in r)
+        if values:
+            summary[stage] = {
+                "p50": round(statistics.median(values), 4),
+                "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+                "max": round(values[-1], 4),
+            }
+    for metric in ("store_match", "category_match", "key_match", "entity_match"):
+        scored = [r[metric] for r in ok if metric in r]
+        if scored:
+            summary[metric.replace("_match", "_accuracy")] = round(sum(scored) / len(scored), 4)
+    return summary
+
+
+def _print_summary(summary: dict) -> None:
+    print(
+        f"\n{summary['items']} items ({summary['errors']} errors) in "
+        f"{summary['elapsed_seconds']}s, {summary['items_per_second']} items/s"
+    )
+    print(
+        f"Model calls: {summary['model_calls']} | tokens in {summary['input_tokens']} "
+        f"/ out {summary['output_tokens']}"
+    )
+    for stage in ("chat_seconds", "classify_seconds", "total_seconds"):
+        if stage in summary:
+            s = summary[stage]
+            print(f"  {stage:<18} p50 {s['p50']:.3f}s | p95 {s['p95']:.3f}s | max {s['max']:.3f}s")
+    for metric in ("store_accuracy", "category_accuracy", "key_accuracy", "entity_accuracy"):
+        if metric in summary:
+            print(f"  {metric:<18} {summary[metric]:.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Evaluate chat + memory quality and speed.")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--dataset", required=True, help="JSONL file of evaluation items")
+    parser.add_argument("--output", help="Write per-item results to this JSONL file")
+    parser.add_argument("--summary", help="Write the aggregate report to this JSON file")
+    parser.add_argument("--concurrency", type=int, default=8, help="Items evaluated in parallel")
+    parser.add_argument("--limit", type=int, help="Evaluate only the first N items")
+    parser.add_argument("--skip-chat", action="store_true", help="Only run memory extraction")
+    parser.add_argument("--backend", choices=["real", "stub"], default="real")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds per stub call")
+    parser.add_argument("--stub-jitter", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.backend == "stub":
+        labels = {i["message"]: i.get("expected", {}) for i in iter_dataset(args.dataset)}
+        use_stub_backend(
+            labels, args.stub_latency, args.stub_jitter, args.stub_error_rate, args.seed
+        )
+    print(
+        f"[EVAL] backend={args.backend} concurrency={args.concurrency} "
+        f"prompts={CHAT_PROMPT},{CLASSIFIER_PROMPT}"
+    )
+
+    runner = EvaluationRunner(args.concurrency, skip_chat=args.skip_chat)
+    started = time.perf_counter()
+    results = asyncio.run(runner.run(iter_dataset(args.dataset, args.limit), args.output))
+    summary = summarize(results, time.perf_counter() - started)
+    _print_summary(summary)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Re-embed every stored fact with a new embedding model, without downtime.
+
+Usage:
+    python -m app.cli.reembed run --model BAAI/bge-base-en-v1.5 [--batch-size 64]
+    python -m app.cli.reembed cutover
+    python -m app.cli.reembed finalize
+
+Steps:
+    1. run       Stream facts, embed them in batches with the new model and
+                 write the vectors to a shadow table (resumable).
+    2. cutover   Re-embed facts changed during the run, then atomically swap the
+                 shadow table in and make the new model active.
+    3. finalize  Re-embed facts written by workers that still used the old model
+                 right after the cutover, then drop the replaced table.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.ai.llm import _llm_service
+from app.core.admission import admission_controller
+from app.database.repositories.bulk import BulkRepository
+from app.database.repositories.memory import MemoryRepository
+from app.database.repositories.vector import VectorRepository
+from app.memory.manager import MemoryManager
+from app.schemas.memory import MemoryFact, MemoryTier
+
+
+class ReembeddingPipeline:
+    """Streams facts through a batched embedding model into the vector store."""
+
+    def __init__(self, state_path: str, batch_size: int = 64, concurrency: int = 4):
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.bulk = BulkRepository()
+        self.facts_table = MemoryRepository().table_name
+        self.vector_repository = VectorRepository()
+        self.state = self._load_state()
+
+    # ── Steps ────────────────────────────────────────────────────────
+
+    async def run(self, model: str) -> None:
+        """Backfill the shadow table with vectors from the new model."""
+        if self.state.get("model") != model:
+            dimensions = len(_llm_service.get_embeddings(["dimension probe"], model=model)[0])
+            await self.vector_repository.prepare_shadow(dimensions)
+            self.state = {
+                "model": model,
+                "dimensions": dimensions,
+                "started_at": self._now(),
+                "last_id": None,
+            }
+            self._save_state()
+            print(f"[REEMBED] Prepared shadow table for {model} ({dimensions}d)")
+        else:
+            print(f"[REEMBED] Resuming {model} after fact {self.state['last_id']}")
+
+        gt = {"id": self.state["last_id"]} if self.state["last_id"] else None
+        total = self.bulk.count_rows(self.facts_table, gt=gt)
+        await self._reembed(self.bulk.iter_rows(self.facts_table, gt=gt), total, shadow=True)
+
+    async def cutover(self) -> None:
+        """Catch up on facts changed during the run, then swap tables atomically."""
+        model = self._require_state()
+        catch_up_from, cutover_at = self.state["started_at"], self._now()
+
+        gte = {"updated_at": catch_up_from}
+        total = self.bulk.count_rows(self.facts_table, gte=gte)
+        print(f"[REEMBED] Catching up on {total} facts changed since {catch_up_from}")
+        await self._reembed(
+            self.bulk.iter_rows(self.facts_table, gte=gte), total, shadow=True, checkpoint=False
+        )
+
+        await self.vector_repository.cutover_shadow(model)
+        self.state["cutover_at"] = cutover_at
+        self._save_state()
+        print(f"[REEMBED] Cutover complete: {model} is now the active embedding model")
+
+    async def finalize(self) -> None:
+        """Fix vectors written with the old model after cutover, then drop the old table."""
+        self._require_state()
+        if not self.state.get("cutover_at"):
+            raise SystemExit("Run `cutover` before `finalize`.")
+
+        gte = {"updated_at": self.state["cutover_at"]}
+        total = self.bulk.count_rows(self.facts_table, gte=gte)
+        print(f"[REEMBED] Re-embedding {total} facts written around the cutover")
+        await self._reembed(
+            self.bulk.iter_rows(self.facts_table, gte=gte), total, shadow=False, checkpoint=False
+        )
+
+        await self.vector_repository.drop_previous()
+        os.remove(self.state_path)
+        print("[REEMBED] Finalized: previous embeddings dropped")
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    async def _reembed(self, pages, total: int, shadow: bool, checkpoint: bool = True) -> None:
+        model = self.state["model"]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = 0
+        started = time.perf_counter()
+
+        async def embed_batch(facts: List[MemoryFact]) -> List[dict]:
+            documents = [MemoryManager.embedding_document(f) for f in facts]
+            async with semaphore, admission_controller.admit_batch():
+                vectors = await asyncio.to_thread(
+                    _llm_service.get_embeddings, [text for text, _ in documents], model
+                )
+            return [
+                {
+                    "user_id": fact.user_id,
+                    "fact_id": fact.id,
+                    "content": text,
+                    "embedding": vector,
+                    "metadata": metadata,
+                    "embedding_model": model,
+                    "archived": fact.tier == MemoryTier.ARCHIVE,
+                }
+                for fact, (text, metadata), vector in zip(facts, documents, vectors, strict=True)
+            ]
+
+        for page in pages:
+            facts = [MemoryFact(**row) for row in page]
+            batches = [
+                facts[i : i + self.batch_size] for i in range(0, len(facts), self.batch_size)
+            ]
+            results = await asyncio.gather(*(embed_batch(b) for b in batches))
+            for rows in results:
+                await self.vector_repository.bulk_upsert_embeddings(rows, shadow=shadow)
+
+            done += len(page)
+            if checkpoint:
+                self.state["last_id"] = page[-1]["id"]
+                self._save_state()
+            self._report(done, total, started)
+
+    @staticmethod
+    def _report(done: int, total: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else 0.0
+        percent = 100.0 * done / total if total else 100.0
+        print(
+            f"[REEMBED] {done}/{total} facts ({percent:.1f}%) | {rate:.1f} facts/s | ETA {eta:.0f}s"
+        )
+
+    def _require_state(self) -> str:
+        if not self.state.get("model"):
+            raise SystemExit("No re-embedding in progress. Start one with `run --model ...`.")
+        return self.state["model"]
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Migrate stored vectors to a new embedding model.")
+    parser.add_argument("command", choices=["run", "cutover", "finalize"])
+    parser.add_argument("--model", help="Target embedding model (required for `run`)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding call")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding calls in flight")
+    parser.add_argument("--state", default="reembed_state.json", help="Progress/checkpoint file")
+    args = parser.parse_args(argv)
+
+    pipeline = ReembeddingPipeline(args.state, args.batch_size, args.concurrency)
+    if args.command == "run":
+        if not args.model:
+            parser.error("--model is required for `run`")
+        asyncio.run(pipeline.run(args.model))
+    elif args.command == "cutover":
+        asyncio.run(pipeline.cutover())
+    else:
+        asyncio.run(pipeline.finalize())
+
+
+if __name__ == "__main__":
+    main()
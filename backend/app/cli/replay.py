@@ -0,0 +1,240 @@
+"""
+Replay captured chat traffic against recorded stand-ins.
+
+Usage:
+    python -m app.cli.replay --capture traffic.jsonl [--speed 1] [--output results.jsonl]
+    python -m app.cli.replay --capture traffic.jsonl --speed 0 --concurrency 16 --profile run.prof
+
+Flows captured with TRAFFIC_CAPTURE_PATH (see app.core.traffic) are fed back
+through ChatService with their recorded (anonymized) arguments. Supabase,
+the chat/classification endpoints and the embedding backend are replaced by
+stand-ins that answer every call with its recorded response after its
+recorded duration, so a run repeats production's call pattern and timings
+with no network access. Everything in between (admission, caches,
+coalescing, memory processing, serialization) is the code under test.
+
+Pacing:
+    --speed 1   flows start at their recorded offsets and calls take their recorded time
+    --speed 10  both ten times faster
+    --speed 0   no recorded waits; flows start as fast as --concurrency allows
+
+Reported: replayed vs recorded flow latency (p50/p95/max), errors, time spent
+waiting on stand-ins, and calls with no recorded response left (misses) or
+recorded responses never asked for (unused); both mean the code path has
+diverged from the one captured. With --profile, the event loop thread is
+profiled with cProfile and the stats written to that path.
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import pstats
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from app.ai.llm import _llm_service
+from app.cli.evaluate import use_stub_prompts
+from app.core.cache import _caches
+from app.core.traffic import ReplayClient, ReplayFlow, replaying
+from app.database.client import supabase_client
+from app.services.chat_service import ChatService
+
+# ── Capture ──────────────────────────────────────────────────────────
+
+
+def load_flows(path: str, limit: Optional[int] = None) -> List[dict]:
+    """Captured flows in arrival order (capture files of several workers can be concatenated)."""
+    flows = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            flow = json.loads(line)
+            flow.setdefault("id", str(line_number))
+            flows.append(flow)
+    flows.sort(key=lambda flow: flow["at"])
+    return flows[:limit] if limit else flows
+
+
+# ── Backends ─────────────────────────────────────────────────────────
+
+
+def use_replay_backend() -> None:
+    """Point the database, models and embeddings at stand-ins serving recorded flows."""
+    from app.ai.fakes import ReplayChatEndpoint, ReplayEmbeddingBackend
+
+    supabase_client._client = ReplayClient()
+
+    def factory(model_id: str):
+        stage = "classification" if model_id in _llm_service.classification_models else "chat"
+        return ReplayChatEndpoint(model_id=model_id, stage=stage)
+
+    _llm_service.model_factory = factory
+    _llm_service._models.clear()
+    _llm_service.embedding_backend = ReplayEmbeddingBackend()
+    use_stub_prompts("You are a replay stub.")
+    # Caches stay in this process and start cold, like a freshly started worker
+    for cache in _caches.values():
+        cache.shared = None
+
+
+# ── Runner ───────────────────────────────────────────────────────────
+
+
+class ReplayRunner:
+    """Feeds captured flows through ChatService, paced by their recorded arrival times."""
+
+    def __init__(self, speed: float = 1.0, concurrency: int = 8):
+        self.speed = speed
+        self.concurrency = concurrency
+        self.chat_service = ChatService()
+
+    async def run(self, flows: List[dict], output: Optional[str] = None) -> List[dict]:
+        sink = open(output, "w", encoding="utf-8") if output else None
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+        first_at = flows[0]["at"] if flows else 0.0
+
+        async def paced(flow: dict) -> dict:
+            if self.speed > 0:
+                delay = (flow["at"] - first_at) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                return await self.replay(flow)
+            async with semaphore:
+                return await self.replay(flow)
+
+        try:
+            results = []
+            for result in asyncio.as_completed([paced(flow) for flow in flows]):
+                result = await result
+                results.append(result)
+                if sink:
+                    sink.write(json.dumps(result) + "\n")
+                if len(results) % 100 == 0:
+                    print(f"[REPLAY] {len(results)}/{len(flows)} flows replayed")
+        finally:
+            if sink:
+                sink.close()
+        return results
+
+    async def replay(self, flow: dict) -> dict:
+        replayed = ReplayFlow(flow["events"], self.speed)
+        method = getattr(self.chat_service, flow["kind"].rsplit(".", 1)[-1])
+        result = {
+            "id": flow["id"],
+            "kind": flow["kind"],
+            "recorded_seconds": flow["seconds"],
+            "recorded_error": flow.get("error"),
+        }
+        started = time.perf_counter()
+        with replaying(replayed):
+            try:
+                await method(**flow["args"])
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - started, 4)
+        result["waited_seconds"] = round(replayed.waited, 4)
+        result["misses"] = replayed.misses
+        result["unused"] = replayed.unused
+        return result
+
+
+# ── Report ───────────────────────────────────────────────────────────
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "p50": round(statistics.median(values), 4),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def summarize(results: List[dict], elapsed: float, speed: float) -> dict:
+    summary = {
+        "flows": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "recorded_errors": sum(1 for r in results if r.get("recorded_error")),
+        "misses": sum(r["misses"] for r in results),
+        "unused": sum(r["unused"] for r in results),
+        "diverged_flows": sum(1 for r in results if r["misses"] or r["unused"]),
+        "elapsed_seconds": round(elapsed, 2),
+        "flows_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+    }
+    if results:
+        # Recorded latencies are scaled like the replay so the two compare directly
+        scale = speed if speed > 0 else None
+        summary["replayed_seconds"] = _percentiles([r["seconds"] for r in results])
+        if scale:
+            summary["recorded_seconds"] = _percentiles(
+                [r["recorded_seconds"] / scale for r in results]
+            )
+        # Time in the code under test: flow latency minus waits on stand-ins
+        summary["own_seconds"] = _percentiles(
+            [max(0.0, r["seconds"] - r["waited_seconds"]) for r in results]
+        )
+    return summary
+
+
+def _print_summary(summary: dict) -> None:
+    print(
+        f"\n{summary['flows']} flows ({summary['errors']} errors, "
+        f"{summary['recorded_errors']} recorded) in {summary['elapsed_seconds']}s, "
+        f"{summary['flows_per_second']} flows/s"
+    )
+    print(
+        f"Misses: {summary['misses']} | unused responses: {summary['unused']} | "
+        f"diverged flows: {summary['diverged_flows']}"
+    )
+    for key in ("recorded_seconds", "replayed_seconds", "own_seconds"):
+        if key in summary:
+            s = summary[key]
+            print(f"  {key:<18} p50 {s['p50']:.3f}s | p95 {s['p95']:.3f}s | max {s['max']:.3f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay captured chat traffic.")
+    parser.add_argument("--capture", required=True, help="JSONL file of captured flows")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing factor (0 = no waits)")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Flows in parallel when --speed is 0"
+    )
+    parser.add_argument("--limit", type=int, help="Replay only the first N flows")
+    parser.add_argument("--output", help="Write per-flow results to this JSONL file")
+    parser.add_argument("--summary", help="Write the aggregate report to this JSON file")
+    parser.add_argument("--profile", help="Write cProfile stats of the run to this path")
+    args = parser.parse_args(argv)
+
+    flows = load_flows(args.capture, args.limit)
+    use_replay_backend()
+    print(f"[REPLAY] {len(flows)} flows from {args.capture} at speed={args.speed}")
+
+    runner = ReplayRunner(args.speed, args.concurrency)
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        results = asyncio.run(runner.run(flows, args.output))
+    finally:
+        if profiler:
+            profiler.disable()
+    summary = summarize(results, time.perf_counter() - started, args.speed)
+    _print_summary(summary)
+
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print(f"\n[REPLAY] Profile written to {args.profile}; top functions by cumulative time:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Bulk export / import of user memory and conversation data.
+
+Usage:
+    python -m app.cli.transfer export --dest ./dump [--format parquet] [--users u1,u2]
+    python -m app.cli.transfer import --src ./dump [--workers 8]
+
+Layout of a dump: one directory per user holding one file per dataset
+(conversations, messages, facts, embeddings, rollups, rollup_milestones).
+Progress is recorded in a checkpoint file (completed users, and for imports
+the pages of each dataset already upserted), so an interrupted run resumes
+where it stopped.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from app.core.admission import admission_controller
+from app.database.repositories.bulk import BulkRepository
+
+load_dotenv()
+
+# Import order matters: parents before the rows that reference them.
+# `conflict` is the unique key rows are upserted on; `json` lists jsonb columns.
+DATASETS = [
+    {"name": "conversations", "table": "conversations", "scope": "user", "conflict": "id"},
+    {"name": "messages", "table": "messages", "scope": "conversation", "conflict": "id"},
+    {
+        "name": "facts",
+        "table": os.getenv("MEMEORY_TABLE", "user_memories"),
+        "scope": "user",
+        "conflict": "id",
+    },
+    {
+        "name": "embeddings",
+        "table": "memory_embeddings",
+        "scope": "user",
+        # Legacy rows have no fact_id and would never match a fact_id conflict
+        "conflict": "id",
+        "json": ["metadata"],
+    },
+    {
+        "name": "rollups",
+        "table": "project_rollups",
+        "scope": "user",
+        "conflict": "user_id,project_key",
+        "json": ["recent_milestones"],
+    },
+    {
+        "name": "rollup_milestones",
+        "table": "project_rollup_milestones",
+        "scope": "user",
+        "conflict": "user_id,project_key,milestone_key",
+    },
+]
+
+
+# ── File Formats ─────────────────────────────────────────────────────
+
+
+class _JsonlFormat:
+    extension = "jsonl"
+
+    def __init__(self, path: str, json_columns: List[str] = ()):
+        self.path = path
+        self._file = None
+
+    def write(self, rows: List[dict]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def read(self, batch_size: int) -> Iterator[List[dict]]:
+        batch = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+
+class _ParquetFormat:
+    """
+    Parquet files with every column stored as a nullable string, so pages with
+    differing null patterns share one schema. Nested values (metadata, milestone
+    lists) are JSON-encoded on write and decoded again on read for the dataset's
+    jsonb columns; left as text they would be imported as jsonb string scalars.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, path: str, json_columns: List[str] = ()):
+        self.path = path
+        self.json_columns = list(json_columns)
+        self._writer = None
+        self._columns: List[str] = []
+
+    @staticmethod
+    def _encode(value):
+        if value is None:
+            return None
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+
+    def write(self, rows: List[dict]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            self._columns = list(rows[0].keys())
+            schema = pa.schema([(c, pa.string()) for c in self._columns])
+            self._writer = pq.ParquetWriter(self.path, schema)
+
+        columns = {c: [self._encode(row.get(c)) for row in rows] for c in self._columns}
+        self._writer.write_table(pa.table(columns, schema=self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def read(self, batch_size: int) -> Iterator[List[dict]]:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(self.path)
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            rows = batch.to_pylist()
+            for row in rows:
+                for column in self.json_columns:
+                    if row.get(column) is not None:
+                        row[column] = json.loads(row[column])
+            yield rows
+
+
+FORMATS = {"jsonl": _JsonlFormat, "parquet": _ParquetFormat}
+
+
+# ── Checkpointing ────────────────────────────────────────────────────
+
+
+class Checkpoint:
+    """
+    Completed users plus, for users in progress, the number of pages of each
+    dataset already written. Persisted atomically after every user and page.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = set()
+        self.progress = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.done = set(state.get("done", []))
+            self.progress = state.get("progress", {})
+
+    def pages_done(self, user_id: str, dataset: str) -> int:
+        with self._lock:
+            return self.progress.get(user_id, {}).get(dataset, 0)
+
+    def mark_page(self, user_id: str, dataset: str, pages: int) -> None:
+        with self._lock:
+            self.progress.setdefault(user_id, {})[dataset] = pages
+            self._save()
+
+    def mark_done(self, user_id: str) -> None:
+        with self._lock:
+            self.done.add(user_id)
+            self.progress.pop(user_id, None)
+            self._save()
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "progress": self.progress}, f)
+        os.replace(tmp_path, self.path)
+
+
+# ── Transfer ─────────────────────────────────────────────────────────
+
+
+class MemoryTransfer:
+    """Streams per-user datasets between Supabase and dump files."""
+
+    def __init__(self, root: str, file_format: str = "jsonl", workers: int = 4):
+        self.root = root
+        self.file_format = file_format
+        self.workers = workers
+        self.bulk = BulkRepository()
+
+    # Export
+
+    async def export_users(self, user_ids: Optional[List[str]] = None) -> dict:
+        os.makedirs(self.root, exist_ok=True)
+        user_ids = user_ids or self._discover_users()
+        checkpoint = Checkpoint(os.path.join(self.root, "_export_checkpoint.json"))
+        return await self._run(user_ids, checkpoint, self._export_user, "EXPORT")
+
+    def _discover_users(self) -> List[str]:
+        users = set()
+        for dataset in DATASETS:
+            if dataset["scope"] == "user":
+                users.update(self.bulk.distinct_values(dataset["table"], "user_id"))
+        return sorted(users)
+
+    def _export_user(self, user_id: str, checkpoint: Checkpoint) -> int:
+        user_dir = os.path.join(self.root, user_id)
+        os.makedirs(user_dir, exist_ok=True)
+        fmt = FORMATS[self.file_format]
+
+        conversation_ids: List[str] = []
+        written = 0
+        for dataset in DATASETS:
+            path = os.path.join(user_dir, f"{dataset['name']}.{fmt.extension}")
+            if os.path.exists(path):
+                os.remove(path)  # Leftover from an interrupted run
+            writer = fmt(path, dataset.get("json", []))
+            try:
+                for page in self._user_pages(dataset, user_id, conversation_ids):
+                    if dataset["name"] == "conversations":
+                        conversation_ids.extend(row["id"] for row in page)
+                    writer.write(page)
+                    written += len(page)
+            finally:
+                writer.close()
+        return written
+
+    def _user_pages(
+        self, dataset: dict, user_id: str, conversation_ids: List[str]
+    ) -> Iterator[List[dict]]:
+        if dataset["scope"] == "user":
+            yield from self.bulk.iter_rows(dataset["table"], eq={"user_id": user_id})
+            return
+
+        # Messages have no user_id; page through them by conversation
+        for i in range(0, len(conversation_ids), 100):
+            chunk = conversation_ids[i : i + 100]
+            yield from self.bulk.iter_rows(dataset["table"], in_=("conversation_id", chunk))
+
+    # Import
+
+    async def import_users(self, user_ids: Optional[List[str]] = None) -> dict:
+        user_ids = user_ids or sorted(
+            name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))
+        )
+        checkpoint = Checkpoint(os.path.join(self.root, "_import_checkpoint.json"))
+        return await self._run(user_ids, checkpoint, self._import_user, "IMPORT")
+
+    def _import_user(self, user_id: str, checkpoint: Checkpoint) -> int:
+        user_dir = os.path.join(self.root, user_id)
+        written = 0
+        for dataset in DATASETS:
+            for fmt in FORMATS.values():
+                path = os.path.join(user_dir, f"{dataset['name']}.{fmt.extension}")
+                if not os.path.exists(path):
+                    continue
+                # Pages are cut at the same boundaries on every run, so the ones
+                # upserted before an interruption can be skipped
+                skip = checkpoint.pages_done(user_id, dataset["name"])
+                reader = fmt(path, dataset.get("json", []))
+                for page, batch in enumerate(reader.read(self.bulk.chunk_size), start=1):
+                    if page <= skip:
+                        continue
+                    written += self.bulk.upsert_rows(
+                        dataset["table"], batch, on_conflict=dataset["conflict"]
+                    )
+                    checkpoint.mark_page(user_id, dataset["name"], page)
+        return written
+
+    # Shared runner
+
+    async def _run(self, user_ids: List[str], checkpoint: Checkpoint, work, label: str) -> dict:
+        pending = [u for u in user_ids if u not in checkpoint.done]
+        print(f"[{label}] {len(pending)} users pending ({len(checkpoint.done)} already done)")
+
+        semaphore = asyncio.Semaphore(self.workers)
+        stats = {"users": 0, "rows": 0, "failed": 0}
+        started = time.perf_counter()
+
+        async def run_one(user_id: str) -> None:
+            async with semaphore, admission_controller.admit_batch():
+                try:
+                    rows = await asyncio.to_thread(work, user_id, checkpoint)
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"[{label} ERROR] user={user_id}: {e}")
+                    return
+                checkpoint.mark_done(user_id)
+                stats["users"] += 1
+                stats["rows"] += rows
+                print(f"[{label}] user={user_id} rows={rows}")
+
+        await asyncio.gather(*(run_one(u) for u in pending))
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"[{label}] done: {stats['users']} users, {stats['rows']} rows, "
+            f"{stats['failed']} failed in {elapsed:.1f}s"
+        )
+        return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk export/import of NeuraDesk user data.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Export users from Supabase to files")
+    export_parser.add_argument("--dest", required=True, help="Output directory")
+    export_parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl")
+
+    import_parser = sub.add_parser("import", help="Bulk upsert an export into Supabase")
+    import_parser.add_argument("--src", required=True, help="Directory produced by export")
+
+    for p in (export_parser, import_parser):
+        p.add_argument("--users", help="Comma-separated user IDs (default: all)")
+        p.add_argument("--workers", type=int, default=4, help="Users processed in parallel")
+
+    args = parser.parse_args()
+    user_ids = args.users.split(",") if args.users else None
+
+    if args.command == "export":
+        transfer = MemoryTransfer(args.dest, args.format, args.workers)
+        asyncio.run(transfer.export_users(user_ids))
+    else:
+        transfer = MemoryTransfer(args.src, workers=args.workers)
+        asyncio.run(transfer.import_users(user_ids))
+
+
+if __name__ == "__main__":
+    main()
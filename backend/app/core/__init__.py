@@ -0,0 +1 @@
+# Cross-cutting infrastructure shared by the service, memory and AI layers
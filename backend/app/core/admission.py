@@ -0,0 +1,237 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+
+    INTERACTIVE = 0  # A user waiting on a chat answer
+    CLASSIFICATION = 1  # Memory classification after an answer was sent
+    BATCH = 2  # Backfills and maintenance jobs
+
+
+class AdmissionRejected(Exception):
+    """Request shed by the admission controller; maps to HTTP 429."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token. Returns 0 on success, else seconds until a token is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    @property
+    def full(self) -> bool:
+        elapsed = time.monotonic() - self.updated
+        return self.tokens + elapsed * self.rate >= self.burst
+
+
+class AdmissionController:
+    """
+    Bounds concurrent LLM work for the whole process.
+
+    Admission happens in three steps:
+        1. Per-user token bucket and concurrency limit (when a user_id is given)
+        2. A free global slot is taken immediately if nobody is queued
+        3. Otherwise the request waits in a bounded priority queue; when the
+           queue is full, the lowest-priority waiter is shed (or the new
+           request, if nothing queued ranks below it)
+
+    Rejections are immediate and carry a Retry-After estimate derived from the
+    recent service time, so overload turns into fast 429s instead of growing
+    queues and tail latency.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        queue_size: int = 32,
+        queue_timeout: float = 10.0,
+        user_concurrency: int = 2,
+        user_rate: float = 0.5,
+        user_burst: float = 5.0,
+        max_tracked_users: int = 10000,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.user_concurrency = user_concurrency
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_tracked_users = max_tracked_users
+
+        self.active = 0
+        self._queue: List[list] = []  # Heap of [priority, seq, future]
+        self._seq = itertools.count()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._user_active: Dict[str, int] = {}
+        self._service_time = 2.0  # EWMA of seconds a slot is held
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "shed": 0, "timeouts": 0}
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[str] = None, priority: Priority = Priority.INTERACTIVE):
+        """Hold one global slot (and one of the user's slots) for the body of the block."""
+        if user_id:
+            self._check_user(user_id)
+            self._user_active[user_id] = self._user_active.get(user_id, 0) + 1
+        try:
+            await self._acquire(priority)
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                self._release(time.monotonic() - started)
+        finally:
+            if user_id:
+                remaining = self._user_active.get(user_id, 1) - 1
+                if remaining > 0:
+                    self._user_active[user_id] = remaining
+                else:
+                    self._user_active.pop(user_id, None)
+
+    @asynccontextmanager
+    async def admit_batch(self):
+        """
+        Hold a BATCH slot for one unit of a backfill or maintenance job. Jobs
+        wait out rejections (queue timeouts, being shed for more urgent work)
+        and retry, instead of failing the unit.
+        """
+        while True:
+            try:
+                await self._acquire(Priority.BATCH)
+                break
+            except AdmissionRejected as e:
+                await asyncio.sleep(e.retry_after)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "active": self.active,
+            "queued_now": len(self._queue),
+            "service_time_seconds": round(self._service_time, 3),
+        }
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    def _check_user(self, user_id: str) -> None:
+        if self._user_active.get(user_id, 0) >= self.user_concurrency:
+            self._reject("user_concurrency", self._service_time)
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            self._prune_buckets()
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        wait = bucket.take()
+        if wait:
+            self._reject("user_rate", wait)
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self.active < self.max_concurrency and not self._queue:
+            self.active += 1
+            self.counters["admitted"] += 1
+            return
+
+        if len(self._queue) >= self.queue_size:
+            worst = max(self._queue)
+            if worst[0] <= priority:
+                self._reject("queue_full", self._retry_after())
+            # Make room by shedding the lowest-priority, most recent waiter
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            self.counters["shed"] += 1
+            worst[2].set_exception(AdmissionRejected("shed", self._retry_after()))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [int(priority), next(self._seq), future]
+        heapq.heappush(self._queue, entry)
+        self.counters["queued"] += 1
+
+        try:
+            # The slot is handed over by _release, which also bumps `active`
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(entry)
+            self.counters["timeouts"] += 1
+            self._reject("queue_timeout", self._retry_after())
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+        self.counters["admitted"] += 1
+
+    def _release(self, held: float) -> None:
+        self._service_time = 0.9 * self._service_time + 0.1 * held
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)  # Slot passes straight to the waiter
+                return
+        self.active -= 1
+
+    def _abandon(self, entry: list) -> None:
+        """Drop a waiter that gave up; give the slot back if it was already handed over."""
+        future = entry[2]
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+        elif future.done() and not future.cancelled() and future.exception() is None:
+            self._release(0.0)
+        if not future.done():
+            future.cancel()
+
+    def _retry_after(self) -> float:
+        backlog = len(self._queue) + self.active
+        return self._service_time * backlog / max(1, self.max_concurrency)
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self.counters["rejected"] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def _prune_buckets(self) -> None:
+        if len(self._buckets) < self.max_tracked_users:
+            return
+        for user_id in [u for u, b in self._buckets.items() if b.full]:
+            if user_id not in self._user_active:
+                del self._buckets[user_id]
+
+
+admission_controller = AdmissionController(
+    max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8")),
+    queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", "32")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10")),
+    user_concurrency=int(os.getenv("ADMISSION_USER_CONCURRENCY", "2")),
+    user_rate=float(os.getenv("ADMISSION_USER_RATE", "0.5")),
+    user_burst=float(os.getenv("ADMISSION_USER_BURST", "5")),
+)
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Every cache registers itself by namespace, so invalidations and stats can find it
+_caches: Dict[str, "TwoTierCache"] = {}
+
+_INVALIDATION_CHANNEL = "neuradesk:cache:invalidate"
+_KEY_PREFIX = "neuradesk:cache"
+_MISS = object()
+_DEFAULT = object()
+
+
+class LocalLRU:
+    """Thread-safe LRU with a per-entry TTL, private to one process."""
+
+    def __init__(self, max_items: int = 1024, ttl: float = 60.0):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISS
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return _MISS
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class TwoTierCache:
+    """
+    Local LRU in front of a shared Redis-protocol store.
+
+    Reads check the process-local LRU, then the shared tier (promoting hits
+    into the LRU), then fall back to the loader. `invalidate` deletes the key
+    in both tiers and publishes it, so every other worker evicts its local
+    copy too. Local entries also expire on their own TTL, which bounds
+    staleness if an invalidation message is ever missed.
+
+    Without REDIS_URL the cache is local-only. Shared-tier errors are logged
+    and treated as misses; they never fail the caller.
+
+    Args:
+        namespace: Key prefix and registry name (one cache per namespace)
+        max_items: Local LRU capacity
+        local_ttl: Seconds a value stays in the local tier
+        shared_ttl: Seconds a value stays in the shared tier
+        codec: Module-like object with dumps/loads for the shared tier (e.g. json; never pickle)
+        shared: Redis-protocol client; defaults to the process client from REDIS_URL
+        on_invalidate: Called with the key whenever it is invalidated, by this worker
+            or another one; lets per-process state outside the cache follow along
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_items: int = 1024,
+        local_ttl: float = 60.0,
+        shared_ttl: float = 3600.0,
+        codec: Any = json,
+        shared: Any = _DEFAULT,
+        on_invalidate: Optional[Callable[[str], None]] = None,
+    ):
+        self.namespace = namespace
+        self.on_invalidate = on_invalidate
+        self.shared_ttl = shared_ttl
+        self.codec = codec
+        self.local = LocalLRU(max_items, local_ttl)
+        self.shared = _shared_client() if shared is _DEFAULT else shared
+        self.cache_id = uuid.uuid4().hex  # Lets the cache skip its own invalidations
+        self.counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "errors": 0}
+        _caches[namespace] = self
+        if self.shared is not None:
+            _attach(self)
+
+    # ── Sync API ─────────────────────────────────────────────────────
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None."""
+        value = self._get(self._key(key))
+        return None if value is _MISS else value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        cache_key = self._key(key)
+        self.local.set(cache_key, value)
+        self._shared_set(cache_key, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Evict key from this worker, the shared tier and every other worker."""
+        cache_key = self._key(key)
+        self._evict(cache_key)
+        if self.shared is None:
+            return
+        try:
+            self.shared.delete(cache_key)
+            message = {"sender": self.cache_id, "namespace": self.namespace, "key": cache_key}
+            self.shared.publish(_INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            self._shared_error(e)
+
+    def get_or_load_sync(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        cache_key = self._key(key)
+        value = self._get(cache_key)
+        if value is _MISS:
+            value = loader()
+            if value is not None:
+                self.local.set(cache_key, value)
+                self._shared_set(cache_key, value)
+        return value
+
+    # ── Async API ────────────────────────────────────────────────────
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Like get_or_load_sync, with shared-tier I/O moved off the event loop."""
+        cache_key = self._key(key)
+        value = self.local.get(cache_key)
+        if value is not _MISS:
+            self.counters["local_hits"] += 1
+            return value
+
+        value = await asyncio.to_thread(self._get_shared, cache_key)
+        if value is _MISS:
+            value = await loader()
+            if value is not None:
+                self.local.set(cache_key, value)
+                await asyncio.to_thread(self._shared_set, cache_key, value)
+        return value
+
+    async def ainvalidate(self, key: Hashable) -> None:
+        await asyncio.to_thread(self.invalidate, key)
+
+    def stats(self) -> dict:
+        return {**self.counters, "shared": self.shared is not None}
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    def _key(self, key: Hashable) -> str:
+        return f"{_KEY_PREFIX}:{self.namespace}:{key}"
+
+    def _evict(self, cache_key: str) -> None:
+        self.local.delete(cache_key)
+        if self.on_invalidate is None:
+            return
+        try:
+            self.on_invalidate(cache_key.removeprefix(f"{_KEY_PREFIX}:{self.namespace}:"))
+        except Exception as e:
+            print(f"[CACHE] on_invalidate hook of '{self.namespace}' failed: {e}")
+
+    def _get(self, cache_key: str) -> Any:
+        value = self.local.get(cache_key)
+        if value is not _MISS:
+            self.counters["local_hits"] += 1
+            return value
+        return self._get_shared(cache_key)
+
+    def _get_shared(self, cache_key: str) -> Any:
+        """Shared-tier lookup; hits are promoted into the local LRU."""
+        if self.shared is None:
+            self.counters["misses"] += 1
+            return _MISS
+        try:
+            raw = self.shared.get(cache_key)
+        except Exception as e:
+            self._shared_error(e)
+            raw = None
+        if raw is None:
+            self.counters["misses"] += 1
+            return _MISS
+
+        try:
+            value = self.codec.loads(raw)
+        except Exception as e:
+            # Written by an older codec; the loader replaces it
+            self._shared_error(e)
+            self.counters["misses"] += 1
+            return _MISS
+        self.local.set(cache_key, value)
+        self.counters["shared_hits"] += 1
+        return value
+
+    def _shared_set(self, cache_key: str, value: Any) -> None:
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(cache_key, self.codec.dumps(value), ex=int(self.shared_ttl))
+        except Exception as e:
+            self._shared_error(e)
+
+    def _shared_error(self, error: Exception) -> None:
+        self.counters["errors"] += 1
+        print(f"[CACHE] Shared tier error in '{self.namespace}': {error}")
+
+
+def get_cache(namespace: str, **options) -> TwoTierCache:
+    """The cache registered under namespace, created with options on first use."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = TwoTierCache(namespace, **options)
+    return cache
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Hit/miss counters of every cache, keyed by namespace."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+# ── Shared Tier ──────────────────────────────────────────────────────
+
+_client = None
+_client_lock = threading.Lock()
+_subscribers: Dict[int, list] = {}  # id(client) -> caches listening through it
+
+
+def _shared_client():
+    """
+    Process-wide Redis client from REDIS_URL, or None for local-only caching.
+
+    `fakeredis://` selects an in-process fakeredis server for tests; to act
+    out several workers, give each cache its own FakeRedis client on one
+    FakeServer through the `shared` argument.
+    """
+    global _client
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+
+    with _client_lock:
+        if _client is not None:
+            return _client
+        if url.startswith("fakeredis://"):
+            import fakeredis
+
+            _client = fakeredis.FakeRedis()
+        else:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("REDIS_URL is set but redis is missing: pip install redis") from e
+            _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+        print(f"[CACHE] Shared tier enabled ({url.split('@')[-1]})")
+        return _client
+
+
+def _attach(cache: TwoTierCache) -> None:
+    """Route invalidations published by other caches to this cache's local tier."""
+    client = cache.shared
+    with _client_lock:
+        caches = _subscribers.get(id(client))
+        if caches is not None:
+            caches.append(cache)
+            return
+        caches = _subscribers[id(client)] = [cache]
+
+    def on_message(message: dict) -> None:
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        namespace, sender = payload.get("namespace"), payload.get("sender")
+        for subscriber in list(caches):
+            if subscriber.namespace == namespace and subscriber.cache_id != sender:
+                subscriber._evict(payload["key"])
+
+    try:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{_INVALIDATION_CHANNEL: on_message})
+        pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+    except Exception as e:
+        print(f"[CACHE] Invalidation listener unavailable, relying on local TTLs: {e}")
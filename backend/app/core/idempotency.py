@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.core.cache import get_cache
+from app.core.singleflight import SingleFlight
+
+load_dotenv()
+
+_LOCK_PREFIX = "neuradesk:idempotency:lock"
+_MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key cannot be honoured (reused for another request, or still running)."""
+
+    def __init__(self, detail: str, status_code: int = 409, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable hash of the request fields a key must always be sent with."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Run a request at most once per client-supplied idempotency key.
+
+    Duplicates are resolved in three layers:
+        in flight, same worker    coalesced onto the first call (SingleFlight)
+        in flight, other worker   a short lease in the shared store marks the key
+                                  as running; the duplicate polls for the result
+        completed                 the stored response is replayed until `ttl` expires
+
+    Keys are scoped per user and bound to a request fingerprint: the same key
+    sent with a different body is rejected (422) instead of replaying an
+    unrelated answer. Failed calls store nothing and release the lease, so the
+    client's next retry runs the request again.
+
+    Without REDIS_URL responses are remembered per worker only.
+
+    Args:
+        ttl: Seconds a completed response is replayed
+        lease_seconds: Upper bound on one execution; a crashed worker's lease expires after it
+        wait_seconds: How long a duplicate waits on another worker before answering 409
+        poll_seconds: Interval between checks while waiting
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400.0,
+        lease_seconds: float = 120.0,
+        wait_seconds: float = 30.0,
+        poll_seconds: float = 0.25,
+    ):
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self.responses = get_cache("idempotency", local_ttl=min(ttl, 300.0), shared_ttl=ttl)
+        self.counters = {"executed": 0, "replayed": 0, "waited": 0, "conflicts": 0}
+        self._flight = SingleFlight("idempotency")
+        # Fingerprint of the call each in-flight key is running on this worker
+        self._running: Dict[str, str] = {}
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        fn: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Await fn() once per (scope, key); duplicates get the same JSON-serializable result."""
+        if not key or len(key) > _MAX_KEY_LENGTH:
+            raise IdempotencyConflict(
+                f"Idempotency key must be 1-{_MAX_KEY_LENGTH} characters", status_code=422
+            )
+        entry_key = f"{scope}:{key}"
+        # Coalesced callers get the leader's result, so they must be the same request
+        running = self._running.get(entry_key)
+        if running is not None and running != fingerprint:
+            raise self._mismatch()
+        return await self._flight.do(entry_key, self._run_once, entry_key, fingerprint, fn)
+
+    def stats(self) -> dict:
+        return {**self.counters, "coalesced": self._flight.stats()["coalesced"]}
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    async def _run_once(self, entry_key: str, fingerprint: str, fn) -> Any:
+        self._running[entry_key] = fingerprint
+        try:
+            return await self._run_leased(entry_key, fingerprint, fn)
+        finally:
+            self._running.pop(entry_key, None)
+
+    async def _run_leased(self, entry_key: str, fingerprint: str, fn) -> Any:
+        deadline = time.monotonic() + self.wait_seconds
+        owner = uuid.uuid4().hex
+        while True:
+            stored = await asyncio.to_thread(self.responses.get, entry_key)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+            if await asyncio.to_thread(self._acquire, entry_key, owner):
+                break
+            if time.monotonic() >= deadline:
+                self.counters["conflicts"] += 1
+                raise IdempotencyConflict(
+                    "A request with this idempotency key is still in progress",
+                    retry_after=self.poll_seconds * 4,
+                )
+            self.counters["waited"] += 1
+            await asyncio.sleep(self.poll_seconds)
+
+        try:
+            result = await fn()
+            self.counters["executed"] += 1
+            entry = {"fingerprint": fingerprint, "response": result}
+            await asyncio.to_thread(self.responses.set, entry_key, entry)
+            return result
+        finally:
+            await asyncio.to_thread(self._release, entry_key, owner)
+
+    def _replay(self, stored: dict, fingerprint: str) -> Any:
+        if stored["fingerprint"] != fingerprint:
+            raise self._mismatch()
+        self.counters["replayed"] += 1
+        return stored["response"]
+
+    def _mismatch(self) -> IdempotencyConflict:
+        self.counters["conflicts"] += 1
+        return IdempotencyConflict(
+            "Idempotency key was already used for a different request", status_code=422
+        )
+
+    def _acquire(self, entry_key: str, owner: str) -> bool:
+        """Take the cross-worker lease; always granted when there is no shared store."""
+        shared = self.responses.shared
+        if shared is None:
+            return True
+        try:
+            lock_key = f"{_LOCK_PREFIX}:{entry_key}"
+            return bool(shared.set(lock_key, owner, nx=True, ex=int(self.lease_seconds)))
+        except Exception as e:
+            print(f"[IDEMPOTENCY] Lease unavailable, running without it: {e}")
+            return True
+
+    def _release(self, entry_key: str, owner: str) -> None:
+        shared = self.responses.shared
+        if shared is None:
+            return
+        lock_key = f"{_LOCK_PREFIX}:{entry_key}"
+        try:
+            holder = shared.get(lock_key)
+            if holder is not None and holder.decode() == owner:
+                shared.delete(lock_key)
+        except Exception as e:
+            print(f"[IDEMPOTENCY] Could not release lease (expires on its own): {e}")
+
+
+idempotency_store = IdempotencyStore(
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+    lease_seconds=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120")),
+    wait_seconds=float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30")),
+)
@@ -0,0 +1,30 @@
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def json_response(
+    value: Any,
+    adapter: Optional[TypeAdapter] = None,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serialize already-validated models straight to JSON bytes.
+
+    Returning a Response makes FastAPI skip `response_model` (which would
+    dump every model to a dict, validate it again and re-encode it on the
+    event loop); the route's response_model still documents the schema.
+    Lists go through their TypeAdapter (e.g. MemoryFactList) in one
+    pydantic-core call, single models through model_dump_json.
+    """
+    if adapter is not None:
+        content = adapter.dump_json(value)
+    elif isinstance(value, BaseModel):
+        content = value.model_dump_json()
+    else:
+        raise TypeError("json_response needs a model or an adapter for the value")
+    return Response(
+        content=content, status_code=status_code, headers=headers, media_type="application/json"
+    )
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Every group registers itself so its counters can be reported in one place
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for the same result (or exception) instead of repeating it.
+    Nothing is cached once the call completes.
+
+    Works for coroutines (`do`) and for blocking functions called from worker
+    threads (`do_sync`).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._inflight_sync: Dict[Hashable, "_Call"] = {}
+        _groups[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs), sharing the result with concurrent callers of key."""
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                self.executions += 1
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def do_sync(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn(*args, **kwargs), sharing the result with concurrent threads calling key."""
+        with self._lock:
+            self.calls += 1
+            call = self._inflight_sync.get(key)
+            if call is None:
+                call = _Call()
+                self._inflight_sync[key] = call
+                self.executions += 1
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            return call.wait()
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight_sync.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        """Counters: calls received, executions actually run, and calls deduplicated."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def singleflight_stats() -> Dict[str, dict]:
+    """Counters of every coalescing group, keyed by group name."""
+    return {name: group.stats() for name, group in _groups.items()}
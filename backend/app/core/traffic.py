@@ -0,0 +1,395 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import inspect
+import itertools
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_UUID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+_WORD = re.compile(r"[^\W_]+")
+
+# Enum-like values the code branches on are kept verbatim
+_KEEP_FIELDS = {"category", "role", "last_message_role", "tier", "status", "kind", "model"}
+# Key prefixes the memory code parses (project_<name>, ..._milestone_<n>)
+_KEEP_WORDS = {"project", "milestone"}
+# Number lists this long are embeddings: replaced, only their size is kept
+_VECTOR_MIN_SIZE = 64
+
+
+# ── Anonymization ────────────────────────────────────────────────────
+
+
+class Anonymizer:
+    """
+    Deterministic, shape-preserving pseudonyms for captured traffic.
+
+    Ids map to ids of the same form, every word of free text to a keyed
+    pseudo-word of the same length and character classes, and embeddings to
+    pseudo-random vectors of the same size. The same id or word maps to the
+    same pseudonym across a capture, so joins, cache keys and repeated
+    messages keep their shape, while the text cannot be read back without
+    the salt. JSON inside text (classifier answers) keeps its structure.
+    """
+
+    def __init__(self, salt: str):
+        self._salt = salt.encode("utf-8")
+
+    def scrub(self, value: Any, field: Optional[str] = None) -> Any:
+        if isinstance(value, dict):
+            return {k: self.scrub(v, k) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            if len(value) >= _VECTOR_MIN_SIZE and all(isinstance(v, float) for v in value):
+                return self.vector(value)
+            return [self.scrub(v, field) for v in value]
+        if not isinstance(value, str) or field in _KEEP_FIELDS:
+            return value
+        if _UUID.match(value) or (field and (field == "id" or field.endswith("_id"))):
+            return self.pseudonym(value)
+        if _TIMESTAMP.match(value):
+            return value
+        return self.text(value)
+
+    def pseudonym(self, value: str) -> str:
+        digest = self._digest(value)
+        if _UUID.match(value):
+            return str(uuid.UUID(bytes=digest[:16], version=4))
+        return f"anon-{digest.hex()[:12]}"
+
+    def text(self, value: str) -> str:
+        start, end = value.find("{"), value.rfind("}")
+        if 0 <= start < end:
+            try:
+                inner = json.dumps(self.scrub(json.loads(value[start : end + 1])))
+            except ValueError:
+                pass
+            else:
+                return self._words(value[:start]) + inner + self._words(value[end + 1 :])
+        return self._words(value)
+
+    def vector(self, values: List[float]) -> List[float]:
+        rng = random.Random(self._digest(json.dumps(values[:8])))
+        return [round(rng.gauss(0.0, 0.05), 6) for _ in values]
+
+    def _words(self, value: str) -> str:
+        return _WORD.sub(lambda m: self._word(m.group()), value)
+
+    def _word(self, word: str) -> str:
+        if word.lower() in _KEEP_WORDS:
+            return word
+        chars = []
+        for ch, byte in zip(word, itertools.cycle(self._digest(word))):
+            if ch.isdigit():
+                chars.append(str(byte % 10))
+            elif ch.isupper():
+                chars.append(chr(ord("A") + byte % 26))
+            else:
+                chars.append(chr(ord("a") + byte % 26))
+        return "".join(chars)
+
+    def _digest(self, value: str) -> bytes:
+        return hmac.new(self._salt, value.encode("utf-8"), hashlib.sha256).digest()
+
+
+# ── Capture ──────────────────────────────────────────────────────────
+
+
+class _Flow:
+    """Events of one captured request, appended from any thread it fans out to."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, event: dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+
+# Flow being captured / replayed by the current request (follows asyncio.to_thread)
+_capture: ContextVar[Optional[_Flow]] = ContextVar("traffic_capture", default=None)
+_replay: ContextVar[Optional["ReplayFlow"]] = ContextVar("traffic_replay", default=None)
+
+
+class TrafficRecorder:
+    """
+    Captures request flows for deterministic replay (see app.cli.replay).
+
+    When `path` is set, a `sample_rate` fraction of the calls to methods
+    decorated with `flow` is captured: the call's arguments, then every
+    database query, RPC, LLM and embedding call it makes, with responses,
+    start offsets and durations. Flows are anonymized (see Anonymizer) and
+    appended to `path` as JSON lines when the call returns. A `{pid}` in
+    the path gives every worker process its own file.
+
+    Args:
+        path: JSONL file to append flows to; capture is off without it
+        sample_rate: Fraction of flows captured
+        salt: Pseudonym key; set it to keep pseudonyms stable across workers
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, sample_rate: float = 1.0, salt: Optional[str] = None
+    ):
+        self.path = path.replace("{pid}", str(os.getpid())) if path else None
+        self.sample_rate = sample_rate
+        self.anonymizer = Anonymizer(salt or secrets.token_hex(16))
+        self.counters = {"flows": 0, "events": 0, "write_errors": 0}
+        self._write_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def flow(self, fn: Callable) -> Callable:
+        """Decorate an async entry point (e.g. ChatService.get_response) to capture its calls."""
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if (
+                not self.enabled
+                or _capture.get() is not None
+                or random.random() >= self.sample_rate
+            ):
+                return await fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            record = {
+                "kind": fn.__qualname__,
+                "at": time.time(),
+                "args": {k: v for k, v in bound.arguments.items() if k != "self"},
+                "error": None,
+            }
+            flow = _Flow()
+            token = _capture.set(flow)
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                _capture.reset(token)
+                record["seconds"] = round(time.monotonic() - flow.started, 4)
+                record["events"] = sorted(flow.events, key=lambda e: e["offset"])
+                await asyncio.to_thread(self._write, record)
+
+        return wrapper
+
+    def capture(
+        self,
+        stage: str,
+        name: str,
+        response: Any,
+        started: float,
+        error: Optional[str] = None,
+    ) -> None:
+        """Add a call that began at monotonic `started` to the current flow, if any."""
+        flow = _capture.get()
+        if flow is None:
+            return
+        flow.add(
+            {
+                "stage": stage,
+                "name": name,
+                "offset": round(started - flow.started, 4),
+                "seconds": round(time.monotonic() - started, 4),
+                "response": response,
+                "error": error,
+            }
+        )
+
+    def wrap_client(self, client):
+        """Record the queries of a Supabase client (returned as-is when capture is off)."""
+        return _RecordingClient(client, self) if self.enabled else client
+
+    def stats(self) -> dict:
+        return {**self.counters, "enabled": self.enabled, "path": self.path}
+
+    def _write(self, record: dict) -> None:
+        scrub = self.anonymizer.scrub
+        record["args"] = scrub(record["args"])
+        record["events"] = [{**e, "response": scrub(e["response"])} for e in record["events"]]
+        try:
+            line = json.dumps(record, default=str)
+            with self._write_lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            self.counters["write_errors"] += 1
+            print(f"[TRAFFIC ERROR] Could not write flow: {e}")
+            return
+        self.counters["flows"] += 1
+        self.counters["events"] += len(record["events"])
+
+
+def _stage(shape: str) -> str:
+    return "rpc" if shape.startswith("rpc:") else "db"
+
+
+class _RecordingQuery:
+    """
+    Wraps a postgrest query builder, tracking the chain of attributes used
+    to build it (its shape, e.g. "table:messages.select.eq.order"); replay
+    matches queries by shape, not by argument values.
+    """
+
+    def __init__(self, builder, shape: str, recorder: TrafficRecorder):
+        self._builder = builder
+        self._shape = shape
+        self._recorder = recorder
+
+    def __getattr__(self, attr: str):
+        target = getattr(self._builder, attr)
+        shape = f"{self._shape}.{attr}"
+        if not callable(target):
+            return _RecordingQuery(target, shape, self._recorder)
+
+        def call(*args, **kwargs):
+            return _RecordingQuery(target(*args, **kwargs), shape, self._recorder)
+
+        return call
+
+    def execute(self):
+        started = time.monotonic()
+        try:
+            result = self._builder.execute()
+        except Exception as e:
+            self._recorder.capture(_stage(self._shape), self._shape, None, started, str(e))
+            raise
+        response = {"data": result.data, "count": getattr(result, "count", None)}
+        self._recorder.capture(_stage(self._shape), self._shape, response, started)
+        return result
+
+
+class _RecordingClient:
+    def __init__(self, client, recorder: TrafficRecorder):
+        self._client = client
+        self._recorder = recorder
+
+    def table(self, name: str):
+        return _RecordingQuery(self._client.table(name), f"table:{name}", self._recorder)
+
+    def rpc(self, name: str, *args, **kwargs):
+        return _RecordingQuery(
+            self._client.rpc(name, *args, **kwargs), f"rpc:{name}", self._recorder
+        )
+
+    def __getattr__(self, attr: str):
+        return getattr(self._client, attr)
+
+
+traffic_recorder = TrafficRecorder(
+    path=os.getenv("TRAFFIC_CAPTURE_PATH") or None,
+    sample_rate=float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0")),
+    salt=os.getenv("TRAFFIC_CAPTURE_SALT") or None,
+)
+
+
+# ── Replay ───────────────────────────────────────────────────────────
+
+
+class ReplayFlow:
+    """
+    Recorded responses of one flow for the stand-ins to hand back.
+
+    Responses are matched by stage and name (query shape or model) and
+    handed out in recorded order. Each call sleeps its recorded duration
+    divided by `speed`; speed 0 skips the waits. Calls with no recorded
+    response left are counted as misses: a high count means the code path
+    has diverged from the one captured.
+    """
+
+    def __init__(self, events: List[dict], speed: float = 1.0):
+        self.speed = speed
+        self.misses = 0
+        self.waited = 0.0
+        self._queues: Dict[tuple, deque] = defaultdict(deque)
+        for event in events:
+            self._queues[(event["stage"], event["name"])].append(event)
+        self._lock = threading.Lock()
+
+    def take(self, stage: str, name: str) -> Optional[dict]:
+        """The next recorded response for the call, after its recorded delay."""
+        with self._lock:
+            queue = self._queues.get((stage, name))
+            event = queue.popleft() if queue else None
+            if event is None:
+                self.misses += 1
+                return None
+            delay = event["seconds"] / self.speed if self.speed > 0 else 0.0
+            self.waited += delay
+        time.sleep(delay)
+        if event.get("error"):
+            raise RuntimeError(f"Recorded failure: {event['error']}")
+        return event
+
+    @property
+    def unused(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+
+@contextmanager
+def replaying(flow: ReplayFlow):
+    """Serve stand-in calls made in this block (and threads it starts) from `flow`."""
+    token = _replay.set(flow)
+    try:
+        yield flow
+    finally:
+        _replay.reset(token)
+
+
+def current_replay() -> Optional[ReplayFlow]:
+    return _replay.get()
+
+
+class _ReplayQuery:
+    """Stand-in query builder: any chain of calls, answered from the replayed flow."""
+
+    def __init__(self, shape: str):
+        self._shape = shape
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return _ReplayQuery(f"{self._shape}.{attr}")
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        flow = _replay.get()
+        # Calls outside a flow (usage flushes, warm-ups) were never captured
+        event = flow.take(_stage(self._shape), self._shape) if flow else None
+        if event is None:
+            return SimpleNamespace(data=[], count=None)
+        return SimpleNamespace(data=event["response"]["data"], count=event["response"]["count"])
+
+
+class ReplayClient:
+    """Stand-in for the Supabase client that answers from recorded flows."""
+
+    def table(self, name: str) -> _ReplayQuery:
+        return _ReplayQuery(f"table:{name}")
+
+    def rpc(self, name: str, *args, **kwargs) -> _ReplayQuery:
+        return _ReplayQuery(f"rpc:{name}")
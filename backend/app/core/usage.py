@@ -0,0 +1,315 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.core.admission import AdmissionRejected
+from app.core.cache import get_cache
+
+load_dotenv()
+
+ANONYMOUS = "anonymous"
+
+# User the current request's model calls are billed to (follows asyncio.to_thread)
+_usage_user: ContextVar[Optional[str]] = ContextVar("usage_user", default=None)
+
+# (user_id, feature, model, bucket_start)
+BucketKey = Tuple[str, str, str, str]
+
+
+def attribute_usage(user_id: str) -> None:
+    """Bill model calls made from here on in the current request/task to user_id."""
+    _usage_user.set(user_id)
+
+
+def _parse_prices(raw: str) -> Dict[str, Tuple[float, float]]:
+    """LLM_PRICES: {"model-id": [input_usd, output_usd], ...} per million tokens."""
+    if not raw:
+        return {}
+    try:
+        return {model: (float(p[0]), float(p[1])) for model, p in json.loads(raw).items()}
+    except (ValueError, TypeError, IndexError) as e:
+        print(f"[USAGE] Ignoring invalid LLM_PRICES: {e}")
+        return {}
+
+
+def _new_bucket() -> dict:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "slow_calls": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cost_usd": 0.0,
+        "seconds_total": 0.0,
+        "seconds_max": 0.0,
+    }
+
+
+class UsageAggregator:
+    """
+    Per-user token, latency and cost accounting for model calls.
+
+    LLMService records every chat, classification and embedding call here
+    (tokens, model, wall time, error). Calls are summed in memory into hourly
+    buckets per (user, feature, model), and a daemon thread adds the buckets
+    to the llm_usage table every `flush_seconds` in one RPC, so the request
+    path never waits on a write. A failed flush merges its batch back into
+    the pending buckets for the next attempt; when more than `max_buckets`
+    are pending the oldest are dropped and counted.
+
+    Quotas: with `daily_token_quota` set, `enforce_quota` rejects a user's
+    request (AdmissionRejected, HTTP 429 until UTC midnight) once their
+    tokens today, as stored plus this worker's unflushed calls, reach it.
+    The stored total is cached for `quota_refresh_seconds`, so the check is
+    approximate by design: it throttles heavy users without a query per call.
+
+    Args:
+        prices: {model: (input_usd, output_usd)} per million tokens; unpriced models cost 0
+        flush_seconds: Interval between batched writes
+        max_buckets: Pending buckets kept while the database is unreachable
+        slow_seconds: Calls at least this long count as slow_calls
+        daily_token_quota: Tokens per user per UTC day; 0 disables quotas
+        quota_refresh_seconds: How long a user's stored daily total is reused
+    """
+
+    def __init__(
+        self,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+        flush_seconds: float = 30.0,
+        max_buckets: int = 10000,
+        slow_seconds: float = 10.0,
+        daily_token_quota: int = 0,
+        quota_refresh_seconds: float = 60.0,
+    ):
+        self.prices = prices or {}
+        self.flush_seconds = flush_seconds
+        self.max_buckets = max_buckets
+        self.slow_seconds = slow_seconds
+        self.daily_token_quota = daily_token_quota
+        self.counters = {
+            "calls": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "flush_errors": 0,
+            "dropped_buckets": 0,
+            "quota_rejections": 0,
+        }
+        self._pending: Dict[BucketKey, dict] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._repository = None
+        self._daily_tokens = get_cache(
+            "usage_quota", local_ttl=quota_refresh_seconds, shared_ttl=quota_refresh_seconds
+        )
+
+    def record(
+        self,
+        feature: str,
+        model: str,
+        usage: Optional[dict],
+        seconds: float,
+        error: bool = False,
+    ) -> None:
+        """Add one model call to the current user's bucket (usage in Langfuse input/output form)."""
+        input_tokens = (usage or {}).get("input", 0)
+        output_tokens = (usage or {}).get("output", 0)
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        key = (_usage_user.get() or ANONYMOUS, feature, model, _bucket_start())
+
+        with self._lock:
+            bucket = self._pending.get(key)
+            if bucket is None:
+                bucket = self._pending[key] = _new_bucket()
+                self._evict_overflow()
+            bucket["calls"] += 1
+            bucket["errors"] += int(error)
+            bucket["slow_calls"] += int(seconds >= self.slow_seconds)
+            bucket["input_tokens"] += input_tokens
+            bucket["output_tokens"] += output_tokens
+            bucket["cost_usd"] += (
+                input_tokens * input_price + output_tokens * output_price
+            ) / 1_000_000
+            bucket["seconds_total"] += seconds
+            bucket["seconds_max"] = max(bucket["seconds_max"], seconds)
+            self.counters["calls"] += 1
+        self._ensure_worker()
+
+    async def enforce_quota(self, user_id: str) -> None:
+        """Raise AdmissionRejected("quota") once the user has used up today's tokens."""
+        if self.daily_token_quota <= 0:
+            return
+        day_start = _day_start()
+        stored = await self._daily_tokens.get_or_load(
+            f"{user_id}:{day_start.date()}",
+            lambda: self._load_daily_tokens(user_id, day_start),
+        )
+        if stored + self._pending_tokens(user_id, day_start) < self.daily_token_quota:
+            return
+        with self._lock:
+            self.counters["quota_rejections"] += 1
+        retry_after = (day_start + timedelta(days=1) - datetime.now(timezone.utc)).total_seconds()
+        raise AdmissionRejected("quota", retry_after)
+
+    def forget_user(self, user_id: str) -> None:
+        """Drop the user's unflushed buckets, so a purged account's usage is not written back."""
+        with self._lock:
+            for key in [k for k in self._pending if k[0] == user_id]:
+                del self._pending[key]
+
+    def flush(self) -> None:
+        """Write every pending bucket now (also used on shutdown)."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        rows = [
+            {
+                "user_id": user_id,
+                "feature": feature,
+                "model": model,
+                "bucket_start": bucket_start,
+                **{k: round(v, 6) if isinstance(v, float) else v for k, v in bucket.items()},
+            }
+            for (user_id, feature, model, bucket_start), bucket in batch.items()
+        ]
+        try:
+            self._repo().record_batch(rows)
+        except Exception as e:
+            print(f"[USAGE] Flush of {len(rows)} buckets failed, keeping them: {e}")
+            with self._lock:
+                self.counters["flush_errors"] += 1
+                self._merge_back(batch)
+            return
+        with self._lock:
+            self.counters["flushes"] += 1
+            self.counters["rows_written"] += len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "pending_buckets": len(self._pending),
+                "quota": self.daily_token_quota,
+            }
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="usage-flush", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def _merge_back(self, batch: Dict[BucketKey, dict]) -> None:
+        """Fold a failed batch into the buckets recorded since it was taken (lock held)."""
+        for key, old in batch.items():
+            bucket = self._pending.get(key)
+            if bucket is None:
+                self._pending[key] = old
+                continue
+            for field, value in old.items():
+                if field == "seconds_max":
+                    bucket[field] = max(bucket[field], value)
+                else:
+                    bucket[field] += value
+        self._evict_overflow()
+
+    def _evict_overflow(self) -> None:
+        """Drop the oldest buckets beyond max_buckets (lock held)."""
+        overflow = len(self._pending) - self.max_buckets
+        if overflow <= 0:
+            return
+        for key in sorted(self._pending, key=lambda k: k[3])[:overflow]:
+            del self._pending[key]
+        self.counters["dropped_buckets"] += overflow
+
+    def _pending_tokens(self, user_id: str, day_start: datetime) -> int:
+        since = day_start.isoformat()
+        with self._lock:
+            return sum(
+                b["input_tokens"] + b["output_tokens"]
+                for (uid, _, _, bucket_start), b in self._pending.items()
+                if uid == user_id and bucket_start >= since
+            )
+
+    async def _load_daily_tokens(self, user_id: str, day_start: datetime) -> int:
+        try:
+            return await self._repo().get_tokens_since(user_id, day_start)
+        except Exception as e:
+            # Fail open: a usage table outage must not block chat
+            print(f"[USAGE] Could not load daily tokens for {user_id}: {e}")
+            return 0
+
+    def _repo(self):
+        if self._repository is None:
+            from app.database.repositories.usage import UsageRepository
+
+            self._repository = UsageRepository()
+        return self._repository
+
+
+def _bucket_start() -> str:
+    now = datetime.now(timezone.utc)
+    return now.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _day_start() -> datetime:
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def summarize_usage(rows: List[dict]) -> dict:
+    """Totals per feature and per model for a list of llm_usage rows."""
+    totals = _new_bucket()
+    by_feature: Dict[str, dict] = defaultdict(_new_bucket)
+    by_model: Dict[str, dict] = defaultdict(_new_bucket)
+    for row in rows:
+        for group in (totals, by_feature[row["feature"]], by_model[row["model"]]):
+            for field in group:
+                value = float(row.get(field) or 0)
+                if field == "seconds_max":
+                    group[field] = max(group[field], value)
+                else:
+                    group[field] += value
+    return {
+        "totals": _finish(totals),
+        "by_feature": {k: _finish(v) for k, v in by_feature.items()},
+        "by_model": {k: _finish(v) for k, v in by_model.items()},
+    }
+
+
+def _finish(bucket: dict) -> dict:
+    calls = int(bucket["calls"])
+    return {
+        "calls": calls,
+        "errors": int(bucket["errors"]),
+        "slow_calls": int(bucket["slow_calls"]),
+        "input_tokens": int(bucket["input_tokens"]),
+        "output_tokens": int(bucket["output_tokens"]),
+        "cost_usd": round(bucket["cost_usd"], 6),
+        "seconds_avg": round(bucket["seconds_total"] / calls, 4) if calls else 0.0,
+        "seconds_max": round(bucket["seconds_max"], 4),
+    }
+
+
+usage_aggregator = UsageAggregator(
+    prices=_parse_prices(os.getenv("LLM_PRICES", "")),
+    flush_seconds=float(os.getenv("USAGE_FLUSH_SECONDS", "30")),
+    max_buckets=int(os.getenv("USAGE_MAX_BUCKETS", "10000")),
+    slow_seconds=float(os.getenv("USAGE_SLOW_SECONDS", "10")),
+    daily_token_quota=int(os.getenv("USAGE_DAILY_TOKEN_QUOTA", "0")),
+    quota_refresh_seconds=float(os.getenv("USAGE_QUOTA_REFRESH_SECONDS", "60")),
+)
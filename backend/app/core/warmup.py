@@ -0,0 +1,49 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict
+
+
+class WarmUp:
+    """
+    Runs startup warm-up steps in parallel and tracks readiness.
+
+    Each step is a plain function (run on a worker thread) or a coroutine
+    function, bounded by `timeout`. A failing step is recorded, not raised:
+    the worker keeps serving and the readiness endpoint reports which step
+    is unhealthy.
+    """
+
+    def __init__(self, steps: Dict[str, Callable[[], Any]], timeout: float = 30.0):
+        self.steps = steps
+        self.timeout = timeout
+        self.results: Dict[str, dict] = {name: {"status": "pending"} for name in steps}
+        self.seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return all(r["status"] == "ok" for r in self.results.values())
+
+    async def run(self) -> bool:
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self.steps.items()))
+        self.seconds = round(time.perf_counter() - started, 3)
+        print(f"[WARMUP] Finished in {self.seconds}s (ready={self.ready})")
+        return self.ready
+
+    def status(self) -> dict:
+        return {"ready": self.ready, "seconds": self.seconds, "steps": self.results}
+
+    async def _run_step(self, name: str, step: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        try:
+            work = step() if inspect.iscoroutinefunction(step) else asyncio.to_thread(step)
+            await asyncio.wait_for(work, timeout=self.timeout)
+            result = {"status": "ok"}
+        except asyncio.TimeoutError:
+            result = {"status": "timeout"}
+        except Exception as e:
+            result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            print(f"[WARMUP] Step '{name}' failed: {e}")
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        self.results[name] = result
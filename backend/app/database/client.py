@@ -1,8 +1,13 @@
-from supabase import create_client, Client
 import os
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
 
+from app.core.traffic import traffic_recorder
+
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -11,22 +16,24 @@ class SupabaseClient:
     """
     Centralized Supabase client service for the backend.
     Provides a singleton instance for database operations.
+
+    The client is created on first use (or during startup warm-up), so
+    importing the app works without credentials or a reachable database.
     """
 
     _instance: Optional["SupabaseClient"] = None
-    _client: Optional[Client] = None
+    _client: Optional["Client"] = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if self._client is None:
-            self._initialize_client()
-
     def _initialize_client(self):
         """Initialize the Supabase client with environment variables."""
+        from supabase import create_client
+
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
 
@@ -36,15 +43,22 @@ class SupabaseClient:
                 "Please set SUPABASE_URL and SUPABASE_SERVICE_KEY in your .env file"
             )
 
-        self._client = create_client(supabase_url, supabase_key)
+        # Queries are captured for replay when TRAFFIC_CAPTURE_PATH is set
+        self._client = traffic_recorder.wrap_client(create_client(supabase_url, supabase_key))
 
     @property
-    def client(self) -> Client:
+    def client(self) -> "Client":
         """Get the Supabase client instance."""
         if self._client is None:
-            self._initialize_client()
+            with self._lock:
+                if self._client is None:
+                    self._initialize_client()
         return self._client
 
+    def ping(self) -> None:
+        """Cheap round trip that creates the client and opens its connection pool."""
+        self.client.table("conversations").select("id").limit(1).execute()
+
     def get_table(self, table_name: str):
         """
         Get a reference to a Supabase table.
@@ -62,7 +76,7 @@ class SupabaseClient:
 supabase_client = SupabaseClient()
 
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """
     Get the Supabase client instance.
     Convenience function for dependency injection.
@@ -0,0 +1,97 @@
+from typing import Iterator, List, Optional
+
+from app.database.client import supabase_client
+
+
+class BulkRepository:
+    """
+    Table-agnostic bulk access for exports, imports and backfills.
+    Streams rows page by page and writes them back in chunked upserts.
+    """
+
+    def __init__(self, page_size: int = 1000, chunk_size: int = 500):
+        self.client = supabase_client.client
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+
+    def iter_rows(
+        self,
+        table_name: str,
+        eq: Optional[dict] = None,
+        in_: Optional[tuple] = None,
+        gt: Optional[dict] = None,
+        gte: Optional[dict] = None,
+        order: str = "id",
+    ) -> Iterator[List[dict]]:
+        """
+        Yield pages of rows matching the filters.
+
+        Pages are cut by keyset on `order` (each page starts after the last
+        value of the previous one), so rows deleted or inserted mid-run never
+        shift later pages and make the walk skip or repeat rows.
+
+        Args:
+            table_name: Table to read from.
+            eq: Column -> value equality filters.
+            in_: Optional (column, values) membership filter.
+            gt: Column -> value strict lower bounds (e.g. resume after an id).
+            gte: Column -> value inclusive lower bounds (e.g. updated since).
+            order: Unique column the pages are ordered and cut by.
+        """
+        gt = dict(gt or {})
+        while True:
+            query = self._filtered(self.client.table(table_name).select("*"), eq, in_, gt, gte)
+            result = query.order(order).limit(self.page_size).execute()
+
+            if result.data:
+                yield result.data
+            if len(result.data) < self.page_size:
+                return
+            gt[order] = result.data[-1][order]
+
+    def count_rows(
+        self,
+        table_name: str,
+        eq: Optional[dict] = None,
+        gt: Optional[dict] = None,
+        gte: Optional[dict] = None,
+    ) -> int:
+        """Exact number of rows matching the filters"""
+        query = self.client.table(table_name).select("id", count="exact")
+        result = self._filtered(query, eq, None, gt, gte).limit(1).execute()
+        return result.count or 0
+
+    def distinct_values(self, table_name: str, column: str) -> List[str]:
+        """All distinct non-null values of a column, e.g. every user_id in a table"""
+        values = set()
+        after = None
+        while True:
+            query = self.client.table(table_name).select(column).not_.is_(column, "null")
+            if after is not None:
+                query = query.gt(column, after)
+            result = query.order(column).limit(self.page_size).execute()
+            values.update(row[column] for row in result.data)
+            if len(result.data) < self.page_size:
+                return sorted(values)
+            after = result.data[-1][column]
+
+    def upsert_rows(self, table_name: str, rows: List[dict], on_conflict: str = "id") -> int:
+        """Upsert rows in chunks. Returns the number of rows written."""
+        written = 0
+        for i in range(0, len(rows), self.chunk_size):
+            chunk = rows[i : i + self.chunk_size]
+            self.client.table(table_name).upsert(chunk, on_conflict=on_conflict).execute()
+            written += len(chunk)
+        return written
+
+    @staticmethod
+    def _filtered(query, eq=None, in_=None, gt=None, gte=None):
+        for column, value in (eq or {}).items():
+            query = query.eq(column, value)
+        if in_:
+            query = query.in_(in_[0], in_[1])
+        for column, value in (gt or {}).items():
+            query = query.gt(column, value)
+        for column, value in (gte or {}).items():
+            query = query.gte(column, value)
+        return query
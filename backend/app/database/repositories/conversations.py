@@ -1,8 +1,12 @@
-from app.database.client import supabase_client
-from app.schemas.conversations import Conversation
-import os
+import base64
+import json
+from typing import List, Optional, Tuple
+
 from dotenv import load_dotenv
 
+from app.database.client import supabase_client
+from app.schemas.conversations import Conversation, ConversationList
+
 load_dotenv()
 
 
@@ -11,34 +15,40 @@ class ConversationRepository:
         self.client = supabase_client.client
         self.table_name = "conversations"
 
-    def get_conversations(self, user_id: str) -> list[Conversation]:
-        data = self.client.table(self.table_name).select("*").eq("user_id", user_id).execute()
-        conversations = []
-        for row in data.data:
-            conversations.append(
-                Conversation(
-                    id=row["id"],
-                    user_id=row["user_id"],
-                    title=row["title"],
-                    is_favourite=row["is_favorite"],
-                    is_archived=row["is_archived"],
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
+    def list_conversations(
+        self, user_id: str, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        One page of a user's conversations with their summaries, most recently
+        active first. Keyset-paginated on (last_activity_at, id): pass the
+        returned cursor back for the next page. Raises ValueError for a bad cursor.
+        """
+        query = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("deleting", False)  # Queued for background deletion
+        )
+        if cursor:
+            last_activity_at, last_id = _decode_cursor(cursor)
+            query = query.or_(
+                f"last_activity_at.lt.{_quote(last_activity_at)},"
+                f"and(last_activity_at.eq.{_quote(last_activity_at)},id.lt.{_quote(last_id)})"
             )
-        return conversations
+        query = query.order("last_activity_at", desc=True).order("id", desc=True)
+        # One extra row tells whether another page exists
+        data = query.limit(limit + 1).execute()
+
+        conversations = ConversationList.validate_python(data.data[:limit])
+        next_cursor = None
+        if len(data.data) > limit:
+            last = conversations[-1]
+            next_cursor = _encode_cursor(last.last_activity_at, last.id)
+        return conversations, next_cursor
 
     def get_conversation(self, conversation_id: str) -> Conversation:
         data = self.client.table(self.table_name).select("*").eq("id", conversation_id).execute()
-        return Conversation(
-            id=data.data[0]["id"],
-            user_id=data.data[0]["user_id"],
-            title=data.data[0]["title"],
-            is_favourite=data.data[0]["is_favorite"],
-            is_archived=data.data[0]["is_archived"],
-            created_at=data.data[0]["created_at"],
-            updated_at=data.data[0]["updated_at"],
-        )
+        return Conversation.model_validate(data.data[0])
 
     def create_conversation(self, user_id: str, title: str):
         return (
@@ -68,3 +78,25 @@ class ConversationRepository:
 
     def delete_conversation(self, conversation_id: str):
         return self.client.table(self.table_name).delete().eq("id", conversation_id).execute()
+
+
+# ── Cursor Helpers ───────────────────────────────────────────────────
+
+
+def _quote(value) -> str:
+    """Double-quote a value inside a PostgREST or=() filter (timestamps carry +00:00)."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _encode_cursor(last_activity_at: str, conversation_id: str) -> str:
+    raw = json.dumps([last_activity_at, conversation_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        last_activity_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    return last_activity_at, conversation_id
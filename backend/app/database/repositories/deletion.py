@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.database.client import supabase_client
+
+
+class DeletionJobRepository:
+    """
+    Queue of background deletions (deletion_jobs) and the batched deletes
+    that carry them out. See app.services.deletion.
+    """
+
+    def __init__(self):
+        self.client = supabase_client.client
+        self.table_name = "deletion_jobs"
+
+    async def enqueue_conversation(self, conversation_id: str) -> Optional[dict]:
+        """Hide the conversation and queue its deletion; None if it does not exist."""
+        params = {"p_conversation_id": conversation_id}
+        result = await asyncio.to_thread(
+            self.client.rpc("enqueue_conversation_deletion", params).execute
+        )
+        return result.data[0] if result.data else None
+
+    async def enqueue_user(self, user_id: str) -> dict:
+        """Queue a purge of everything stored for the user."""
+        query = self.client.table(self.table_name).insert({"kind": "user", "user_id": user_id})
+        result = await asyncio.to_thread(query.execute)
+        return result.data[0]
+
+    async def claim(self, worker: str, lease_seconds: int, max_attempts: int) -> Optional[dict]:
+        """Take the oldest runnable job for this worker, or None when the queue is empty."""
+        params = {
+            "p_worker": worker,
+            "p_lease_seconds": lease_seconds,
+            "p_max_attempts": max_attempts,
+        }
+        result = await asyncio.to_thread(self.client.rpc("claim_deletion_job", params).execute)
+        return result.data[0] if result.data else None
+
+    async def save_progress(self, job_id: str, updates: dict) -> None:
+        """Record progress (step, deleted counts, lease) or the final status of a job."""
+        query = (
+            self.client.table(self.table_name)
+            .update({**updates, "updated_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", job_id)
+        )
+        await asyncio.to_thread(query.execute)
+
+    async def purge_batch(
+        self,
+        dataset: str,
+        user_id: str,
+        conversation_id: Optional[str] = None,
+        limit: int = 500,
+    ) -> int:
+        """Delete up to `limit` rows of one dataset. Returns rows deleted (0 when done)."""
+        params = {
+            "p_dataset": dataset,
+            "p_user_id": user_id,
+            "p_conversation_id": conversation_id,
+            "p_limit": limit,
+        }
+        result = await asyncio.to_thread(self.client.rpc("purge_batch", params).execute)
+        return result.data or 0
+
+    async def get_conversation_ids(
+        self, user_id: str, after_id: Optional[str] = None, limit: int = 500
+    ) -> List[str]:
+        """A page of the user's conversation ids, keyset-paged by id"""
+        query = self.client.table("conversations").select("id").eq("user_id", user_id)
+        if after_id:
+            query = query.gt("id", after_id)
+        result = await asyncio.to_thread(query.order("id").limit(limit).execute)
+        return [row["id"] for row in result.data]
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        query = self.client.table(self.table_name).select("*").eq("id", job_id)
+        result = await asyncio.to_thread(query.execute)
+        return result.data[0] if result.data else None
+
+    async def get_user_jobs(self, user_id: str, limit: int = 20) -> List[dict]:
+        """A user's deletion jobs, newest first"""
+        query = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("user_id", user_id)
+            .order("created_at", desc=True)
+            .limit(limit)
+        )
+        result = await asyncio.to_thread(query.execute)
+        return result.data
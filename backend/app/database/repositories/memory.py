@@ -1,5 +1,8 @@
-from typing import List, Optional
-from app.schemas.memory import MemoryFact, MemoryType
+import asyncio
+import base64
+import json
+from typing import List, Optional, Tuple
+from app.schemas.memory import MemoryFact, MemoryFactList, MemoryTier, MemoryType
 from app.database.client import supabase_client
 from datetime import datetime
 from dotenv import load_dotenv
@@ -7,6 +10,27 @@ import os
 
 load_dotenv()
 
+# Columns a search may project, and the keyset orderings it supports: (column, descending)
+SEARCH_COLUMNS = (
+    "id",
+    "user_id",
+    "category",
+    "importance",
+    "key",
+    "value",
+    "context",
+    "tier",
+    "retrieval_hits",
+    "last_retrieved_at",
+    "created_at",
+    "updated_at",
+)
+SEARCH_SORTS = {
+    "recent": ("updated_at", True),
+    "importance": ("importance", True),
+    "key": ("key", False),
+}
+
 
 class MemoryRepository:
     """
@@ -27,6 +51,7 @@ class MemoryRepository:
             "key": fact.key,
             "value": fact.value,
             "context": fact.context,
+            "tier": MemoryTier.HOT.value,  # Restating an archived fact revives it
         }
 
         # Check if fact exists for this user and key
@@ -60,33 +85,24 @@ class MemoryRepository:
         return fact
 
     async def get_facts(
-        self, user_id: str, category: Optional[MemoryType] = None, limit: int = 50
+        self,
+        user_id: str,
+        category: Optional[MemoryType] = None,
+        limit: int = 50,
+        include_archived: bool = False,
     ) -> List[MemoryFact]:
-        """Retrieve facts for a user, optionally filtered by type"""
+        """Retrieve facts for a user, optionally filtered by type (hot tier unless asked)"""
         query = self.client.table(self.table_name).select("*").eq("user_id", user_id)
 
+        if not include_archived:
+            query = query.eq("tier", MemoryTier.HOT.value)
         if category:
             query = query.eq("category", category.value)
 
-        result = query.limit(limit).execute()
-
-        facts = []
-        for row in result.data:
-            facts.append(
-                MemoryFact(
-                    id=row["id"],
-                    user_id=row["user_id"],
-                    category=MemoryType(row["category"]),
-                    importance=float(row["importance"]),
-                    key=row["key"],
-                    value=row["value"],
-                    context=row.get("context"),
-                    created_at=row["created_at"],
-                    updated_at=row["updated_at"],
-                )
-            )
+        # Run the HTTP round-trip off the event loop so concurrent profile loads overlap
+        result = await asyncio.to_thread(query.limit(limit).execute)
 
-        return facts
+        return MemoryFactList.validate_python(result.data)
 
     async def update_fact(self, fact_id: str, user_id: str, updates: dict) -> Optional[MemoryFact]:
         """Update an existing fact"""
@@ -100,17 +116,7 @@ class MemoryRepository:
 
         if result.data:
             row = result.data[0]
-            return MemoryFact(
-                id=row["id"],
-                user_id=row["user_id"],
-                category=MemoryType(row["category"]),
-                importance=row["importance"],
-                key=row["key"],
-                value=row["value"],
-                context=row.get("context"),
-                created_at=row["created_at"],
-                updated_at=row["updated_at"],
-            )
+            return MemoryFact.model_validate(row)
 
         return None
 
@@ -125,3 +131,232 @@ class MemoryRepository:
         )
 
         return len(result.data) > 0
+
+    async def get_all_facts(
+        self, user_id: str, page_size: int = 500, include_archived: bool = False
+    ) -> List[MemoryFact]:
+        """Retrieve every fact for a user (hot tier unless asked), paging through the table"""
+        facts = []
+        after = None
+        while True:
+            query = self.client.table(self.table_name).select("*").eq("user_id", user_id)
+            if not include_archived:
+                query = query.eq("tier", MemoryTier.HOT.value)
+            if after is not None:
+                query = query.gt("id", after)
+            result = query.order("id").limit(page_size).execute()
+            facts.extend(MemoryFactList.validate_python(result.data))
+            if len(result.data) < page_size:
+                return facts
+            after = result.data[-1]["id"]
+
+    async def delete_facts(self, user_id: str, fact_ids: List[str]) -> int:
+        """Delete several facts at once. Returns the number of deleted rows."""
+        if not fact_ids:
+            return 0
+
+        result = (
+            self.client.table(self.table_name)
+            .delete()
+            .in_("id", fact_ids)
+            .eq("user_id", user_id)
+            .execute()
+        )
+
+        return len(result.data)
+
+    async def get_user_ids(self, page_size: int = 1000) -> List[str]:
+        """List every user that has at least one stored fact"""
+        user_ids = set()
+        after = None
+        while True:
+            query = self.client.table(self.table_name).select("user_id")
+            if after is not None:
+                query = query.gt("user_id", after)
+            result = query.order("user_id").limit(page_size).execute()
+            user_ids.update(row["user_id"] for row in result.data)
+            if len(result.data) < page_size:
+                return sorted(user_ids)
+            after = result.data[-1]["user_id"]
+
+    async def get_fact(self, fact_id: str, user_id: str) -> Optional[MemoryFact]:
+        """Retrieve a single fact owned by a user"""
+        result = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("id", fact_id)
+            .eq("user_id", user_id)
+            .execute()
+        )
+
+        if result.data:
+            row = result.data[0]
+            return MemoryFact.model_validate(row)
+
+        return None
+
+    async def get_facts_by_key_prefix(
+        self, user_id: str, prefix: str, limit: Optional[int] = None
+    ) -> List[MemoryFact]:
+        """Retrieve facts whose key starts with prefix, newest first"""
+        query = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("user_id", user_id)
+            .like("key", f"{_escape_like(prefix)}%")
+            .order("created_at", desc=True)
+        )
+        if limit:
+            query = query.limit(limit)
+        result = query.execute()
+
+        # LIKE is case-insensitive on some collations; keep exact prefix matches only
+        return MemoryFactList.validate_python(
+            [row for row in result.data if row["key"].startswith(prefix)]
+        )
+
+    async def search_facts(
+        self,
+        user_id: str,
+        text: Optional[str] = None,
+        category: Optional[MemoryType] = None,
+        key_prefix: Optional[str] = None,
+        min_importance: Optional[float] = None,
+        max_importance: Optional[float] = None,
+        updated_after: Optional[datetime] = None,
+        updated_before: Optional[datetime] = None,
+        tier: Optional[MemoryTier] = MemoryTier.HOT,
+        fields: Optional[List[str]] = None,
+        sort: str = "recent",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of a user's facts matching every given filter.
+
+        Pages are keyset-paginated on (sort column, id): pass the returned
+        cursor back to continue, so deep pages cost the same as the first.
+        Only `fields` are selected (plus id and the sort column, which the
+        cursor needs). Text search matches key or value, case-insensitively.
+        Only hot facts are searched unless another tier (or None for all) is given.
+        Raises ValueError for unknown fields, sorts or a malformed cursor.
+        """
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"Unknown sort '{sort}' (expected one of {list(SEARCH_SORTS)})")
+        sort_column, descending = SEARCH_SORTS[sort]
+        columns = list(dict.fromkeys(["id", sort_column, *(fields or SEARCH_COLUMNS)]))
+        unknown = [c for c in columns if c not in SEARCH_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        query = self.client.table(self.table_name).select(",".join(columns)).eq("user_id", user_id)
+        if tier:
+            query = query.eq("tier", tier.value)
+        if category:
+            query = query.eq("category", category.value)
+        if key_prefix:
+            query = query.like("key", f"{_escape_like(key_prefix)}%")
+        if min_importance is not None:
+            query = query.gte("importance", min_importance)
+        if max_importance is not None:
+            query = query.lte("importance", max_importance)
+        if updated_after:
+            query = query.gte("updated_at", updated_after.isoformat())
+        if updated_before:
+            query = query.lt("updated_at", updated_before.isoformat())
+        if text:
+            pattern = _quote(f"*{_escape_like(text)}*")
+            query = query.or_(f"key.ilike.{pattern},value.ilike.{pattern}")
+        if cursor:
+            value, last_id = _decode_cursor(cursor, sort)
+            op = "lt" if descending else "gt"
+            query = query.or_(
+                f"{sort_column}.{op}.{_quote(value)},"
+                f"and({sort_column}.eq.{_quote(value)},id.{op}.{_quote(last_id)})"
+            )
+
+        query = query.order(sort_column, desc=descending).order("id", desc=descending)
+        # One extra row tells whether another page exists
+        result = await asyncio.to_thread(query.limit(limit + 1).execute)
+
+        rows = result.data[:limit]
+        next_cursor = None
+        if len(result.data) > limit:
+            next_cursor = _encode_cursor(sort, rows[-1][sort_column], rows[-1]["id"])
+        return rows, next_cursor
+
+    # ── Tiering ──────────────────────────────────────────────────────
+
+    async def record_hits(self, user_id: str, keys: List[str]) -> None:
+        """Count a retrieval of each fact key (feeds the decay score)."""
+        if keys:
+            params = {"p_user_id": user_id, "p_keys": keys}
+            await asyncio.to_thread(self.client.rpc("record_memory_hits", params).execute)
+
+    async def set_tier(self, user_id: str, fact_ids: List[str], tier: MemoryTier) -> int:
+        """Move facts (and their vectors) to a tier. Returns the number of facts moved."""
+        if not fact_ids:
+            return 0
+        params = {"p_user_id": user_id, "p_fact_ids": fact_ids, "p_tier": tier.value}
+        result = await asyncio.to_thread(self.client.rpc("set_memory_tier", params).execute)
+        return result.data or 0
+
+    async def get_decay_candidates(
+        self, older_than: datetime, after_id: Optional[str] = None, limit: int = 500
+    ) -> List[dict]:
+        """Hot facts of every user not updated since older_than, keyset-paged by id."""
+        query = (
+            self.client.table(self.table_name)
+            .select(
+                "id,user_id,category,key,importance,retrieval_hits,last_retrieved_at,updated_at"
+            )
+            .eq("tier", MemoryTier.HOT.value)
+            .lt("updated_at", older_than.isoformat())
+        )
+        if after_id:
+            query = query.gt("id", after_id)
+        result = await asyncio.to_thread(query.order("id").limit(limit).execute)
+        return result.data
+
+    async def tier_counts(self) -> dict:
+        """Number of facts in each tier, across all users."""
+        result = await asyncio.to_thread(self.client.rpc("memory_tier_counts", {}).execute)
+        return {row["tier"]: row["facts"] for row in result.data}
+
+
+# ── Query Helpers ────────────────────────────────────────────────────
+
+
+def _escape_like(text: str) -> str:
+    """Escape LIKE wildcards: keys are snake_case, and "_" matches any character."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _quote(value) -> str:
+    """Double-quote a value inside a PostgREST or=() filter (commas, parens, +00:00)."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _encode_cursor(sort: str, value, fact_id: str) -> str:
+    raw = json.dumps([sort, value, fact_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    # Any JSON decodes (e.g. "e30=" is {}); only [sort, scalar, id] is a cursor
+    if (
+        not isinstance(decoded, list)
+        or len(decoded) != 3
+        or not isinstance(decoded[2], str)
+        or isinstance(decoded[1], (list, dict))
+    ):
+        raise ValueError("Malformed cursor")
+    cursor_sort, value, fact_id = decoded
+    if cursor_sort != sort:
+        raise ValueError("Cursor belongs to a different sort order")
+    return value, fact_id
@@ -1,6 +1,15 @@
+import os
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+
 from app.database.client import supabase_client
-from app.schemas.messages import Message, MessageCreate
-from typing import List
+from app.schemas.messages import Message, MessageList
+
+load_dotenv()
+
+# Characters of the last message kept on the conversation for list previews
+PREVIEW_CHARS = int(os.getenv("CONVERSATION_PREVIEW_CHARS", "160"))
 
 
 class MessageRepository:
@@ -10,19 +19,20 @@ class MessageRepository:
 
     def save_message(self, conversation_id: str, role: str, content: str) -> Message:
         """Save a message to the database"""
-        data = (
-            self.client.table(self.table_name)
-            .insert({"conversation_id": conversation_id, "role": role, "content": content})
-            .execute()
-        )
-
-        return Message(
-            id=data.data[0]["id"],
-            conversation_id=data.data[0]["conversation_id"],
-            role=data.data[0]["role"],
-            content=data.data[0]["content"],
-            created_at=data.data[0]["created_at"],
-        )
+        return self.save_messages(conversation_id, [(role, content)])[0]
+
+    def save_messages(self, conversation_id: str, messages: List[Tuple[str, str]]) -> List[Message]:
+        """
+        Save (role, content) messages in order and update the conversation's
+        summary (preview, message count, last activity) in the same transaction.
+        """
+        params = {
+            "p_conversation_id": conversation_id,
+            "p_messages": [{"role": role, "content": content} for role, content in messages],
+            "p_preview_chars": PREVIEW_CHARS,
+        }
+        data = self.client.rpc("append_messages", params).execute()
+        return MessageList.validate_python(data.data)
 
     def get_messages(self, conversation_id: str, limit: int = 10) -> List[Message]:
         """Get messages for a conversation, ordered by creation time"""
@@ -34,19 +44,7 @@ class MessageRepository:
             .limit(limit)
             .execute()
         )
-
-        messages = []
-        for row in data.data:
-            messages.append(
-                Message(
-                    id=row["id"],
-                    conversation_id=row["conversation_id"],
-                    role=row["role"],
-                    content=row["content"],
-                    created_at=row["created_at"],
-                )
-            )
-        return messages
+        return MessageList.validate_python(data.data)
 
     def get_conversation_history(self, conversation_id: str, limit: int = 10) -> str:
         """Get formatted conversation history for LLM context"""
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.database.client import supabase_client
+from app.schemas.memory import ProjectRollup, ProjectRollupList
+
+
+class ProjectRollupRepository:
+    """
+    Handles per-project memory rollups in Supabase/Postgres.
+    One row per (user, project), maintained incrementally as milestones arrive.
+    """
+
+    def __init__(self):
+        self.client = supabase_client.client
+        self.table_name = "project_rollups"
+
+    async def get_rollups(self, user_id: str) -> List[ProjectRollup]:
+        """Retrieve all project rollups for a user, most recently active first"""
+        query = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("user_id", user_id)
+            .order("updated_at", desc=True)
+        )
+        result = await asyncio.to_thread(query.execute)
+
+        return ProjectRollupList.validate_python(result.data)
+
+    async def get_rollup(self, user_id: str, project_key: str) -> Optional[ProjectRollup]:
+        """Retrieve the rollup of a single project"""
+        result = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("project_key", project_key)
+            .execute()
+        )
+
+        if result.data:
+            return ProjectRollup(**result.data[0])
+        return None
+
+    async def upsert_rollup(self, rollup: ProjectRollup) -> ProjectRollup:
+        """Create or replace the rollup of a project"""
+        data = {
+            "user_id": rollup.user_id,
+            "project_key": rollup.project_key,
+            "summary": rollup.summary,
+            "milestone_count": rollup.milestone_count,
+            "recent_milestones": rollup.recent_milestones,
+            "last_milestone_at": (
+                rollup.last_milestone_at.isoformat() if rollup.last_milestone_at else None
+            ),
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+
+        result = (
+            self.client.table(self.table_name)
+            .upsert(data, on_conflict="user_id,project_key")
+            .execute()
+        )
+
+        if result.data:
+            return ProjectRollup(**result.data[0])
+        return rollup
+
+    async def record_milestone(
+        self,
+        user_id: str,
+        project_key: str,
+        key: str,
+        value: str,
+        at: Optional[datetime],
+        recent_limit: int,
+    ) -> ProjectRollup:
+        """Fold a milestone into its project's rollup atomically (RPC record_project_milestone)"""
+        params = {
+            "p_user_id": user_id,
+            "p_project_key": project_key,
+            "p_key": key,
+            "p_value": value,
+            "p_at": (at or datetime.now(timezone.utc)).isoformat(),
+            "p_recent_limit": recent_limit,
+        }
+        result = await asyncio.to_thread(
+            self.client.rpc("record_project_milestone", params).execute
+        )
+        return ProjectRollup(**result.data[0])
+
+    async def set_summary(self, user_id: str, project_key: str, summary: Optional[str]) -> None:
+        """Set a project's description, leaving its milestone fields as they are"""
+        query = self.client.table(self.table_name).upsert(
+            {
+                "user_id": user_id,
+                "project_key": project_key,
+                "summary": summary,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            },
+            on_conflict="user_id,project_key",
+        )
+        await asyncio.to_thread(query.execute)
+
+    async def delete_rollup(self, user_id: str, project_key: str) -> bool:
+        """Delete the rollup of a project"""
+        result = (
+            self.client.table(self.table_name)
+            .delete()
+            .eq("user_id", user_id)
+            .eq("project_key", project_key)
+            .execute()
+        )
+
+        return len(result.data) > 0
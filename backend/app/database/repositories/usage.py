@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+from typing import List
+
+from app.database.client import supabase_client
+
+
+class UsageRepository:
+    """
+    Per-user LLM usage, aggregated into hourly buckets per feature and model.
+    Written in batches by app.core.usage.UsageAggregator.
+    """
+
+    def __init__(self):
+        self.client = supabase_client.client
+        self.table_name = "llm_usage"
+
+    def record_batch(self, rows: List[dict]) -> None:
+        """Add a batch of bucket deltas to the stored totals (one RPC, upsert-and-increment)."""
+        if rows:
+            self.client.rpc("record_llm_usage", {"p_rows": rows}).execute()
+
+    async def get_user_usage(self, user_id: str, since: datetime) -> List[dict]:
+        """A user's usage buckets since a point in time, oldest first"""
+        query = (
+            self.client.table(self.table_name)
+            .select("*")
+            .eq("user_id", user_id)
+            .gte("bucket_start", since.isoformat())
+            .order("bucket_start")
+        )
+        result = await asyncio.to_thread(query.execute)
+        return result.data
+
+    async def get_tokens_since(self, user_id: str, since: datetime) -> int:
+        """Prompt + completion tokens a user has used since a point in time"""
+        params = {"p_user_id": user_id, "p_since": since.isoformat()}
+        result = await asyncio.to_thread(self.client.rpc("llm_tokens_since", params).execute)
+        return int(result.data or 0)
+
+    async def get_top_users(self, since: datetime, order: str, limit: int) -> List[dict]:
+        """Users with the most cost, tokens, wall time or slow calls since a point in time"""
+        params = {"p_since": since.isoformat(), "p_order": order, "p_limit": limit}
+        result = await asyncio.to_thread(self.client.rpc("top_llm_users", params).execute)
+        return result.data
@@ -1,20 +1,43 @@
-from typing import List
+import json
 import os
+import time
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
 from app.database.client import supabase_client
 
+load_dotenv()
+
+# Active embedding model, cached briefly so every query doesn't hit the settings table
+_ACTIVE_MODEL_TTL_SECONDS = 30
+_active_model_cache = {"model": None, "expires_at": 0.0}
+
 
 class VectorRepository:
     """
     Handles vector storage for semantic search of unstructured memories.
     Uses pgvector (Supabase).
+
+    With EMBEDDING_WIRE_CODEC set to float16 or int8 (see vector_codec),
+    vectors travel as base64 instead of JSON number lists: writes are decoded
+    by a trigger, queries go through match_embeddings_compact, and bulk reads
+    come back as int8 and are decoded straight into NumPy.
     """
 
-    def __init__(self):
+    def __init__(self, wire_codec: Optional[str] = None):
         self.client = supabase_client.client
         self.table_name = "memory_embeddings"
+        self.shadow_table_name = "memory_embeddings_shadow"
+        self.wire_codec = wire_codec or os.getenv("EMBEDDING_WIRE_CODEC", "json")
 
     async def store_embedding(
-        self, user_id: str, text: str, embedding: List[float], metadata: dict = None
+        self,
+        user_id: str,
+        text: str,
+        embedding: List[float],
+        metadata: dict = None,
+        embedding_model: Optional[str] = None,
     ) -> str:
         """
         Store an embedding with associated text and metadata.
@@ -23,9 +46,11 @@ class VectorRepository:
         data = {
             "user_id": user_id,
             "content": text,
-            "embedding": embedding,
+            **self._embedding_fields(embedding),
             "metadata": metadata or {},
         }
+        if embedding_model:
+            data["embedding_model"] = embedding_model
 
         result = self.client.table(self.table_name).insert(data).execute()
 
@@ -33,26 +58,93 @@ class VectorRepository:
             return result.data[0]["id"]
         return None
 
+    async def upsert_embedding(
+        self,
+        user_id: str,
+        fact_id: str,
+        text: str,
+        embedding: List[float],
+        metadata: dict = None,
+        embedding_model: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Store the embedding of a structured fact, replacing any previous vector
+        generated for the same fact. Returns the ID of the stored embedding.
+        """
+        data = {
+            "user_id": user_id,
+            "fact_id": fact_id,
+            "content": text,
+            **self._embedding_fields(embedding),
+            "metadata": metadata or {},
+            "archived": False,  # A restated fact is live again
+        }
+        if embedding_model:
+            data["embedding_model"] = embedding_model
+
+        result = self.client.table(self.table_name).upsert(data, on_conflict="fact_id").execute()
+
+        if result.data:
+            return result.data[0]["id"]
+        return None
+
+    async def get_embeddings(
+        self, user_id: str, columns: str = "id, fact_id, embedding", page_size: int = 500
+    ) -> List[dict]:
+        """
+        Fetch every stored vector row for a user, page by page (keyset on id,
+        so `columns` must include it).
+        Embeddings (when selected) are parsed into lists of floats, or into
+        NumPy arrays when a compact wire codec is configured.
+        """
+        if self.wire_codec != "json" and "embedding" in columns:
+            return await self._get_embeddings_compact(user_id, page_size)
+
+        rows = []
+        after = None
+        while True:
+            query = self.client.table(self.table_name).select(columns).eq("user_id", user_id)
+            if after is not None:
+                query = query.gt("id", after)
+            result = query.order("id").limit(page_size).execute()
+            for row in result.data:
+                # pgvector columns come back from PostgREST as "[0.1,0.2,...]"
+                if isinstance(row.get("embedding"), str):
+                    row["embedding"] = json.loads(row["embedding"])
+                rows.append(row)
+            if len(result.data) < page_size:
+                return rows
+            after = result.data[-1]["id"]
+
     async def search_similar(
         self,
         user_id: str,
         query_embedding: List[float],
         limit: int = 5,
         match_threshold: float = 0.3,
+        embedding_model: Optional[str] = None,
     ) -> List[dict]:
         """
         Search for similar embeddings using cosine similarity.
+        Only vectors produced by embedding_model (when given) are compared.
         Returns list of {content, metadata, similarity}
         """
-        result = self.client.rpc(
-            "match_embeddings",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": match_threshold,
-                "match_count": limit,
-                "p_user_id": user_id,
-            },
-        ).execute()
+        params = {
+            "match_threshold": match_threshold,
+            "match_count": limit,
+            "p_user_id": user_id,
+        }
+        if embedding_model:
+            params["p_embedding_model"] = embedding_model
+
+        if self.wire_codec == "json":
+            params["query_embedding"] = query_embedding
+            result = self.client.rpc("match_embeddings", params).execute()
+        else:
+            # The query vector is decoded back to full precision server-side
+            params["query_data"] = self._encode(query_embedding)
+            params["query_codec"] = self.wire_codec
+            result = self.client.rpc("match_embeddings_compact", params).execute()
 
         return result.data
 
@@ -67,3 +159,93 @@ class VectorRepository:
         )
 
         return len(result.data) > 0
+
+    async def delete_orphaned(self, user_id: str) -> int:
+        """
+        Delete a user's embeddings that no longer belong to a stored fact,
+        including legacy rows written before embeddings were linked to facts.
+        The check runs inside the DELETE, so facts stored meanwhile keep their
+        vectors. Returns the number of deleted rows.
+        """
+        result = self.client.rpc("delete_orphaned_embeddings", {"p_user_id": user_id}).execute()
+        return result.data or 0
+
+    # ── Model Versioning ─────────────────────────────────────────────
+
+    async def get_active_model(self, default: Optional[str] = None) -> Optional[str]:
+        """
+        Model that new vectors and queries must use, as recorded in the database.
+        Falls back to default when the settings table is unavailable.
+        """
+        now = time.monotonic()
+        if _active_model_cache["model"] and now < _active_model_cache["expires_at"]:
+            return _active_model_cache["model"]
+
+        try:
+            result = self.client.table("embedding_settings").select("active_model").execute()
+        except Exception as e:
+            print(f"[EMBEDDING SETTINGS ERROR] {e}")
+            return default
+
+        model = result.data[0]["active_model"] if result.data else default
+        _active_model_cache.update(model=model, expires_at=now + _ACTIVE_MODEL_TTL_SECONDS)
+        return model
+
+    async def prepare_shadow(self, dimensions: int) -> None:
+        """Create an empty shadow table for vectors of the given dimension."""
+        self.client.rpc("prepare_embedding_shadow", {"p_dimensions": dimensions}).execute()
+
+    async def bulk_upsert_embeddings(self, rows: List[dict], shadow: bool = False) -> int:
+        """Bulk upsert fact embeddings (into the shadow table if requested), keyed by fact."""
+        if not rows:
+            return 0
+        table_name = self.shadow_table_name if shadow else self.table_name
+        if self.wire_codec != "json":
+            rows = [
+                {k: v for k, v in row.items() if k != "embedding"}
+                | self._embedding_fields(row["embedding"])
+                for row in rows
+            ]
+        self.client.table(table_name).upsert(rows, on_conflict="fact_id").execute()
+        return len(rows)
+
+    async def cutover_shadow(self, embedding_model: str) -> None:
+        """Atomically swap the shadow table in and make embedding_model active."""
+        self.client.rpc("cutover_embedding_shadow", {"p_model": embedding_model}).execute()
+        _active_model_cache.update(model=embedding_model, expires_at=0.0)
+
+    async def drop_previous(self) -> None:
+        """Drop the table replaced by the last cutover."""
+        self.client.rpc("drop_previous_embeddings", {}).execute()
+
+    # ── Compact Encoding ─────────────────────────────────────────────
+
+    def _embedding_fields(self, embedding: List[float]) -> dict:
+        """Row fields carrying a vector in the configured wire format."""
+        if self.wire_codec == "json":
+            return {"embedding": embedding}
+        return {"embedding_data": self._encode(embedding), "embedding_codec": self.wire_codec}
+
+    def _encode(self, embedding: List[float]) -> str:
+        from app.database import vector_codec
+
+        return vector_codec.encode(embedding, self.wire_codec)
+
+    async def _get_embeddings_compact(self, user_id: str, page_size: int) -> List[dict]:
+        """All of a user's vectors as int8, decoded a page at a time into one matrix."""
+        from app.database import vector_codec
+
+        rows = []
+        after = None
+        while True:
+            page = self.client.rpc(
+                "get_embeddings_compact",
+                {"p_user_id": user_id, "p_after": after, "p_limit": page_size},
+            ).execute()
+            if page.data:
+                matrix = vector_codec.decode_many([r["embedding_data"] for r in page.data], "int8")
+                for row, vector in zip(page.data, matrix, strict=True):
+                    rows.append({"id": row["id"], "fact_id": row["fact_id"], "embedding": vector})
+            if len(page.data) < page_size:
+                return rows
+            after = page.data[-1]["id"]
@@ -0,0 +1,68 @@
+"""
+Compact wire/storage encodings for embedding vectors.
+
+A 768-d vector sent as a JSON number list is ~15 KB of text. These codecs pack
+it into base64 instead (the SQL functions in migrations/004 read and write
+the same layouts):
+
+    float32  768 * 4 bytes, little-endian                       (~4.1 KB base64)
+    float16  768 * 2 bytes, little-endian IEEE half              (~2.0 KB base64)
+    int8     4-byte little-endian float32 scale, then 768 int8
+             values q = round(x / scale), scale = max|x| / 127   (~1.0 KB base64)
+
+Decoding uses np.frombuffer over the base64-decoded bytes, so float32 and
+float16 vectors (and whole batches, see decode_many) are views, not copies.
+"""
+
+import base64
+from typing import List, Sequence
+
+import numpy as np
+
+CODECS = ("float32", "float16", "int8")
+
+_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+
+def encode(vector: Sequence[float], codec: str) -> str:
+    """Pack a vector into a base64 string."""
+    values = np.asarray(vector, dtype=np.float32)
+    if codec in _DTYPES:
+        return base64.b64encode(values.astype(_DTYPES[codec]).tobytes()).decode("ascii")
+    if codec == "int8":
+        scale = float(np.abs(values).max()) / 127 if values.size else 0.0
+        quantized = np.round(values / scale) if scale else np.zeros_like(values)
+        packed = np.array([scale], dtype="<f4").tobytes() + quantized.astype(np.int8).tobytes()
+        return base64.b64encode(packed).decode("ascii")
+    raise ValueError(f"Unknown embedding codec '{codec}' (expected one of {CODECS})")
+
+
+def decode(data: str, codec: str) -> np.ndarray:
+    """Unpack one base64 vector. float32/float16 return read-only views on the buffer."""
+    raw = base64.b64decode(data)
+    if codec in _DTYPES:
+        return np.frombuffer(raw, dtype=_DTYPES[codec])
+    if codec == "int8":
+        scale = np.frombuffer(raw, dtype="<f4", count=1)[0]
+        return np.frombuffer(raw, dtype=np.int8, offset=4).astype(np.float32) * scale
+    raise ValueError(f"Unknown embedding codec '{codec}' (expected one of {CODECS})")
+
+
+def decode_many(items: List[str], codec: str) -> np.ndarray:
+    """
+    Unpack equally sized base64 vectors into one (n, dim) matrix.
+
+    The vectors are concatenated once and viewed in place; int8 rows are read
+    through a structured dtype so scales and values are views as well, and
+    only the final dequantization allocates.
+    """
+    if not items:
+        return np.empty((0, 0), dtype=np.float32)
+    raw = b"".join(base64.b64decode(item) for item in items)
+    if codec in _DTYPES:
+        return np.frombuffer(raw, dtype=_DTYPES[codec]).reshape(len(items), -1)
+    if codec == "int8":
+        dim = len(raw) // len(items) - 4
+        rows = np.frombuffer(raw, dtype=np.dtype([("scale", "<f4"), ("q", "i1", (dim,))]))
+        return rows["q"].astype(np.float32) * rows["scale"][:, None]
+    raise ValueError(f"Unknown embedding codec '{codec}' (expected one of {CODECS})")
@@ -1,17 +1,69 @@
-from langfuse.langchain import CallbackHandler
-from langfuse import Langfuse
+import json
 import os
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
 from dotenv import load_dotenv
 
+from app.core.cache import get_cache
+from app.core.singleflight import SingleFlight
+
 load_dotenv()
 
 
+@dataclass
+class CachedPrompt:
+    """A prompt rebuilt from the shared cache tier, with the fields callers read."""
+
+    name: Optional[str]
+    version: Optional[int]
+    prompt: Any  # List of chat messages, or the text of a text prompt
+    config: dict = field(default_factory=dict)
+
+
+class _PromptCodec:
+    """
+    Stores prompts in the shared tier as plain JSON. Unpickling whatever sits
+    in a shared Redis would run code chosen by anyone able to write to it.
+    """
+
+    @staticmethod
+    def dumps(prompt) -> str:
+        return json.dumps(
+            {
+                "name": getattr(prompt, "name", None),
+                "version": getattr(prompt, "version", None),
+                "messages": prompt.prompt,
+                "config": getattr(prompt, "config", None) or {},
+            }
+        )
+
+    @staticmethod
+    def loads(raw) -> CachedPrompt:
+        data = json.loads(raw)
+        return CachedPrompt(data["name"], data["version"], data["messages"], data["config"])
+
+
+# Concurrent lookups of the same prompt share one fetch
+_prompt_flight = SingleFlight("prompt")
+# Prompts are kept in the shared tier so new workers skip the Langfuse round trip
+_prompt_cache = get_cache(
+    "prompt",
+    max_items=128,
+    local_ttl=float(os.getenv("PROMPT_CACHE_TTL", "60")),
+    shared_ttl=float(os.getenv("PROMPT_CACHE_TTL", "60")),
+    codec=_PromptCodec,
+)
+
+
 class LangfuseClientSingleton:
     _instance = None
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
+            from langfuse import Langfuse
+
             load_dotenv()
             cls._instance = Langfuse(
                 secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
@@ -32,11 +84,22 @@ class LangfuseConfig:
 
         In Langfuse v3, the CallbackHandler uses the global client configuration.
         Session ID and trace name should be passed via LangChain's runnable config.
+        The handler keeps per-run state only, so one instance can be shared
+        (see app.intergrations.tracing.Tracer.langchain_callbacks).
         """
+        from langfuse.langchain import CallbackHandler
+
         handler = CallbackHandler(public_key=os.getenv("LANGFUSE_PUBLIC_KEY"), update_trace=True)
         return handler
 
     def get_prompt(self, prompt_name, label=None, version=None):
+        key = (prompt_name, label, version)
+        return _prompt_cache.get_or_load_sync(
+            f"{prompt_name}:{label}:{version}",
+            lambda: _prompt_flight.do_sync(key, self._fetch_prompt, prompt_name, label, version),
+        )
+
+    def _fetch_prompt(self, prompt_name, label=None, version=None):
         if label and version:
             return self.langfuse.get_prompt(
                 prompt_name,
@@ -0,0 +1,268 @@
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Token totals of the enclosing meter_usage() block, if any (see meter_usage)
+_usage_meter: ContextVar[Optional[dict]] = ContextVar("usage_meter", default=None)
+
+
+class TraceSpan:
+    """One traced LLM or embedding call; the caller fills in output and usage."""
+
+    def __init__(self, name: str, kind: str, model, input, session_id, metadata, sampled: bool):
+        self.name = name
+        self.kind = kind
+        self.model = model
+        self.input = input
+        self.output = None
+        self.usage = None
+        self.metadata = metadata or {}
+        self.session_id = session_id
+        self.sampled = sampled
+        self.started_at = datetime.now(timezone.utc)
+        self.latency = 0.0
+        self.error: Optional[str] = None
+
+
+class Tracer:
+    """
+    Sampled tracing that stays off the request path.
+
+    Sampling:
+        head  A `sample_rate` fraction of calls is kept, decided when the call starts
+        tail  Calls that raise or run longer than `slow_seconds` are always kept
+
+    Kept spans go into a bounded in-memory buffer that a daemon thread drains
+    in batches to Langfuse. When the buffer is full, spans are dropped and
+    counted instead of blocking the caller, so tracing never adds latency to
+    a chat turn.
+
+    With `langchain_callbacks` enabled, head-sampled calls also get the one
+    shared Langfuse CallbackHandler for step-level detail (that detail is not
+    subject to tail sampling).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        sample_rate: float = 0.1,
+        slow_seconds: float = 10.0,
+        buffer_size: int = 1000,
+        batch_size: int = 50,
+        flush_seconds: float = 5.0,
+        langchain_callbacks: bool = False,
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.langchain_callbacks_enabled = langchain_callbacks
+        self.counters = {
+            "spans": 0,
+            "kept_sampled": 0,
+            "kept_errors": 0,
+            "kept_slow": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "exported": 0,
+            "export_errors": 0,
+        }
+        self._buffer: "queue.Queue[TraceSpan]" = queue.Queue(maxsize=buffer_size)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._handler = None
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "generation",
+        model: Optional[str] = None,
+        input: Any = None,
+        session_id: Optional[str] = None,
+        metadata: Optional[dict] = None,
+        slow_seconds: Optional[float] = None,
+    ):
+        """Time the block and queue it for export if sampling keeps it."""
+        sampled = self.enabled and random.random() < self.sample_rate
+        span = TraceSpan(name, kind, model, input, session_id, metadata, sampled)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.latency = time.perf_counter() - started
+            _meter(span)
+            if self.enabled:
+                self._finish(span, self.slow_seconds if slow_seconds is None else slow_seconds)
+
+    def langchain_callbacks(self, span: TraceSpan) -> List[Any]:
+        """The shared CallbackHandler for head-sampled spans, if step-level tracing is on."""
+        if not (span.sampled and self.langchain_callbacks_enabled):
+            return []
+        if self._handler is None:
+            from app.intergrations.langfuse import LangfuseConfig
+
+            with self._lock:
+                if self._handler is None:
+                    self._handler = LangfuseConfig()._initialize_with_langchain()
+        return [self._handler]
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export whatever is buffered (used on shutdown)."""
+        deadline = time.monotonic() + timeout
+        while not self._buffer.empty() and time.monotonic() < deadline:
+            self._export(self._drain(self.batch_size))
+        if self.counters["exported"]:
+            self._client().flush()
+
+    def stats(self) -> dict:
+        return {**self.counters, "buffered": self._buffer.qsize()}
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    def _finish(self, span: TraceSpan, slow_seconds: float) -> None:
+        self._count("spans")
+        if span.error:
+            reason = "kept_errors"
+        elif span.latency >= slow_seconds:
+            reason = "kept_slow"
+        elif span.sampled:
+            reason = "kept_sampled"
+        else:
+            self._count("sampled_out")
+            return
+
+        try:
+            self._buffer.put_nowait(span)
+        except queue.Full:
+            self._count("dropped")
+            return
+        self._count(reason)
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="trace-exporter", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._drain(self.batch_size, wait=self.flush_seconds)
+            if batch:
+                self._export(batch)
+
+    def _drain(self, limit: int, wait: float = 0.0) -> List[TraceSpan]:
+        """Up to `limit` spans; blocks up to `wait` seconds for the first one."""
+        batch = []
+        try:
+            batch.append(self._buffer.get(timeout=wait) if wait else self._buffer.get_nowait())
+            while len(batch) < limit:
+                batch.append(self._buffer.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _export(self, batch: List[TraceSpan]) -> None:
+        if not batch:
+            return
+        try:
+            client = self._client()
+            for span in batch:
+                self._emit(client, span)
+        except Exception as e:
+            self._count("export_errors")
+            print(f"[TRACING] Export of {len(batch)} spans failed: {e}")
+            return
+        self._count("exported", len(batch))
+
+    @staticmethod
+    def _emit(client, span: TraceSpan) -> None:
+        metadata = {
+            **span.metadata,
+            "latency_ms": round(span.latency * 1000, 1),
+            "started_at": span.started_at.isoformat(),
+            "sampling": "head" if span.sampled else "tail",
+        }
+        fields = {
+            "name": span.name,
+            "input": span.input,
+            "output": span.output,
+            "metadata": metadata,
+            "level": "ERROR" if span.error else "DEFAULT",
+            "status_message": span.error,
+        }
+        if span.kind == "span":
+            observation = client.start_span(**fields)
+        else:
+            observation = client.start_generation(
+                **fields, model=span.model, usage_details=span.usage
+            )
+        observation.update_trace(name=span.name, session_id=span.session_id)
+        observation.end()
+
+    @staticmethod
+    def _client():
+        from app.intergrations.langfuse import LangfuseClientSingleton
+
+        return LangfuseClientSingleton.get_instance()
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += amount
+
+
+@contextmanager
+def meter_usage():
+    """
+    Sum model calls and token usage of every span finished inside the block.
+
+    The totals follow the context into asyncio.to_thread workers, so one
+    meter per task attributes usage to a single request (used by the
+    evaluation runner); it works whether or not tracing is enabled.
+    """
+    totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+    token = _usage_meter.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_meter.reset(token)
+
+
+def _meter(span: TraceSpan) -> None:
+    totals = _usage_meter.get()
+    if totals is None or span.kind != "generation":
+        return
+    totals["calls"] += 1
+    if span.usage:
+        totals["input_tokens"] += span.usage.get("input", 0)
+        totals["output_tokens"] += span.usage.get("output", 0)
+
+
+tracer = Tracer(
+    enabled=os.getenv("TRACING_ENABLED", "true").lower() == "true",
+    sample_rate=float(os.getenv("TRACING_SAMPLE_RATE", "0.1")),
+    slow_seconds=float(os.getenv("TRACING_SLOW_SECONDS", "10")),
+    buffer_size=int(os.getenv("TRACING_BUFFER_SIZE", "1000")),
+    batch_size=int(os.getenv("TRACING_BATCH_SIZE", "50")),
+    flush_seconds=float(os.getenv("TRACING_FLUSH_SECONDS", "5")),
+    langchain_callbacks=os.getenv("TRACING_LANGCHAIN_CALLBACKS", "false").lower() == "true",
+)
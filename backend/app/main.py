@@ -1,8 +1,82 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import chat, memory
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.api.v1 import chat, deletions, memory, usage, ws
+from app.ai.chat_engine import CHAT_PROMPT, CLASSIFIER_PROMPT
+from app.ai.llm import _llm_service
+from app.ai.prompt_assembly import prefix_cache_stats
+from app.core.admission import AdmissionRejected, admission_controller
+from app.core.cache import cache_stats
+from app.core.idempotency import IdempotencyConflict, idempotency_store
+from app.core.singleflight import singleflight_stats
+from app.core.traffic import traffic_recorder
+from app.core.usage import usage_aggregator
+from app.core.warmup import WarmUp
+from app.database.client import supabase_client
+from app.database.repositories.memory import MemoryRepository
+from app.database.repositories.vector import VectorRepository
+from app.intergrations.langfuse import LangfuseConfig
+from app.intergrations.tracing import tracer
+from app.services.chat_session import session_stats
+from app.services.deletion import deletion_worker
+
+
+# ── Warm-up ──────────────────────────────────────────────────────────
+
+
+def _preload_prompts():
+    langfuse_config = LangfuseConfig()
+    for prompt_name in (CHAT_PROMPT, CLASSIFIER_PROMPT):
+        langfuse_config.get_prompt(prompt_name)
+
+
+async def _canary_embedding():
+    model = await VectorRepository().get_active_model(default=_llm_service.EMBEDDING_MODEL)
+    # Straight to the backend: a cache hit would not prove the model is reachable
+    await asyncio.to_thread(_llm_service.embedding_backend.embed, ["warm-up canary"], model)
+
+
+warm_up = WarmUp(
+    {
+        "prompts": _preload_prompts,
+        "models": _llm_service.warm_up,
+        "database": supabase_client.ping,
+        "embedding": _canary_embedding,
+    }
+    if os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    else {},
+    timeout=float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30")),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: the worker answers health checks right away,
+    # and /api/v1/ready turns green once every step has succeeded
+    task = asyncio.create_task(warm_up.run())
+    deletions_task = None
+    if os.getenv("DELETION_WORKER_ENABLED", "true").lower() == "true":
+        deletions_task = asyncio.create_task(deletion_worker.run_forever())
+    yield
+    task.cancel()
+    if deletions_task is not None:
+        # An interrupted job is resumed from its last step once its lease expires
+        deletions_task.cancel()
+    await asyncio.to_thread(tracer.flush)
+    await asyncio.to_thread(usage_aggregator.flush)
 
-app = FastAPI(title="NeuraDesk Backend - Phase 1")
+
+# orjson encodes the plain-dict responses (metrics, usage, search pages); model lists
+# are serialized by pydantic-core in app.core.serialization.json_response
+app = FastAPI(
+    title="NeuraDesk Backend - Phase 1",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Configure CORS
 app.add_middleware(
@@ -16,12 +90,118 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Conversation list pagination
 )
 
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load with a fast 429 the client can retry."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(memory.router, prefix="/api/v1/memory", tags=["memory"])
+app.include_router(ws.router, prefix="/api/v1", tags=["chat"])
+app.include_router(usage.router, prefix="/api/v1/usage", tags=["usage"])
+app.include_router(deletions.router, prefix="/api/v1", tags=["deletions"])
 
 
 @app.get("/api/v1/health")
 def root():
     return {"message": "NeuraDesk Backend Running!"}
+
+
+@app.get("/api/v1/ready")
+def ready():
+    """Readiness: 200 once warm-up succeeded, 503 with per-step status until then."""
+    status = warm_up.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.exception_handler(IdempotencyConflict)
+async def idempotency_conflict_handler(request: Request, exc: IdempotencyConflict):
+    """Reused keys get a 422; keys still running on another worker a retryable 409."""
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+    return JSONResponse(
+        status_code=exc.status_code, content={"detail": exc.detail}, headers=headers
+    )
+
+
+@app.get("/api/v1/metrics/coalescing")
+def coalescing_metrics():
+    """How much duplicate concurrent work request coalescing has saved."""
+    return singleflight_stats()
+
+
+@app.get("/api/v1/metrics/llm")
+def llm_metrics():
+    """Deadline, hedging, fallback and circuit breaker counters per call type."""
+    return {
+        "chat": _llm_service.chat_invoker.stats(),
+        "classification": _llm_service.classification_invoker.stats(),
+    }
+
+
+@app.get("/api/v1/metrics/prompt_cache")
+def prompt_cache_metrics():
+    """Chat turns whose stable prompt prefix could be served from the provider's cache."""
+    return prefix_cache_stats.stats()
+
+
+@app.get("/api/v1/metrics/admission")
+def admission_metrics():
+    """Admitted, queued and shed requests, plus current load."""
+    return admission_controller.stats()
+
+
+@app.get("/api/v1/metrics/cache")
+def cache_metrics():
+    """Local/shared hit rates of the profile, embedding and prompt caches."""
+    return cache_stats()
+
+
+@app.get("/api/v1/metrics/tracing")
+def tracing_metrics():
+    """Sampled, dropped and exported trace spans."""
+    return tracer.stats()
+
+
+@app.get("/api/v1/metrics/idempotency")
+def idempotency_metrics():
+    """Chat requests executed, replayed from a stored response, or still contended."""
+    return idempotency_store.stats()
+
+
+@app.get("/api/v1/metrics/sessions")
+def session_metrics():
+    """Open WebSocket chat sessions on this worker."""
+    return session_stats()
+
+
+@app.get("/api/v1/metrics/memory_tiers")
+async def memory_tier_metrics():
+    """Facts per storage tier (hot / archive) across all users."""
+    return await MemoryRepository().tier_counts()
+
+
+@app.get("/api/v1/metrics/usage")
+def usage_metrics():
+    """Model calls recorded, usage buckets waiting to be flushed, and quota rejections."""
+    return usage_aggregator.stats()
+
+
+@app.get("/api/v1/metrics/deletions")
+def deletion_metrics():
+    """Deletion jobs run by this worker, batches and rows deleted."""
+    return deletion_worker.stats()
+
+
+@app.get("/api/v1/metrics/traffic")
+def traffic_metrics():
+    """Flows and calls captured for replay by this worker (see app.cli.replay)."""
+    return traffic_recorder.stats()
@@ -1,5 +1,8 @@
+import asyncio
+
 from app.schemas.memory import MemoryClassificationResult
 from app.ai.chat_engine import classify_fact_structured
+from app.core.admission import Priority, admission_controller
 import json
 
 
@@ -26,7 +29,9 @@ class MemoryClassifier:
         Returns:
             Classification result with type, importance, and storage decision
         """
-        response = classify_fact_structured(user_message, old_facts)
+        # Runs after the chat slot is released, so it queues behind interactive requests
+        async with admission_controller.admit(priority=Priority.CLASSIFICATION):
+            response = await asyncio.to_thread(classify_fact_structured, user_message, old_facts)
         print(
             f"[CLASSIFIER] Raw response: category={response.category}, key={response.key}, value={response.value}, should_store={response.should_store}"
         )
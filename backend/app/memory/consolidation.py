@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import os
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.admission import admission_controller
+from app.core.cache import get_cache
+from app.database.repositories.memory import MemoryRepository
+from app.database.repositories.vector import VectorRepository
+from app.memory.rollups import ProjectRollups
+from app.schemas.memory import MemoryFact, MemoryType
+
+# Keys spelled this closely (favorite_food / favourite_food) name the same subject
+_KEY_SIMILARITY = 0.85
+
+
+class MemoryConsolidator:
+    """
+    Periodic maintenance job for long-term memory.
+
+    For each user:
+        1. Group facts by category (milestones additionally by project)
+        2. Merge semantically duplicate facts, keeping the most important / newest
+        3. Refresh the rollups of projects that lost facts
+        4. Prune vectors that no longer belong to a stored fact
+    """
+
+    def __init__(self, similarity_threshold: Optional[float] = None):
+        self.memory_repository = MemoryRepository()
+        self.vector_repository = VectorRepository()
+        self.project_rollups = ProjectRollups()
+        self.similarity_threshold = similarity_threshold or float(
+            os.getenv("CONSOLIDATION_SIMILARITY", "0.92")
+        )
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    async def consolidate_user(self, user_id: str) -> Dict[str, int]:
+        """Merge duplicate facts and prune orphaned vectors for one user."""
+        facts = await self.memory_repository.get_all_facts(user_id)
+        vectors = {
+            row["fact_id"]: row["embedding"]
+            for row in await self.vector_repository.get_embeddings(user_id)
+            if row.get("fact_id")
+        }
+
+        merged = 0
+        touched_projects = set()
+        for (category, project_key), group in self._group_facts(facts).items():
+            for survivor, duplicates in self._find_duplicates(group, vectors):
+                importance = max(f.importance for f in [survivor, *duplicates])
+                if importance > survivor.importance:
+                    await self.memory_repository.update_fact(
+                        survivor.id, user_id, {"importance": importance}
+                    )
+                merged += await self.memory_repository.delete_facts(
+                    user_id, [f.id for f in duplicates]
+                )
+                if category == MemoryType.PROJECT_MILESTONE:
+                    touched_projects.add(project_key)
+                elif category == MemoryType.PROJECT:
+                    for duplicate in duplicates:
+                        await self.project_rollups.forget_fact(duplicate)
+
+        for project_key in touched_projects:
+            await self.project_rollups.refresh_project(user_id, project_key)
+
+        if merged:
+            # Profiles cached by the API workers still list the merged facts
+            await get_cache("profile").ainvalidate(user_id)
+
+        # Archived facts are still stored, so they keep their vectors (restorable)
+        pruned = await self.vector_repository.delete_orphaned(user_id)
+
+        print(f"[CONSOLIDATION] user={user_id} merged={merged} pruned_vectors={pruned}")
+        return {"merged": merged, "pruned_vectors": pruned}
+
+    async def consolidate_all(self) -> Dict[str, int]:
+        """Run consolidation for every user that has stored facts."""
+        totals = {"users": 0, "merged": 0, "pruned_vectors": 0}
+        for user_id in await self.memory_repository.get_user_ids():
+            try:
+                async with admission_controller.admit_batch():
+                    stats = await self.consolidate_user(user_id)
+            except Exception as e:
+                print(f"[CONSOLIDATION ERROR] user={user_id}: {e}")
+                continue
+            totals["users"] += 1
+            totals["merged"] += stats["merged"]
+            totals["pruned_vectors"] += stats["pruned_vectors"]
+        return totals
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    @staticmethod
+    def _group_facts(facts: List[MemoryFact]) -> Dict[tuple, List[MemoryFact]]:
+        """Only facts in the same category (and same project, for milestones) can merge."""
+        groups = defaultdict(list)
+        for fact in facts:
+            if fact.category == MemoryType.PROJECT_MILESTONE:
+                groups[(fact.category, fact.key.split("_milestone_")[0])].append(fact)
+            else:
+                groups[(fact.category, None)].append(fact)
+        return groups
+
+    def _find_duplicates(
+        self, facts: List[MemoryFact], vectors: Dict[str, List[float]]
+    ) -> List[tuple]:
+        """
+        Cluster near-duplicate facts.
+        Two facts are duplicates when their keys name the same subject and
+        their embeddings are closer than the similarity threshold or their
+        values match exactly. Equal values under different keys (job and
+        dream_job both "engineer") are separate facts.
+
+        Returns:
+            List of (survivor, [duplicates]) tuples.
+        """
+        if len(facts) < 2:
+            return []
+
+        # Best candidates first: the first fact of each cluster survives
+        facts = sorted(
+            facts,
+            key=lambda f: (f.importance, f.updated_at.timestamp() if f.updated_at else 0.0),
+            reverse=True,
+        )
+        similarity = self._similarity_matrix(facts, vectors)
+        normalized = [" ".join(f.value.lower().split()) for f in facts]
+        subjects = [self._key_subject(f) for f in facts]
+
+        clusters = []
+        absorbed = set()
+        for i, survivor in enumerate(facts):
+            if i in absorbed:
+                continue
+            duplicates = []
+            for j in range(i + 1, len(facts)):
+                if j in absorbed:
+                    continue
+                if not self._same_subject(subjects[i], subjects[j]):
+                    continue
+                if similarity[i, j] >= self.similarity_threshold or normalized[i] == normalized[j]:
+                    duplicates.append(facts[j])
+                    absorbed.add(j)
+            if duplicates:
+                clusters.append((survivor, duplicates))
+        return clusters
+
+    @staticmethod
+    def _key_subject(fact: MemoryFact) -> str:
+        """Key tokens in sorted order; milestones compare only the part after their project."""
+        key = fact.key
+        if fact.category == MemoryType.PROJECT_MILESTONE:
+            key = key.split("_milestone_", 1)[-1]
+        return " ".join(sorted(re.findall(r"[a-z0-9]+", key.lower())))
+
+    @staticmethod
+    def _same_subject(a: str, b: str) -> bool:
+        return a == b or SequenceMatcher(None, a, b).ratio() >= _KEY_SIMILARITY
+
+    @staticmethod
+    def _similarity_matrix(facts: List[MemoryFact], vectors: Dict[str, List[float]]) -> np.ndarray:
+        """Pairwise cosine similarity; facts without a vector never match semantically."""
+        dims = next((len(v) for v in vectors.values()), 0)
+        matrix = np.zeros((len(facts), dims), dtype=np.float32)
+        for i, fact in enumerate(facts):
+            if fact.id in vectors:
+                matrix[i] = vectors[fact.id]
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        return matrix @ matrix.T
+
+
+async def _run(loop_forever: bool, user_id: Optional[str]) -> None:
+    consolidator = MemoryConsolidator()
+    interval = int(os.getenv("CONSOLIDATION_INTERVAL_SECONDS", "21600"))
+
+    while True:
+        if user_id:
+            async with admission_controller.admit_batch():
+                await consolidator.consolidate_user(user_id)
+        else:
+            totals = await consolidator.consolidate_all()
+            print(f"[CONSOLIDATION] run complete: {totals}")
+
+        if not loop_forever:
+            return
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge duplicate memories and prune vectors.")
+    parser.add_argument("--user-id", help="Only consolidate this user")
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="Keep running every CONSOLIDATION_INTERVAL_SECONDS",
+    )
+    args = parser.parse_args()
+    asyncio.run(_run(args.loop, args.user_id))
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.core.admission import admission_controller
+from app.core.cache import get_cache
+from app.database.repositories.memory import MemoryRepository
+from app.memory.lexical_index import drop_lexical_index
+from app.schemas.memory import MemoryTier, MemoryType
+
+load_dotenv()
+
+
+class DecayPolicy:
+    """
+    Scores how much a fact still earns its place in prompts and retrieval.
+
+        score = w * importance + (1 - w) * recency + hit_weight * usage
+
+    recency halves every `half_life_days` since the fact was last updated or
+    retrieved; usage grows with retrieval hits (saturating at `hit_saturation`).
+    A fact is cold once its score drops below `threshold`, provided it is at
+    least `min_age_days` old and its category is not protected.
+    """
+
+    def __init__(
+        self,
+        half_life_days: float = 30.0,
+        importance_weight: float = 0.6,
+        hit_weight: float = 0.2,
+        hit_saturation: int = 20,
+        threshold: float = 0.3,
+        min_age_days: float = 14.0,
+        protected_categories: tuple = (MemoryType.PERSONAL.value,),
+    ):
+        self.half_life_days = half_life_days
+        self.importance_weight = importance_weight
+        self.hit_weight = hit_weight
+        self.hit_saturation = hit_saturation
+        self.threshold = threshold
+        self.min_age_days = min_age_days
+        self.protected_categories = protected_categories
+
+    def score(self, row: dict, now: datetime) -> float:
+        last_used = _parse(row["updated_at"])
+        if row.get("last_retrieved_at"):
+            last_used = max(last_used, _parse(row["last_retrieved_at"]))
+        idle_days = max(0.0, (now - last_used).total_seconds() / 86400)
+        recency = 0.5 ** (idle_days / self.half_life_days)
+        usage = min(
+            1.0, math.log1p(row.get("retrieval_hits") or 0) / math.log1p(self.hit_saturation)
+        )
+        w = self.importance_weight
+        return w * float(row["importance"]) + (1 - w) * recency + self.hit_weight * usage
+
+    def is_cold(self, row: dict, now: datetime) -> bool:
+        if row["category"] in self.protected_categories:
+            return False
+        if now - _parse(row["updated_at"]) < timedelta(days=self.min_age_days):
+            return False
+        return self.score(row, now) < self.threshold
+
+
+class MemoryDecay:
+    """
+    Incremental background job that demotes cold facts to the archive tier.
+
+    Each batch scans the next `batch_size` hot facts (across all users, keyset
+    by id) that are old enough to decay, scores them with the policy and
+    archives the cold ones together with their vectors. The cursor wraps
+    around at the end of the table, so a pass over millions of facts is
+    spread over many small batches and never holds a long transaction.
+
+    Archived facts are restored with MemoryManager.restore_facts (or the
+    /memory/{user_id}/restore endpoint); restating a fact revives it too.
+    """
+
+    def __init__(self, policy: Optional[DecayPolicy] = None, batch_size: int = 500):
+        self.memory_repository = MemoryRepository()
+        self.policy = policy or DecayPolicy()
+        self.batch_size = batch_size
+        self.counters = {"batches": 0, "passes": 0, "scanned": 0, "archived": 0, "errors": 0}
+        self._after_id: Optional[str] = None
+
+    @property
+    def at_pass_end(self) -> bool:
+        """True once the last batch reached the end of the table (the next one starts over)."""
+        return self.counters["batches"] > 0 and self._after_id is None
+
+    async def run_batch(self) -> int:
+        """Score the next batch of candidates and archive the cold ones. Returns facts archived."""
+        now = datetime.now(timezone.utc)
+        rows = await self.memory_repository.get_decay_candidates(
+            older_than=now - timedelta(days=self.policy.min_age_days),
+            after_id=self._after_id,
+            limit=self.batch_size,
+        )
+        self.counters["batches"] += 1
+        self.counters["scanned"] += len(rows)
+        if len(rows) < self.batch_size:
+            self._after_id = None
+            self.counters["passes"] += 1
+        else:
+            self._after_id = rows[-1]["id"]
+
+        cold: Dict[str, List[str]] = defaultdict(list)
+        for row in rows:
+            if self.policy.is_cold(row, now):
+                cold[row["user_id"]].append(row["id"])
+
+        archived = 0
+        for user_id, fact_ids in cold.items():
+            try:
+                moved = await self.memory_repository.set_tier(user_id, fact_ids, MemoryTier.ARCHIVE)
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"[DECAY ERROR] user={user_id}: {e}")
+                continue
+            if moved:
+                archived += moved
+                # Profiles cached by the API workers still list the archived facts
+                await get_cache("profile").ainvalidate(user_id)
+                drop_lexical_index(user_id)
+
+        self.counters["archived"] += archived
+        if archived:
+            print(f"[DECAY] Archived {archived} of {len(rows)} scanned facts")
+        return archived
+
+    async def stats(self) -> dict:
+        """Job counters plus the current size of each tier."""
+        return {**self.counters, "tiers": await self.memory_repository.tier_counts()}
+
+
+def _parse(timestamp: str) -> datetime:
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def policy_from_env() -> DecayPolicy:
+    return DecayPolicy(
+        half_life_days=float(os.getenv("DECAY_HALF_LIFE_DAYS", "30")),
+        importance_weight=float(os.getenv("DECAY_IMPORTANCE_WEIGHT", "0.6")),
+        hit_weight=float(os.getenv("DECAY_HIT_WEIGHT", "0.2")),
+        threshold=float(os.getenv("DECAY_THRESHOLD", "0.3")),
+        min_age_days=float(os.getenv("DECAY_MIN_AGE_DAYS", "14")),
+    )
+
+
+async def _run(loop_forever: bool) -> None:
+    decay = MemoryDecay(policy_from_env(), batch_size=int(os.getenv("DECAY_BATCH_SIZE", "500")))
+    interval = float(os.getenv("DECAY_INTERVAL_SECONDS", "3600"))
+    pause = float(os.getenv("DECAY_BATCH_PAUSE_SECONDS", "1"))
+
+    while True:
+        async with admission_controller.admit_batch():
+            await decay.run_batch()
+        if not decay.at_pass_end:
+            # Small batches with pauses keep the scan from competing with chat traffic
+            await asyncio.sleep(pause)
+            continue
+        print(f"[DECAY] pass complete: {await decay.stats()}")
+        if not loop_forever:
+            return
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive cold memories (hot/archive tiering).")
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="Start a new pass DECAY_INTERVAL_SECONDS after each one completes",
+    )
+    args = parser.parse_args()
+    asyncio.run(_run(args.loop))
@@ -0,0 +1,156 @@
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.schemas.memory import MemoryFact
+
+# Identifiers stay whole ("skill_python", "err-504", "v2.1") and are also split into parts
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[_\-.][a-z0-9]+)*")
+_PART_SEPARATORS = re.compile(r"[_\-.]")
+_STOPWORDS = frozenset(
+    "a an and are as at be did do does for from had has have how i in is it me my of on or "
+    "our so that the their this to was we were what when where which who why will with you "
+    "your about tell know remember".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of a text: whole identifiers plus their parts, minus stopwords."""
+    tokens = []
+    for term in _TOKEN_PATTERN.findall((text or "").lower()):
+        if term not in _STOPWORDS:
+            tokens.append(term)
+        parts = _PART_SEPARATORS.split(term)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p and p not in _STOPWORDS)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    BM25 index over one user's fact keys and values.
+
+    Complements vector search for exact identifiers (project names, keys like
+    `skill_python`, error codes) that embeddings blur or that fall under the
+    similarity threshold. Key terms count twice, so a fact whose key matches
+    outranks one that only mentions the term. Facts are added and removed
+    incrementally as they are stored and deleted.
+    """
+
+    def __init__(self, facts: Iterable[MemoryFact] = (), k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.built_at = time.monotonic()
+        self._facts: Dict[str, MemoryFact] = {}
+        self._lengths: Dict[str, int] = {}
+        self._terms: Dict[str, List[str]] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._total_length = 0
+        for fact in facts:
+            self.add(fact)
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    def add(self, fact: MemoryFact) -> None:
+        """Index a fact, replacing any earlier version stored under the same key."""
+        self.remove(fact.key)
+        terms = Counter(tokenize(fact.key) * 2 + tokenize(fact.value))
+        for term, frequency in terms.items():
+            self._postings[term][fact.key] = frequency
+        self._facts[fact.key] = fact
+        self._terms[fact.key] = list(terms)
+        self._lengths[fact.key] = sum(terms.values())
+        self._total_length += self._lengths[fact.key]
+
+    def remove(self, key: str) -> None:
+        if key not in self._facts:
+            return
+        del self._facts[key]
+        self._total_length -= self._lengths.pop(key)
+        for term in self._terms.pop(key):
+            del self._postings[term][key]
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[MemoryFact, float]]:
+        """Facts ranked by BM25 score against the query terms."""
+        if not self._facts:
+            return []
+        average_length = self._total_length / len(self._facts)
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (len(self._facts) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for key, frequency in docs.items():
+                norm = 1 - self.b + self.b * self._lengths[key] / average_length
+                scores[key] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self._facts[key], score) for key, score in ranked]
+
+    def covering_match(self, query: str, margin: float = 2.0) -> Optional[MemoryFact]:
+        """
+        The one fact a query is unambiguously about, or None.
+
+        Its key must appear verbatim in the query and cover it: either the key
+        is a multi-part identifier ("what is my skill_python?") or every query
+        term is a key term ("what is my job?", but not "find a job near me").
+        It must also be the top BM25 hit, scoring `margin` times the next one.
+        """
+        terms = set(tokenize(query))
+        candidates = [
+            key
+            for key in dict.fromkeys(_TOKEN_PATTERN.findall((query or "").lower()))
+            if key in self._facts and (_PART_SEPARATORS.search(key) or terms <= set(tokenize(key)))
+        ]
+        if len(candidates) != 1:
+            return None
+        ranked = self.search(query, limit=2)
+        if not ranked or ranked[0][0].key != candidates[0]:
+            return None
+        if len(ranked) > 1 and ranked[0][1] < margin * ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Merge ranked ID lists: each ID scores sum(1 / (k + rank)) over the lists it is in."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+
+# Per-user indexes, updated in place on store/delete. The TTL bounds staleness from
+# writes made by other workers or by the consolidation job.
+_MAX_CACHED_USERS = 1024
+_INDEX_TTL_SECONDS = float(os.getenv("LEXICAL_INDEX_TTL", "300"))
+_index_cache: "OrderedDict[str, LexicalIndex]" = OrderedDict()
+
+
+def cached_lexical_index(user_id: str) -> Optional[LexicalIndex]:
+    """The user's index if one is loaded and still fresh."""
+    index = _index_cache.get(user_id)
+    if index is None or time.monotonic() - index.built_at > _INDEX_TTL_SECONDS:
+        return None
+    _index_cache.move_to_end(user_id)
+    return index
+
+
+def cache_lexical_index(user_id: str, index: LexicalIndex) -> None:
+    _index_cache[user_id] = index
+    _index_cache.move_to_end(user_id)
+    while len(_index_cache) > _MAX_CACHED_USERS:
+        _index_cache.popitem(last=False)
+
+
+def drop_lexical_index(user_id: str) -> None:
+    """Forget the user's index so the next query rebuilds it (after bulk tier changes)."""
+    _index_cache.pop(user_id, None)
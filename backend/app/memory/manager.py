@@ -1,12 +1,43 @@
-import time
+import asyncio
+import hashlib
+import os
+import re
 from datetime import datetime
 from typing import List, Optional
 
 from app.ai.llm import _llm_service
+from app.core.cache import get_cache
+from app.core.singleflight import SingleFlight
 from app.database.repositories.memory import MemoryRepository
 from app.database.repositories.vector import VectorRepository
 from app.memory.classifier import MemoryClassifier
-from app.schemas.memory import MemoryFact, MemoryType
+from app.memory.lexical_index import (
+    LexicalIndex,
+    cache_lexical_index,
+    cached_lexical_index,
+    drop_lexical_index,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from app.memory.project_index import ProjectIndex, get_project_index
+from app.memory.rollups import ProjectRollups
+from app.schemas.memory import MemoryClassificationResult, MemoryFact, MemoryTier, MemoryType
+
+# Concurrent profile loads for the same user (double submits, parallel tabs) share one query
+_profile_flight = SingleFlight("profile")
+# Profiles are shared across workers; storing or deleting a fact invalidates them everywhere
+_profile_cache = get_cache("profile", shared_ttl=float(os.getenv("PROFILE_CACHE_TTL", "300")))
+_lexical_flight = SingleFlight("lexical_index")
+# Fire-and-forget retrieval-hit writes; referenced here so they are not garbage collected
+_hit_tasks: set = set()
+
+# Hybrid retrieval: RRF constant, and the longest query answered from exact key hits alone
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_EXACT_MAX_TERMS = int(os.getenv("HYBRID_EXACT_MAX_TERMS", "4"))
+HYBRID_EXACT_MARGIN = float(os.getenv("HYBRID_EXACT_MARGIN", "2.0"))
+
+# Date and content digest that close a milestone key (..._milestone_<date>_<digest>)
+_MILESTONE_SUFFIX = re.compile(r"_\d{4}-\d{2}-\d{2}_[0-9a-f]+$")
 
 
 class MemoryManager:
@@ -26,6 +57,7 @@ class MemoryManager:
         self.memory_repository = MemoryRepository()
         self.vector_repository = VectorRepository()
         self.classifier = MemoryClassifier()
+        self.project_rollups = ProjectRollups()
 
     # ── Public API ───────────────────────────────────────────────────
 
@@ -40,6 +72,36 @@ class MemoryManager:
         Process a conversation turn to extract and store memories.
         Called after each AI response to check if anything should be remembered.
         """
+        # 1-6. Classify, resolve and build the fact
+        _, _, fact = await self.extract_fact(user_id, user_message, profile, relevant_memories)
+        if fact is None:
+            return None
+
+        # 7. Store
+        if fact.category != MemoryType.EPHEMERAL:
+            fact = await self.memory_repository.store_fact(fact)
+            await self._store_embedding(user_id, fact)
+            await self._update_project_rollup(fact)
+            await _profile_cache.ainvalidate(user_id)
+            index = cached_lexical_index(user_id)
+            if index is not None:
+                index.add(fact)
+
+        return fact
+
+    async def extract_fact(
+        self,
+        user_id: str,
+        user_message: str,
+        profile: dict,
+        relevant_memories: List[dict] = None,
+    ) -> tuple[MemoryClassificationResult, Optional[str], Optional[MemoryFact]]:
+        """
+        Classify a message and resolve it into a fact without storing anything.
+
+        Returns (classification, resolved base project key, fact); the fact is
+        None when the classifier decides nothing should be stored.
+        """
         # 1. Prepare context for classification
         search_context = self._build_search_context(relevant_memories)
         full_facts_str = f"User Profile: {str(profile)}\nRecent Relevant Memories: {search_context}"
@@ -50,10 +112,12 @@ class MemoryManager:
             old_facts=full_facts_str,
         )
         if not classification.should_store:
-            return None
+            return classification, None, None
 
         # 3. Entity Resolution — link to existing project if applicable
-        base_project_key = self._align_project_key(classification, profile, relevant_memories)
+        base_project_key = self._align_project_key(
+            classification, profile, relevant_memories, user_id=user_id
+        )
 
         # 4. Key Generation & Category Adjustment
         fact_key, category = self._resolve_fact_key(classification, base_project_key)
@@ -63,7 +127,7 @@ class MemoryManager:
         if category == MemoryType.PROJECT_MILESTONE:
             fact_value = self._enhance_milestone_value(fact_value, fact_key, base_project_key)
 
-        # 6. Create & Store
+        # 6. Create
         fact = MemoryFact(
             user_id=user_id,
             category=category,
@@ -73,11 +137,7 @@ class MemoryManager:
             context=f"Q: {user_message}",
         )
 
-        if fact.category != MemoryType.EPHEMERAL:
-            fact = await self.memory_repository.store_fact(fact)
-            await self._store_embedding(user_id, fact)
-
-        return fact
+        return classification, base_project_key, fact
 
     async def get_relevant_memories(
         self,
@@ -86,54 +146,154 @@ class MemoryManager:
         limit: int = 5,
     ) -> List[MemoryFact]:
         """
-        Retrieve relevant memories for a given query via semantic (vector) search.
+        Retrieve relevant memories for a given query via hybrid search.
+
+        A BM25 index over fact keys and values catches exact identifiers that
+        semantic search misses; its ranking is merged with the vector results
+        by reciprocal rank fusion. Short queries that are only about one fact
+        key (see LexicalIndex.covering_match) are answered from the lexical
+        index alone, without an embedding call.
         """
-        query_embedding = _llm_service.get_embedding(query)
+        index = await self._lexical_index(user_id)
+        exact = None
+        if len(tokenize(query)) <= HYBRID_EXACT_MAX_TERMS:
+            exact = index.covering_match(query, margin=HYBRID_EXACT_MARGIN)
+        if exact is not None:
+            print(f"[HYBRID] Exact key hit, skipping embedding: {exact.key}")
+            self._record_hits(user_id, [exact.key])
+            return [self._context_fact(user_id, self.embedding_document(exact)[0])]
+
+        model = await self.vector_repository.get_active_model(default=_llm_service.EMBEDDING_MODEL)
+        query_embedding = await _llm_service.aget_embedding(query, model=model)
         vector_results = await self.vector_repository.search_similar(
             user_id=user_id,
             query_embedding=query_embedding,
             limit=limit,
             match_threshold=0.5,
+            embedding_model=model,
         )
 
-        return [
-            MemoryFact(
-                user_id=user_id,
-                category=MemoryType.EPHEMERAL,
-                importance=0.8,
-                key="context",
-                value=res["content"],
-                context=res["content"],
-            )
-            for res in vector_results
-        ]
+        # Fuse on fact key (vectors carry it in their metadata) so both sources dedupe
+        contents = {}
+        lexical_ranking = []
+        for fact, _ in index.search(query, limit=limit):
+            contents[fact.key] = self.embedding_document(fact)[0]
+            lexical_ranking.append(fact.key)
+        keys = set(lexical_ranking)
+        vector_ranking = []
+        for res in vector_results:
+            key = (res.get("metadata") or {}).get("key")
+            if key:
+                keys.add(key)
+            doc_id = key or res["content"]
+            contents.setdefault(doc_id, res["content"])
+            vector_ranking.append(doc_id)
+
+        fused = reciprocal_rank_fusion([lexical_ranking, vector_ranking], k=HYBRID_RRF_K)
+        self._record_hits(user_id, [doc_id for doc_id in fused[:limit] if doc_id in keys])
+        return [self._context_fact(user_id, contents[doc_id]) for doc_id in fused[:limit]]
 
     async def get_user_profile(self, user_id: str) -> dict:
         """
         Build a summary of what we know about the user.
         Used for context injection into chat prompts.
+
+        Projects are served from their rollups: each project carries its
+        milestone count and only the latest milestones, never the full history.
         """
-        personal_facts = await self.memory_repository.get_facts(
-            user_id=user_id, category=MemoryType.PERSONAL
+        return await _profile_cache.get_or_load(
+            user_id, lambda: _profile_flight.do(user_id, self._load_user_profile, user_id)
         )
-        preferences = await self.memory_repository.get_facts(
-            user_id=user_id, category=MemoryType.PREFERENCE
-        )
-        projects = await self.memory_repository.get_facts(
-            user_id=user_id, category=MemoryType.PROJECT
-        )
-        milestones = await self.memory_repository.get_facts(
-            user_id=user_id, category=MemoryType.PROJECT_MILESTONE
+
+    async def _load_user_profile(self, user_id: str) -> dict:
+        personal_facts, preferences, rollups = await asyncio.gather(
+            self.memory_repository.get_facts(user_id=user_id, category=MemoryType.PERSONAL),
+            self.memory_repository.get_facts(user_id=user_id, category=MemoryType.PREFERENCE),
+            self.project_rollups.get_rollups(user_id),
         )
 
         return {
             "personal": [{"key": f.key, "value": f.value} for f in personal_facts],
             "preferences": [{"key": f.key, "value": f.value} for f in preferences],
-            "projects": [{"key": f.key, "value": f.value} for f in projects + milestones],
+            "projects": [
+                {
+                    "key": r.project_key,
+                    "value": r.summary or "",
+                    "milestone_count": r.milestone_count,
+                    "recent_milestones": [m["value"] for m in r.recent_milestones],
+                }
+                for r in rollups
+            ],
         }
 
+    async def get_project_history(self, user_id: str, project_key: str) -> List[MemoryFact]:
+        """Full milestone history of a project, newest first (loaded on demand)."""
+        return await self.project_rollups.get_history(user_id, project_key)
+
+    async def delete_fact(self, fact_id: str, user_id: str) -> bool:
+        """Delete a fact and keep its project rollup in sync."""
+        fact = await self.memory_repository.get_fact(fact_id, user_id)
+        if fact is None:
+            return False
+
+        deleted = await self.memory_repository.delete_fact(fact_id, user_id)
+        if deleted and fact.category in [MemoryType.PROJECT, MemoryType.PROJECT_MILESTONE]:
+            await self.project_rollups.forget_fact(fact)
+        if deleted:
+            await _profile_cache.ainvalidate(user_id)
+            index = cached_lexical_index(user_id)
+            if index is not None:
+                index.remove(fact.key)
+        return deleted
+
+    async def restore_facts(self, user_id: str, fact_ids: List[str]) -> int:
+        """Bring archived facts back into profiles and retrieval. Returns facts restored."""
+        restored = await self.memory_repository.set_tier(user_id, fact_ids, MemoryTier.HOT)
+        if restored:
+            await _profile_cache.ainvalidate(user_id)
+            drop_lexical_index(user_id)
+        return restored
+
     # ── Private Helpers ──────────────────────────────────────────────
 
+    def _record_hits(self, user_id: str, keys: List[str]) -> None:
+        """Count retrievals in the background; decay scores read them, answers never wait."""
+
+        async def record():
+            try:
+                await self.memory_repository.record_hits(user_id, keys)
+            except Exception as e:
+                print(f"[DECAY] Could not record retrieval hits: {e}")
+
+        if keys:
+            task = asyncio.create_task(record())
+            _hit_tasks.add(task)
+            task.add_done_callback(_hit_tasks.discard)
+
+    async def _lexical_index(self, user_id: str) -> LexicalIndex:
+        """The user's lexical index, built from all their facts on first use."""
+        index = cached_lexical_index(user_id)
+        if index is None:
+            index = await _lexical_flight.do(user_id, self._build_lexical_index, user_id)
+        return index
+
+    async def _build_lexical_index(self, user_id: str) -> LexicalIndex:
+        index = LexicalIndex(await self.memory_repository.get_all_facts(user_id))
+        cache_lexical_index(user_id, index)
+        return index
+
+    @staticmethod
+    def _context_fact(user_id: str, content: str) -> MemoryFact:
+        """Wrap retrieved text as an ephemeral context memory for the prompt."""
+        return MemoryFact(
+            user_id=user_id,
+            category=MemoryType.EPHEMERAL,
+            importance=0.8,
+            key="context",
+            value=content,
+            context=content,
+        )
+
     @staticmethod
     def _build_search_context(relevant_memories: Optional[List] = None) -> str:
         """Extract text values from memory objects/dicts into a single context string."""
@@ -146,78 +306,71 @@ class MemoryManager:
         return "\n".join(results)
 
     async def _store_embedding(self, user_id: str, fact: MemoryFact) -> None:
-        """Generate and store an embedding for the given fact."""
-        feature_text = f"{fact.key}: {fact.value}"
-        embedding = _llm_service.get_embedding(feature_text)
+        """
+        Generate and store an embedding for the given fact.
+        Re-storing a fact replaces its previous vector instead of adding a new one.
+        """
+        feature_text, metadata = self.embedding_document(fact)
+        model = await self.vector_repository.get_active_model(default=_llm_service.EMBEDDING_MODEL)
+        embedding = await _llm_service.aget_embedding(feature_text, model=model)
 
-        await self.vector_repository.store_embedding(
-            user_id=user_id,
-            text=feature_text,
-            embedding=embedding,
-            metadata={
-                "category": fact.category.value,
-                "key": fact.key,
-                "importance": fact.importance,
-            },
-        )
+        if fact.id:
+            await self.vector_repository.upsert_embedding(
+                user_id=user_id,
+                fact_id=fact.id,
+                text=feature_text,
+                embedding=embedding,
+                metadata=metadata,
+                embedding_model=model,
+            )
+        else:
+            await self.vector_repository.store_embedding(
+                user_id=user_id,
+                text=feature_text,
+                embedding=embedding,
+                metadata=metadata,
+                embedding_model=model,
+            )
+
+    @staticmethod
+    def embedding_document(fact: MemoryFact) -> tuple[str, dict]:
+        """Text that gets embedded for a fact, and the metadata stored alongside it."""
+        return f"{fact.key}: {fact.value}", {
+            "category": fact.category.value,
+            "key": fact.key,
+            "importance": fact.importance,
+        }
+
+    async def _update_project_rollup(self, fact: MemoryFact) -> None:
+        """Fold a stored project or milestone fact into its project rollup."""
+        try:
+            if fact.category == MemoryType.PROJECT:
+                await self.project_rollups.record_project(fact)
+            elif fact.category == MemoryType.PROJECT_MILESTONE:
+                await self.project_rollups.record_milestone(fact)
+        except Exception as e:
+            print(f"[ROLLUP ERROR] {e}")
 
     def _align_project_key(
         self,
         classification,
         profile: dict,
         relevant_memories: Optional[List[MemoryFact]] = None,
+        user_id: Optional[str] = None,
     ) -> Optional[str]:
         """
         Entity resolution: determine if a new fact relates to an existing project.
-        Scans both the structured profile and semantically retrieved memories.
+        Looks the classification up in the user's project index, built from both
+        the structured profile and semantically retrieved memories.
         """
         try:
             existing_projects = self._collect_existing_projects(profile, relevant_memories)
             if not existing_projects:
                 return None
 
-            new_key_clean = classification.key.lower().replace("project_", "").replace("_", " ")
-            new_value_clean = classification.value.lower()
-
-            for p in existing_projects:
-                base_key = self._extract_base_key(p["key"])
-
-                # Direct key match
-                if base_key == classification.key.lower():
-                    return base_key
-
-                # New key contains base key
-                if base_key in classification.key.lower():
-                    return base_key
-
-                # Content/value matching
-                project_name = base_key.replace("project_", "").replace("_", " ")
-                if not project_name:
-                    continue
-
-                # Exact phrase match: "project <name>"
-                if (
-                    f"project {project_name}" in new_value_clean
-                    or f"project {project_name}" in new_key_clean
-                ):
-                    print(f"[ENTITY RESOLUTION] Matched via 'project {project_name}' -> {base_key}")
-                    return base_key
-
-                # Key-part match: e.g. key="project_x_update" contains part "x"
-                if project_name in new_key_clean.split(" "):
-                    print(
-                        f"[ENTITY RESOLUTION] Matched via key part '{project_name}' -> {base_key}"
-                    )
-                    return base_key
-
-                # Substring match for longer names (>= 4 chars to avoid false positives)
-                if len(project_name) >= 4 and project_name in new_value_clean:
-                    print(
-                        f"[ENTITY RESOLUTION] Matched via substring '{project_name}' -> {base_key}"
-                    )
-                    return base_key
-
-            return None
+            base_keys = {ProjectIndex.base_key(p["key"]) for p in existing_projects}
+            index = get_project_index(user_id, base_keys)
+            return index.resolve(classification.key, classification.value)
 
         except Exception as e:
             print(f"[ENTITY RESOLUTION ERROR] {e}")
@@ -242,18 +395,11 @@ class MemoryManager:
 
         return projects
 
-    @staticmethod
-    def _extract_base_key(raw_key: str) -> str:
-        """Extract the root project key, stripping milestone suffixes."""
-        key = raw_key.lower()
-        if "_milestone_" in key:
-            return key.split("_milestone_")[0]
-        return key
-
     def _resolve_fact_key(self, classification, base_project_key: Optional[str]) -> tuple[str, str]:
         """
         Determine the final storage key and category.
-        Converts PROJECT updates to MILESTONEs and adds timestamps.
+        Converts PROJECT updates to MILESTONEs and adds a date + content suffix,
+        so restating the same milestone on the same day updates it in place.
         """
         category = classification.category
         fact_key = classification.key.lower().replace(" ", "_")
@@ -263,19 +409,19 @@ class MemoryManager:
             return fact_key, category
 
         date_str = datetime.now().strftime("%Y-%m-%d")
-        ts_short = int(time.time()) % 10000
+        digest = self._milestone_digest(classification.value)
 
         if category == MemoryType.PROJECT_MILESTONE:
             base_key = base_project_key or fact_key.split("_milestone_")[0]
             if not base_key.startswith("project_"):
                 base_key = f"project_{base_key}"
-            return f"{base_key}_milestone_{date_str}_{ts_short}", category
+            return f"{base_key}_milestone_{date_str}_{digest}", category
 
         # category == PROJECT
         if base_project_key:
             # Update to existing project -> treat as milestone
             return (
-                f"{base_project_key}_milestone_{date_str}_{ts_short}",
+                f"{base_project_key}_milestone_{date_str}_{digest}",
                 MemoryType.PROJECT_MILESTONE,
             )
 
@@ -284,6 +430,15 @@ class MemoryManager:
             return f"project_{fact_key}", category
         return fact_key, category
 
+    @staticmethod
+    def _milestone_digest(value: Optional[str]) -> str:
+        """
+        Digest of a milestone value (case/whitespace-insensitive). 48 bits, so
+        distinct milestones of a project on one day never share a key.
+        """
+        normalized = " ".join((value or "").lower().split())
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
     @staticmethod
     def _enhance_milestone_value(
         original_value: str,
@@ -298,7 +453,7 @@ class MemoryManager:
         if original_value.strip().lower() not in GENERIC_VALUES:
             return original_value
 
-        key_parts = fact_key.split("_")
+        key_parts = _MILESTONE_SUFFIX.sub("", fact_key).split("_")
 
         # Determine which parts belong to the project name (to exclude)
         if "_milestone_" in fact_key:
@@ -0,0 +1,184 @@
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _Automaton:
+    """
+    Aho-Corasick automaton over a fixed set of patterns.
+    Finds every pattern occurring in a text in a single pass.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        # Node 0 is the root; each node has goto edges, a fail link and outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(payload)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                # Children of the root fail back to the root
+                self._fail[child] = 0 if fail == child else fail
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> Iterator[str]:
+        """Yield the payload of every pattern found in text."""
+        node = 0
+        for ch in text:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            yield from self._out[node]
+
+
+class ProjectIndex:
+    """
+    Per-user index of known project keys for entity resolution.
+
+    Resolves a classified (key, value) pair to an existing base project key
+    by applying the match rules in priority order:
+        1. Direct key match
+        2. New key contains the base key
+        3. Exact phrase "project <name>" in the value or key
+        4. Project name is one of the key's parts
+        5. Project name (>= 4 chars) appears in the value
+
+    Rules are tried in that order across all projects: a project matched by
+    an earlier rule wins over one matched by a later rule. This differs from
+    the previous per-project loop, where the first listed project matching
+    any rule won: with projects [project_beta, project_alpha_tool], a fact
+    keyed "beta_notes" whose value mentions "project alpha tool" used to go
+    to project_beta (key part, listed first) and now goes to
+    project_alpha_tool (phrase). Within a rule, the longest (most specific)
+    project key wins, so the result does not depend on the order projects
+    were loaded in.
+    """
+
+    MIN_SUBSTRING_LENGTH = 4
+
+    def __init__(self, base_keys: Iterable[str]):
+        self.keys = frozenset(k for k in base_keys if k)
+
+        names = {key: self.project_name(key) for key in self.keys}
+        self._by_token: Dict[str, List[str]] = {}
+        for key, name in names.items():
+            if name:
+                self._by_token.setdefault(name, []).append(key)
+
+        self._key_automaton = _Automaton((key, key) for key in self.keys)
+        self._phrase_automaton = _Automaton(
+            (f"project {name}", key) for key, name in names.items() if name
+        )
+        self._name_automaton = _Automaton(
+            (name, key) for key, name in names.items() if len(name) >= self.MIN_SUBSTRING_LENGTH
+        )
+
+    @staticmethod
+    def base_key(raw_key: str) -> str:
+        """Extract the root project key, stripping milestone suffixes."""
+        key = raw_key.lower()
+        if "_milestone_" in key:
+            return key.split("_milestone_")[0]
+        return key
+
+    @staticmethod
+    def project_name(base_key: str) -> str:
+        """Human-readable project name used for content matching."""
+        return base_key.replace("project_", "").replace("_", " ")
+
+    def resolve(self, key: str, value: str) -> Optional[str]:
+        """Return the base key of the project this fact belongs to, if any."""
+        if not self.keys:
+            return None
+
+        new_key = (key or "").lower()
+        new_key_clean = new_key.replace("project_", "").replace("_", " ")
+        new_value_clean = (value or "").lower()
+
+        # 1. Direct key match
+        if new_key in self.keys:
+            return new_key
+
+        # 2. New key contains base key
+        match = self._best(self._key_automaton.find(new_key))
+        if match:
+            return match
+
+        # 3. Exact phrase match: "project <name>"
+        match = self._best(
+            [
+                *self._phrase_automaton.find(new_value_clean),
+                *self._phrase_automaton.find(new_key_clean),
+            ]
+        )
+        if match:
+            print(f"[ENTITY RESOLUTION] Matched via 'project <name>' -> {match}")
+            return match
+
+        # 4. Key-part match: e.g. key="project_x_update" contains part "x"
+        match = self._best(
+            k for part in new_key_clean.split(" ") for k in self._by_token.get(part, ())
+        )
+        if match:
+            print(f"[ENTITY RESOLUTION] Matched via key part -> {match}")
+            return match
+
+        # 5. Substring match for longer names (to avoid false positives)
+        match = self._best(self._name_automaton.find(new_value_clean))
+        if match:
+            print(f"[ENTITY RESOLUTION] Matched via substring -> {match}")
+            return match
+
+        return None
+
+    @staticmethod
+    def _best(candidates: Iterable[str]) -> Optional[str]:
+        """Pick the most specific candidate: longest key, then alphabetical."""
+        return min(candidates, key=lambda k: (-len(k), k), default=None)
+
+
+# Per-user indexes, kept across requests and rebuilt only when project keys change
+_MAX_CACHED_USERS = 1024
+_index_cache: "OrderedDict[str, ProjectIndex]" = OrderedDict()
+
+
+def get_project_index(user_id: Optional[str], base_keys: Iterable[str]) -> ProjectIndex:
+    """Return the cached index for a user, rebuilding it if its project set changed."""
+    keys = frozenset(base_keys)
+    if user_id is None:
+        return ProjectIndex(keys)
+
+    index = _index_cache.get(user_id)
+    if index is None or index.keys != keys:
+        index = ProjectIndex(keys)
+    _index_cache[user_id] = index
+    _index_cache.move_to_end(user_id)
+    while len(_index_cache) > _MAX_CACHED_USERS:
+        _index_cache.popitem(last=False)
+    return index
+
+
+def drop_project_index(user_id: str) -> None:
+    """Forget the user's index (after their account is purged)."""
+    _index_cache.pop(user_id, None)
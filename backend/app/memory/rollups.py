@@ -0,0 +1,90 @@
+import os
+from typing import List, Optional
+
+from app.database.repositories.memory import MemoryRepository
+from app.database.repositories.rollups import ProjectRollupRepository
+from app.schemas.memory import MemoryFact, ProjectRollup
+
+
+class ProjectRollups:
+    """
+    Maintains compact per-project summaries of project memory.
+
+    Each project keeps one rollup row: its description, the total number of
+    milestones and only the latest K milestones. Prompts use the rollups, so
+    profile size stays bounded per project; full history is loaded on demand.
+    """
+
+    def __init__(self, recent_limit: Optional[int] = None):
+        self.memory_repository = MemoryRepository()
+        self.rollup_repository = ProjectRollupRepository()
+        self.recent_limit = recent_limit or int(os.getenv("PROJECT_ROLLUP_MILESTONES", "5"))
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    async def get_rollups(self, user_id: str) -> List[ProjectRollup]:
+        """All project rollups for a user."""
+        return await self.rollup_repository.get_rollups(user_id)
+
+    async def record_project(self, fact: MemoryFact) -> None:
+        """Set the project description from a stored PROJECT fact."""
+        await self.rollup_repository.set_summary(fact.user_id, fact.key, fact.value)
+
+    async def record_milestone(self, fact: MemoryFact) -> ProjectRollup:
+        """
+        Fold a newly stored milestone into its project's rollup.
+
+        The fold runs in the database (record_project_milestone), so
+        concurrent milestones of one project never lose an increment; a
+        restated milestone updates its entry instead of counting twice.
+        """
+        return await self.rollup_repository.record_milestone(
+            fact.user_id,
+            self.project_key_of(fact.key),
+            fact.key,
+            fact.value,
+            fact.updated_at or fact.created_at,
+            self.recent_limit,
+        )
+
+    async def forget_fact(self, fact: MemoryFact) -> Optional[ProjectRollup]:
+        """Update a project's rollup after one of its facts was deleted."""
+        project_key = self.project_key_of(fact.key)
+        if fact.key == project_key:
+            rollup = await self.rollup_repository.get_rollup(fact.user_id, project_key)
+            if rollup is not None and rollup.summary is not None:
+                rollup.summary = None
+                await self.rollup_repository.upsert_rollup(rollup)
+        return await self.refresh_project(fact.user_id, project_key)
+
+    async def refresh_project(self, user_id: str, project_key: str) -> Optional[ProjectRollup]:
+        """Recompute a project's rollup from its full history (e.g. after deletions)."""
+        history = await self.get_history(user_id, project_key)
+        rollup = await self.rollup_repository.get_rollup(user_id, project_key)
+
+        if not history and (rollup is None or not rollup.summary):
+            if rollup is not None:
+                await self.rollup_repository.delete_rollup(user_id, project_key)
+            return None
+
+        if rollup is None:
+            rollup = ProjectRollup(user_id=user_id, project_key=project_key)
+        rollup.milestone_count = len(history)
+        rollup.recent_milestones = [
+            {"key": f.key, "value": f.value} for f in history[: self.recent_limit]
+        ]
+        rollup.last_milestone_at = history[0].created_at if history else None
+        return await self.rollup_repository.upsert_rollup(rollup)
+
+    async def get_history(
+        self, user_id: str, project_key: str, limit: Optional[int] = None
+    ) -> List[MemoryFact]:
+        """Full milestone history of a project, newest first."""
+        return await self.memory_repository.get_facts_by_key_prefix(
+            user_id, f"{project_key}_milestone_", limit=limit
+        )
+
+    @staticmethod
+    def project_key_of(fact_key: str) -> str:
+        """Base project key of a project or milestone fact key."""
+        return fact_key.split("_milestone_")[0]
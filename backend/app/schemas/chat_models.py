@@ -7,6 +7,8 @@ class ChatRequest(BaseModel):
     context: str
     user_id: str
     conversation_id: Optional[str] = None
+    # Retries of the same logical request reuse the key (the Idempotency-Key header also works)
+    idempotency_key: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -1,14 +1,26 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import AliasChoices, BaseModel, Field, TypeAdapter
 
 
 class Conversation(BaseModel):
     id: str
     user_id: str
     title: str
-    is_favourite: bool
+    # The column is spelled "is_favorite"; rows validate straight into the model
+    is_favourite: bool = Field(validation_alias=AliasChoices("is_favourite", "is_favorite"))
     is_archived: bool
     created_at: str
     updated_at: str
+    # Summary maintained by MessageRepository.save_messages (see migrations/008)
+    last_message: Optional[str] = None  # Preview of the newest message
+    last_message_role: Optional[str] = None
+    message_count: int = 0
+    last_activity_at: Optional[str] = None
+
+
+# Validates a whole result set in one call and dumps it straight to JSON bytes
+ConversationList = TypeAdapter(List[Conversation])
 
 
 class ConversationUpdate(BaseModel):
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from enum import Enum
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -14,6 +14,13 @@ class MemoryType(str, Enum):
     PROJECT_MILESTONE = "project_milestone"  # Project milestones
 
 
+class MemoryTier(str, Enum):
+    """Storage tier of a fact (see app.memory.decay)"""
+
+    HOT = "hot"  # Used for profiles and retrieval
+    ARCHIVE = "archive"  # Decayed: kept and restorable, but excluded by default
+
+
 class MemoryFact(BaseModel):
     """Represents a single memory fact"""
 
@@ -24,10 +31,22 @@ class MemoryFact(BaseModel):
     key: str  # e.g., "name", "favorite_language", "project_alpha_id"
     value: str  # The actual fact
     context: Optional[str] = None  # Additional context
+    tier: MemoryTier = MemoryTier.HOT
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 
+# Validates a whole result set in one call and dumps it straight to JSON bytes
+MemoryFactList = TypeAdapter(List[MemoryFact])
+
+
+class MemoryPage(BaseModel):
+    """One page of a fact search; pass next_cursor back to get the following page"""
+
+    items: List[Dict[str, Any]]  # Only the requested fields of each fact
+    next_cursor: Optional[str] = None
+
+
 class MemoryQuery(BaseModel):
     """Query to retrieve relevant memories"""
 
@@ -45,3 +64,19 @@ class MemoryClassificationResult(BaseModel):
     value: str
     should_store: bool
     reason: Optional[str] = None
+
+
+class ProjectRollup(BaseModel):
+    """Compact per-project summary with only the latest milestones inlined"""
+
+    id: Optional[str] = None
+    user_id: str
+    project_key: str  # e.g., "project_neuradesk"
+    summary: Optional[str] = None  # Value of the project fact, if one exists
+    milestone_count: int = 0
+    recent_milestones: List[dict] = []  # Newest first: [{"key": ..., "value": ...}]
+    last_milestone_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+ProjectRollupList = TypeAdapter(List[ProjectRollup])
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, TypeAdapter
+from typing import List
 
 
 class Message(BaseModel):
@@ -10,6 +10,9 @@ class Message(BaseModel):
     created_at: str
 
 
+MessageList = TypeAdapter(List[Message])
+
+
 class MessageCreate(BaseModel):
     conversation_id: str
     role: str
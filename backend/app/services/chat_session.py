@@ -0,0 +1,198 @@
+import asyncio
+import contextvars
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, Set
+
+from dotenv import load_dotenv
+
+from app.ai.chat_engine import CHAT_PROMPT, chat_user_content
+from app.ai.llm import _llm_service
+from app.ai.prompt_assembly import render_profile
+from app.core.admission import AdmissionRejected, Priority, admission_controller
+from app.core.usage import attribute_usage, usage_aggregator
+from app.database.repositories.conversations import ConversationRepository
+from app.database.repositories.messages import MessageRepository
+from app.intergrations.langfuse import LangfuseConfig
+from app.memory.manager import MemoryManager
+
+load_dotenv()
+
+# Longest a session keeps its profile copy without a write of its own (catches other tabs)
+PROFILE_REFRESH_SECONDS = float(os.getenv("WS_PROFILE_REFRESH_SECONDS", "300"))
+
+_active_sessions: Set["ChatSession"] = set()
+
+
+class ChatSession:
+    """
+    One user's chat over a long-lived connection (see app.api.v1.ws).
+
+    Per-message work that ChatService repeats on every POST is done once per
+    session instead: the profile is loaded on open and refreshed after the
+    session's own memory writes, the prompt and model clients are resolved
+    up front, and the conversation id (the checkpointer thread) stays pinned,
+    so a turn costs retrieval plus the LLM call itself.
+
+    Events are pushed through `emit` as dicts:
+        token   {"type": "token", "content": ...}      answer chunk
+        done    {"type": "done", "answer", "conversation_id", "title"}
+        memory  {"type": "memory", "fact": {...}}      a fact was stored
+        error   {"type": "error", "detail", ...}
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        emit: Callable[[dict], Awaitable[None]],
+        conversation_id: Optional[str] = None,
+    ):
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.memory_manager = MemoryManager()
+        self.conversation_repository = ConversationRepository()
+        self.message_repository = MessageRepository()
+        self.profile: dict = {}
+        self.closed = False
+        self._emit = emit
+        self._send_lock = asyncio.Lock()
+        self._profile_loaded_at = 0.0
+        self._background: Set[asyncio.Task] = set()
+
+    async def open(self) -> None:
+        """Load the profile and resolve the prompt and model clients for the session."""
+        await asyncio.gather(
+            self._refresh_profile(),
+            asyncio.to_thread(LangfuseConfig().get_prompt, CHAT_PROMPT),
+            asyncio.to_thread(_llm_service.warm_up),
+        )
+        _active_sessions.add(self)
+
+    async def send(self, user_message: str) -> None:
+        """Answer one message, streaming tokens, then store memories in the background."""
+        attribute_usage(self.user_id)
+        try:
+            await usage_aggregator.enforce_quota(self.user_id)
+            async with admission_controller.admit(self.user_id, Priority.INTERACTIVE):
+                if time.monotonic() - self._profile_loaded_at > PROFILE_REFRESH_SECONDS:
+                    await self._refresh_profile()
+                relevant_memories = await self.memory_manager.get_relevant_memories(
+                    self.user_id, user_message
+                )
+                user_content = chat_user_content(
+                    user_message, context="\n".join(m.value for m in relevant_memories)
+                )
+                profile = render_profile(self.profile)
+                parts = []
+                async for chunk in _iterate_in_thread(
+                    lambda: _llm_service.stream(
+                        CHAT_PROMPT, user_content, "qa_session", self.conversation_id, profile
+                    )
+                ):
+                    parts.append(chunk)
+                    await self.push({"type": "token", "content": chunk})
+        except AdmissionRejected as e:
+            await self.push(
+                {
+                    "type": "error",
+                    "detail": "Too many requests",
+                    "reason": e.reason,
+                    "retry_after": e.retry_after,
+                }
+            )
+            return
+        except Exception as e:
+            await self.push({"type": "error", "detail": f"AI failed to generate response: {e}"})
+            return
+
+        answer = "".join(parts)
+        if not answer.strip():
+            await self.push({"type": "error", "detail": "AI returned empty response"})
+            return
+
+        title = None
+        if self.conversation_id is None:
+            title = user_message[:50]
+            result = self.conversation_repository.create_conversation(self.user_id, title)
+            self.conversation_id = result.data[0].get("id")
+        self.message_repository.save_messages(
+            self.conversation_id, [("user", user_message), ("assistant", answer)]
+        )
+        await self.push(
+            {
+                "type": "done",
+                "answer": answer,
+                "conversation_id": self.conversation_id,
+                "title": title,
+            }
+        )
+
+        task = asyncio.create_task(self._remember(user_message, relevant_memories))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def push(self, event: dict) -> None:
+        """Send an event unless the connection is gone (background tasks may outlive it)."""
+        if self.closed:
+            return
+        async with self._send_lock:
+            try:
+                await self._emit(event)
+            except Exception:
+                self.closed = True
+
+    async def close(self) -> None:
+        """Stop emitting; pending memory writes still finish."""
+        self.closed = True
+        _active_sessions.discard(self)
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    async def _remember(self, user_message: str, relevant_memories) -> None:
+        try:
+            fact = await self.memory_manager.process_query(
+                self.user_id, user_message, self.profile, relevant_memories
+            )
+        except Exception as e:
+            print(f"[SESSION] Memory processing failed: {e}")
+            return
+        if fact is None:
+            return
+        # process_query invalidated the shared profile, so this reload sees the new fact
+        await self._refresh_profile()
+        await self.push({"type": "memory", "fact": fact.model_dump(mode="json")})
+
+    async def _refresh_profile(self) -> None:
+        self.profile = await self.memory_manager.get_user_profile(self.user_id)
+        self._profile_loaded_at = time.monotonic()
+
+
+async def _iterate_in_thread(make_iterator: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+    """Drive a blocking iterator on a worker thread, yielding its items on the event loop."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for item in make_iterator():
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    # run_in_executor does not carry context vars over (usage attribution, meters)
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, produce)
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    await producer
+
+
+def session_stats() -> dict:
+    return {"active_sessions": len(_active_sessions)}
@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.ai.llm import _llm_service
+from app.core.cache import get_cache
+from app.core.usage import usage_aggregator
+from app.database.repositories.deletion import DeletionJobRepository
+from app.memory.lexical_index import drop_lexical_index
+from app.memory.project_index import drop_project_index
+
+load_dotenv()
+
+# Datasets each kind of job deletes, in order: children before the rows they reference.
+# "threads" is not a table: it drops the conversations' checkpointer threads on every worker.
+PLANS = {
+    "conversation": ["messages", "conversation"],
+    "user": [
+        "threads",
+        "embeddings",
+        "embeddings_previous",
+        "facts",
+        "rollups",
+        "usage",
+        "user_messages",
+        "conversations",
+    ],
+}
+
+
+def _drop_user_state(user_id: str) -> None:
+    """Per-process state derived from a purged user's rows."""
+    drop_lexical_index(user_id)
+    drop_project_index(user_id)
+    usage_aggregator.forget_user(user_id)
+
+
+# Purging a user clears that state here and on every other worker
+_purged_users = get_cache("purged_users", max_items=1, on_invalidate=_drop_user_state)
+
+
+class DeletionWorker:
+    """
+    Runs deletion jobs off the request path.
+
+    Endpoints only enqueue a job (deleting a conversation also hides it from
+    the list right away) and answer 202. Workers claim jobs from the
+    deletion_jobs table and delete each dataset of the job's plan in batches
+    of `batch_size` rows, one short transaction per batch with a pause in
+    between, so purging a large account never holds long locks on the hot
+    tables.
+
+    Progress (current step, rows deleted per dataset) is saved as the job
+    runs, and claiming a job takes a lease that progress keeps extending. If
+    a worker dies, the job is claimed again once its lease expires and
+    resumes at the step it had reached; deletes are idempotent, so redoing
+    part of a step is harmless. Failed jobs are retried with backoff up to
+    `max_attempts` times.
+
+    Args:
+        batch_size: Rows deleted per transaction
+        pause_seconds: Sleep between batches, leaving room for chat traffic
+        lease_seconds: How long a job stays claimed without progress
+        max_attempts: Claims before a failing job is left for an operator
+        poll_seconds: Queue check interval when no job was enqueued here
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        pause_seconds: float = 0.05,
+        lease_seconds: int = 120,
+        max_attempts: int = 5,
+        poll_seconds: float = 30.0,
+    ):
+        self._repository: Optional[DeletionJobRepository] = None
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.counters = {"jobs_done": 0, "jobs_failed": 0, "batches": 0, "rows_deleted": 0}
+        self.current_job: Optional[str] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def repository(self) -> DeletionJobRepository:
+        # Created on first use: importing the app must not need database credentials
+        if self._repository is None:
+            self._repository = DeletionJobRepository()
+        return self._repository
+
+    async def enqueue_conversation(self, conversation_id: str) -> Optional[dict]:
+        """Queue a conversation with its messages and thread; None if it does not exist."""
+        job = await self.repository.enqueue_conversation(conversation_id)
+        if job is not None:
+            self.wake()
+        return job
+
+    async def enqueue_user(self, user_id: str) -> dict:
+        """Queue a purge of the user's facts, embeddings, rollups and conversations."""
+        job = await self.repository.enqueue_user(user_id)
+        self.wake()
+        return job
+
+    def wake(self) -> None:
+        """Start on new jobs now instead of at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run_forever(self) -> None:
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await self.run_pending()
+            except Exception as e:
+                print(f"[DELETION ERROR] Queue unavailable: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_pending(self) -> int:
+        """Run jobs until the queue is empty. Returns the number of jobs run."""
+        jobs = 0
+        while True:
+            job = await self.repository.claim(self.worker_id, self.lease_seconds, self.max_attempts)
+            if job is None:
+                return jobs
+            await self.run_job(job)
+            jobs += 1
+
+    async def run_job(self, job: dict) -> None:
+        """Delete the job's datasets from its saved step on, then mark it done (or failed)."""
+        plan = PLANS[job["kind"]]
+        deleted = dict(job.get("deleted") or {})
+        step = job["step"]
+        self.current_job = job["id"]
+        try:
+            while step < len(plan):
+                dataset = plan[step]
+                deleted[dataset] = deleted.get(dataset, 0) + await self._purge(
+                    job, dataset, deleted
+                )
+                step += 1
+                await self._save(job, step=step, deleted=deleted)
+            await self._forget(job)
+        except Exception as e:
+            self.counters["jobs_failed"] += 1
+            retry_in = min(3600, 30 * 2 ** job["attempts"])
+            stage = plan[step] if step < len(plan) else "cleanup"
+            print(f"[DELETION ERROR] job={job['id']} step={stage}: {e}")
+            await self.repository.save_progress(
+                job["id"],
+                {
+                    "status": "failed",
+                    "step": step,
+                    "deleted": deleted,
+                    "error": str(e)[:1000],
+                    "lease_until": _in(retry_in),
+                },
+            )
+            return
+        finally:
+            self.current_job = None
+
+        self.counters["jobs_done"] += 1
+        print(f"[DELETION] {job['kind']} job {job['id']} done: {deleted}")
+        await self.repository.save_progress(
+            job["id"],
+            {"status": "done", "error": None, "finished_at": _in(0), "lease_until": None},
+        )
+
+    def stats(self) -> dict:
+        return {**self.counters, "worker": self.worker_id, "current_job": self.current_job}
+
+    # ── Private Helpers ──────────────────────────────────────────────
+
+    async def _purge(self, job: dict, dataset: str, deleted: dict) -> int:
+        """Delete one dataset of the job batch by batch. Returns rows deleted."""
+        if dataset == "threads":
+            return await self._forget_threads(job["user_id"])
+
+        total = 0
+        saved_at = time.monotonic()
+        while True:
+            rows = await self.repository.purge_batch(
+                dataset, job["user_id"], job.get("conversation_id"), self.batch_size
+            )
+            total += rows
+            self.counters["batches"] += 1
+            self.counters["rows_deleted"] += rows
+            if rows < self.batch_size:
+                return total
+            # Keep the lease (and the visible progress) fresh on long datasets
+            if time.monotonic() - saved_at > self.lease_seconds / 4:
+                progress = {**deleted, dataset: deleted.get(dataset, 0) + total}
+                await self._save(job, step=job["step"], deleted=progress)
+                saved_at = time.monotonic()
+            await asyncio.sleep(self.pause_seconds)
+
+    async def _forget_threads(self, user_id: str) -> int:
+        """Drop the checkpointer thread of every one of the user's conversations."""
+        forgotten, after_id = 0, None
+        while True:
+            ids = await self.repository.get_conversation_ids(user_id, after_id, self.batch_size)
+            for conversation_id in ids:
+                await asyncio.to_thread(_llm_service.forget_thread, conversation_id)
+            forgotten += len(ids)
+            if len(ids) < self.batch_size:
+                return forgotten
+            after_id = ids[-1]
+
+    async def _forget(self, job: dict) -> None:
+        """Clear per-process state derived from the deleted rows."""
+        if job["kind"] == "conversation":
+            await asyncio.to_thread(_llm_service.forget_thread, job["conversation_id"])
+            return
+        await get_cache("profile").ainvalidate(job["user_id"])
+        await _purged_users.ainvalidate(job["user_id"])
+
+    async def _save(self, job: dict, step: int, deleted: dict) -> None:
+        job["step"] = step
+        await self.repository.save_progress(
+            job["id"], {"step": step, "deleted": deleted, "lease_until": _in(self.lease_seconds)}
+        )
+
+
+def _in(seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+deletion_worker = DeletionWorker(
+    batch_size=int(os.getenv("DELETION_BATCH_SIZE", "500")),
+    pause_seconds=float(os.getenv("DELETION_BATCH_PAUSE_SECONDS", "0.05")),
+    lease_seconds=int(os.getenv("DELETION_LEASE_SECONDS", "120")),
+    max_attempts=int(os.getenv("DELETION_MAX_ATTEMPTS", "5")),
+    poll_seconds=float(os.getenv("DELETION_POLL_SECONDS", "30")),
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued conversation deletions and purges.")
+    parser.add_argument(
+        "--loop", action="store_true", help="Keep polling the queue instead of exiting when empty"
+    )
+    args = parser.parse_args()
+    if args.loop:
+        asyncio.run(deletion_worker.run_forever())
+    else:
+        print(f"[DELETION] Ran {asyncio.run(deletion_worker.run_pending())} jobs")
@@ -0,0 +1,92 @@
+"""
+Compare the remote (HuggingFace Inference API) and local (ONNX on CPU)
+embedding backends on latency, throughput and vector agreement.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embeddings [--texts 256] [--batch-size 32]
+    EMBEDDING_ONNX_FILE=onnx/model_qint8_avx512_vnni.onnx python -m benchmarks.bench_embeddings
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.ai.embeddings import LocalEmbeddingBackend, RemoteEmbeddingBackend
+
+load_dotenv()
+
+MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+
+SAMPLE_TEXTS = [
+    "name: Sarah",
+    "skill_python: Advanced Python, mostly FastAPI and data pipelines",
+    "project_neuradesk: Personal knowledge assistant with long-term memory",
+    "project_neuradesk_milestone_2025-12-01_4821: Backend memory classifier finished",
+    "preference_theme: Prefers dark mode in every editor",
+    "What did I say about the frontend deadline last week?",
+    "I finally shipped the vector search for NeuraDesk today!",
+    "favorite_language: TypeScript for frontends, Python for everything else",
+]
+
+
+def _timed(backend, texts, batch_size):
+    latencies = []
+    vectors = []
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        t0 = time.perf_counter()
+        vectors.extend(backend.embed(texts[i : i + batch_size], MODEL))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    return np.array(vectors, dtype=np.float32), latencies, elapsed
+
+
+def _report(name, latencies, elapsed, count):
+    p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{name:>7}: p50={statistics.median(latencies):7.1f} ms  p95={p95:7.1f} ms  "
+        f"throughput={count / elapsed:7.1f} texts/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--texts", type=int, default=256, help="Number of texts to embed")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--single", action="store_true", help="Also time single-text calls")
+    args = parser.parse_args()
+
+    texts = [f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} #{i}" for i in range(args.texts)]
+    hf_token = os.getenv("HUGGINGFACE_API_KEY")
+    local = LocalEmbeddingBackend(hf_token=hf_token)
+    remote = RemoteEmbeddingBackend(hf_token=hf_token)
+
+    local.embed(texts[:1], MODEL)  # Exclude model download/session creation
+    print(f"Model: {MODEL} | ONNX file: {local.onnx_file} | workers: {local.workers}")
+    print(f"{len(texts)} texts, batch size {args.batch_size}\n")
+
+    local_vecs, local_lat, local_elapsed = _timed(local, texts, args.batch_size)
+    remote_vecs, remote_lat, remote_elapsed = _timed(remote, texts, args.batch_size)
+    _report("local", local_lat, local_elapsed, len(texts))
+    _report("remote", remote_lat, remote_elapsed, len(texts))
+
+    if args.single:
+        _, lat, elapsed = _timed(local, texts[:32], 1)
+        _report("local-1", lat, elapsed, 32)
+        _, lat, elapsed = _timed(remote, texts[:32], 1)
+        _report("remote-1", lat, elapsed, 32)
+
+    remote_vecs /= np.linalg.norm(remote_vecs, axis=1, keepdims=True)
+    cosine = (local_vecs * remote_vecs).sum(axis=1)
+    print(
+        f"\nVector agreement (cosine local vs remote): "
+        f"min={cosine.min():.4f} mean={cosine.mean():.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Compare the old and new paths from database rows to response bytes for
+large memory lists and message histories.
+
+    field-by-field  one model per row built field by field, then FastAPI's
+                    response_model path: dump to dicts, validate again,
+                    dump in JSON mode, json.dumps (JSONResponse)
+    adapter         one TypeAdapter.validate_python call for the result set,
+                    then dump_json (app.core.serialization.json_response)
+    orjson rows     rows encoded as-is with orjson (ORJSONResponse, used for
+                    already-plain payloads like search pages)
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--rows 2000] [--repeat 20]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import string
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+import orjson
+
+from app.schemas.memory import MemoryFact, MemoryFactList, MemoryTier, MemoryType
+from app.schemas.messages import Message, MessageList
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(words)
+    )
+
+
+def _fact_rows(count: int, rng: random.Random) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    categories = [c.value for c in MemoryType if c is not MemoryType.EPHEMERAL]
+    rows = []
+    for i in range(count):
+        stamp = (now - timedelta(minutes=i)).isoformat()
+        rows.append(
+            {
+                "id": f"00000000-0000-4000-8000-{i:012d}",
+                "user_id": "bench-user",
+                "category": rng.choice(categories),
+                "importance": round(rng.random(), 2),
+                "key": f"project_{i % 50}_milestone_{i}",
+                "value": _text(rng, 12),
+                "context": None,
+                "tier": "hot",
+                "retrieval_hits": rng.randint(0, 40),
+                "last_retrieved_at": stamp,
+                "archived_at": None,
+                "created_at": stamp,
+                "updated_at": stamp,
+            }
+        )
+    return rows
+
+
+def _message_rows(count: int, rng: random.Random) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": f"00000000-0000-4000-9000-{i:012d}",
+            "conversation_id": "bench-conversation",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": _text(rng, 20 if i % 2 == 0 else 120),
+            "created_at": (now + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+# ── Old path ─────────────────────────────────────────────────────────
+
+
+def _facts_field_by_field(rows: List[dict]) -> List[MemoryFact]:
+    return [
+        MemoryFact(
+            id=row["id"],
+            user_id=row["user_id"],
+            category=MemoryType(row["category"]),
+            importance=float(row["importance"]),
+            key=row["key"],
+            value=row["value"],
+            context=row.get("context"),
+            tier=row.get("tier", MemoryTier.HOT),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+        for row in rows
+    ]
+
+
+def _messages_field_by_field(rows: List[dict]) -> List[Message]:
+    return [
+        Message(
+            id=row["id"],
+            conversation_id=row["conversation_id"],
+            role=row["role"],
+            content=row["content"],
+            created_at=row["created_at"],
+        )
+        for row in rows
+    ]
+
+
+def _response_model_path(models: list, adapter) -> bytes:
+    """What FastAPI does with a returned list when the route has a response_model."""
+    dumped = [m.model_dump() for m in models]
+    validated = adapter.validate_python(dumped)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+# ── Harness ──────────────────────────────────────────────────────────
+
+
+def _time(fn: Callable[[], bytes], repeat: int) -> tuple[float, int]:
+    """Median milliseconds per run, and the payload size."""
+    size = len(fn())  # Warm-up run
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), size
+
+
+def _report(label: str, rows: List[dict], build, adapter, repeat: int) -> None:
+    paths = {
+        "field-by-field": lambda: _response_model_path(build(rows), adapter),
+        "adapter": lambda: adapter.dump_json(adapter.validate_python(rows)),
+        "orjson rows": lambda: orjson.dumps(rows),
+    }
+    print(f"\n{label}: {len(rows)} rows")
+    print(f"{'path':<16} {'ms':>9} {'us/row':>8} {'speed-up':>9} {'bytes':>10}")
+    baseline = None
+    for name, fn in paths.items():
+        ms, size = _time(fn, repeat)
+        baseline = baseline or ms
+        per_row = ms * 1000 / len(rows)
+        print(f"{name:<16} {ms:>9.2f} {per_row:>8.2f} {baseline / ms:>8.1f}x {size:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    _report(
+        "memory facts",
+        _fact_rows(args.rows, rng),
+        _facts_field_by_field,
+        MemoryFactList,
+        args.repeat,
+    )
+    _report(
+        "messages",
+        _message_rows(args.rows, rng),
+        _messages_field_by_field,
+        MessageList,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Time the SQL embedding codecs (decode_embedding, encode_embedding_int8) inside
+the database, so the numbers leave out the network round trip. Decoding runs
+on every compact write (the memory_embeddings decode trigger) and on every
+compact similarity query.
+
+Run it before and after applying migrations/012_fast_embedding_codec.sql to
+compare the implementations (time_embedding_codec is created by 012; apply
+that function on its own first to measure the 004 codecs).
+
+Usage (from backend/, with SUPABASE_URL / SUPABASE_KEY set):
+    python -m benchmarks.bench_sql_codec [--dim 768] [--rounds 200]
+"""
+
+import argparse
+
+import numpy as np
+
+from app.database import vector_codec
+from app.database.client import supabase_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--rounds", type=int, default=200, help="Calls per codec")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    vector = np.random.default_rng(args.seed).normal(size=args.dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+
+    print(f"{args.dim} dims, {args.rounds} calls per codec (server-side time)\n")
+    print(f"{'codec':<8} {'decode us':>10} {'encode int8 us':>15}")
+    for codec in vector_codec.CODECS:
+        result = supabase_client.client.rpc(
+            "time_embedding_codec",
+            {
+                "p_data": vector_codec.encode(vector, codec),
+                "p_codec": codec,
+                "p_rounds": args.rounds,
+            },
+        ).execute()
+        timing = result.data[0]
+        print(f"{codec:<8} {timing['decode_us']:>10.1f} {timing['encode_int8_us']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
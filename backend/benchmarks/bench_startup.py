@@ -0,0 +1,92 @@
+"""
+Track worker cold-start time: how long `import app.main` takes in a fresh
+interpreter, which modules dominate it, and (optionally) how long warm-up
+takes until the worker reports ready.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 5] [--top 15] [--warmup]
+    python -m benchmarks.bench_startup --max-import-seconds 1.5   # fail on regression
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_once() -> tuple[float, str]:
+    """Import app.main in a fresh interpreter; returns (seconds, -X importtime log)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f"Importing app.main failed:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr
+
+
+def _slowest_packages(importtime_log: str, top: int) -> list[tuple[str, float]]:
+    """Cumulative import time per top-level package, slowest first."""
+    totals = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        if not cumulative.isdigit():
+            continue
+        package = name.split(".")[0]
+        # A package's outermost import carries the largest cumulative figure
+        totals[package] = max(totals.get(package, 0), int(cumulative))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [(name, micros / 1e6) for name, micros in ranked[:top]]
+
+
+async def _time_warm_up() -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    from app.main import warm_up
+
+    await warm_up.run()
+    return warm_up.status()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark backend cold-start time.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to list")
+    parser.add_argument("--warmup", action="store_true", help="Also time the warm-up steps")
+    parser.add_argument("--max-import-seconds", type=float, help="Exit 1 if the median is slower")
+    args = parser.parse_args()
+
+    timings, last_log = [], ""
+    for _ in range(args.runs):
+        seconds, last_log = _import_once()
+        timings.append(seconds)
+
+    median = statistics.median(timings)
+    print(f"import app.main: median {median:.3f}s | min {min(timings):.3f}s | runs {args.runs}")
+    print("\nSlowest top-level imports (cumulative):")
+    for name, seconds in _slowest_packages(last_log, args.top):
+        print(f"  {name:<32} {seconds:.3f}s")
+
+    if args.warmup:
+        status = asyncio.run(_time_warm_up())
+        print(f"\nWarm-up: {status['seconds']}s (ready={status['ready']})")
+        for name, step in status["steps"].items():
+            print(f"  {name:<12} {step['status']:<8} {step.get('seconds', 0):.3f}s")
+
+    if args.max_import_seconds and median > args.max_import_seconds:
+        print(f"\nREGRESSION: median import {median:.3f}s > {args.max_import_seconds:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare embedding wire codecs (JSON, float32, float16, int8) on payload size,
+encode/decode time and retrieval quality (recall@k against float32 search).
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_codec [--vectors 5000] [--queries 200] [--dim 768]
+    python -m benchmarks.bench_vector_codec --from-npy embeddings.npy   # real vectors
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.database import vector_codec
+
+
+def _synthetic(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Normalized vectors grouped around random centroids, like topic-clustered facts."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim))
+    vectors = centroids[rng.integers(clusters, size=count)] + 0.6 * rng.normal(size=(count, dim))
+    return _normalize(vectors.astype(np.float32))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ _normalize(corpus).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def _recall(truth: np.ndarray, found: np.ndarray, k: int) -> float:
+    hits = [len(set(t[:k]) & set(f[:k])) for t, f in zip(truth, found, strict=True)]
+    return sum(hits) / (k * len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--from-npy", help="Load an (n, dim) array of real embeddings instead")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.from_npy:
+        vectors = _normalize(np.load(args.from_npy).astype(np.float32))
+    else:
+        vectors = _synthetic(args.vectors + args.queries, args.dim, args.clusters, args.seed)
+    corpus, queries = vectors[: -args.queries], vectors[-args.queries :]
+    ks = (1, 5, 10)
+    truth = _top_k(corpus, queries, max(ks))
+
+    json_bytes = np.mean([len(json.dumps(v.tolist())) for v in corpus[:200]])
+    print(f"{len(corpus)} vectors x {corpus.shape[1]} dims, {len(queries)} queries\n")
+    print(f"{'codec':<8} {'bytes/vec':>10} {'encode us':>10} {'decode us':>10}  recall@1/5/10")
+    print(f"{'json':<8} {json_bytes:>10.0f} {'':>10} {'':>10}  1.000 / 1.000 / 1.000")
+
+    for codec in vector_codec.CODECS:
+        started = time.perf_counter()
+        encoded = [vector_codec.encode(v, codec) for v in corpus]
+        encode_us = (time.perf_counter() - started) / len(corpus) * 1e6
+
+        started = time.perf_counter()
+        decoded = vector_codec.decode_many(encoded, codec).astype(np.float32)
+        decode_us = (time.perf_counter() - started) / len(corpus) * 1e6
+
+        # Queries stay full precision, as match_embeddings_compact decodes them to real[]
+        found = _top_k(decoded, queries, max(ks))
+        recalls = " / ".join(f"{_recall(truth, found, k):.3f}" for k in ks)
+        size = np.mean([len(e) for e in encoded])
+        print(f"{codec:<8} {size:>10.0f} {encode_us:>10.1f} {decode_us:>10.2f}  {recalls}")
+
+
+if __name__ == "__main__":
+    main()
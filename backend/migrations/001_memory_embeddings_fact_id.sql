@@ -0,0 +1,18 @@
+-- Link every embedding to the fact it was generated from so re-storing a fact
+-- updates its vector in place instead of appending a new row.
+
+ALTER TABLE memory_embeddings
+    ADD COLUMN IF NOT EXISTS fact_id UUID REFERENCES user_memories(id) ON DELETE CASCADE;
+
+-- Keep only the newest vector per fact before enforcing uniqueness.
+DELETE FROM memory_embeddings e
+USING memory_embeddings newer
+WHERE e.fact_id IS NOT NULL
+  AND e.fact_id = newer.fact_id
+  AND e.created_at < newer.created_at;
+
+CREATE UNIQUE INDEX IF NOT EXISTS memory_embeddings_fact_id_key
+    ON memory_embeddings (fact_id);
+
+CREATE INDEX IF NOT EXISTS memory_embeddings_user_id_idx
+    ON memory_embeddings (user_id);
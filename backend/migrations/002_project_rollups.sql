@@ -0,0 +1,71 @@
+-- Per-project memory rollups: one compact row per project, with only the
+-- latest milestones inlined. Full history stays in user_memories.
+
+CREATE TABLE IF NOT EXISTS project_rollups (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    project_key TEXT NOT NULL,
+    summary TEXT,
+    milestone_count INTEGER NOT NULL DEFAULT 0,
+    recent_milestones JSONB NOT NULL DEFAULT '[]'::jsonb,
+    last_milestone_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (user_id, project_key)
+);
+
+ALTER TABLE project_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can read their own project rollups"
+    ON project_rollups FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE INDEX IF NOT EXISTS user_memories_user_key_idx
+    ON user_memories (user_id, key text_pattern_ops);
+
+-- Backfill rollups from existing facts (latest 5 milestones inlined)
+WITH milestones AS (
+    SELECT
+        user_id,
+        split_part(key, '_milestone_', 1) AS project_key,
+        key,
+        value,
+        created_at,
+        row_number() OVER (
+            PARTITION BY user_id, split_part(key, '_milestone_', 1)
+            ORDER BY created_at DESC
+        ) AS rn,
+        count(*) OVER (PARTITION BY user_id, split_part(key, '_milestone_', 1)) AS total
+    FROM user_memories
+    WHERE category = 'project_milestone'
+),
+milestone_rollups AS (
+    SELECT
+        user_id,
+        project_key,
+        max(total) AS milestone_count,
+        jsonb_agg(jsonb_build_object('key', key, 'value', value) ORDER BY created_at DESC)
+            FILTER (WHERE rn <= 5) AS recent_milestones,
+        max(created_at) AS last_milestone_at
+    FROM milestones
+    GROUP BY user_id, project_key
+),
+projects AS (
+    SELECT DISTINCT ON (user_id, key) user_id, key AS project_key, value AS summary
+    FROM user_memories
+    WHERE category = 'project'
+    ORDER BY user_id, key, updated_at DESC
+)
+INSERT INTO project_rollups (
+    user_id, project_key, summary, milestone_count, recent_milestones, last_milestone_at
+)
+SELECT
+    coalesce(p.user_id, m.user_id),
+    coalesce(p.project_key, m.project_key),
+    p.summary,
+    coalesce(m.milestone_count, 0),
+    coalesce(m.recent_milestones, '[]'::jsonb),
+    m.last_milestone_at
+FROM projects p
+FULL OUTER JOIN milestone_rollups m
+    ON p.user_id = m.user_id AND p.project_key = m.project_key
+ON CONFLICT (user_id, project_key) DO NOTHING;
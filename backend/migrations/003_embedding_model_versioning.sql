@@ -0,0 +1,115 @@
+-- Tag every vector with the model that produced it, and support re-embedding
+-- into a shadow table followed by an atomic cutover.
+
+ALTER TABLE memory_embeddings
+    ADD COLUMN IF NOT EXISTS embedding_model TEXT NOT NULL
+    DEFAULT 'sentence-transformers/all-mpnet-base-v2';
+
+CREATE INDEX IF NOT EXISTS memory_embeddings_user_model_idx
+    ON memory_embeddings (user_id, embedding_model);
+
+-- Single-row table holding the model new vectors and queries must use
+CREATE TABLE IF NOT EXISTS embedding_settings (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    active_model TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO embedding_settings (active_model)
+VALUES ('sentence-transformers/all-mpnet-base-v2')
+ON CONFLICT (id) DO NOTHING;
+
+-- (Re)create an empty shadow table for vectors of the given dimension
+CREATE OR REPLACE FUNCTION prepare_embedding_shadow(p_dimensions INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DROP TABLE IF EXISTS memory_embeddings_shadow;
+    CREATE TABLE memory_embeddings_shadow (LIKE memory_embeddings INCLUDING DEFAULTS);
+    EXECUTE format(
+        'ALTER TABLE memory_embeddings_shadow ALTER COLUMN embedding TYPE vector(%s)',
+        p_dimensions
+    );
+    ALTER TABLE memory_embeddings_shadow ADD PRIMARY KEY (id);
+    ALTER TABLE memory_embeddings_shadow
+        ADD CONSTRAINT memory_embeddings_shadow_fact_id_fkey
+        FOREIGN KEY (fact_id) REFERENCES user_memories(id) ON DELETE CASCADE;
+    CREATE UNIQUE INDEX memory_embeddings_shadow_fact_id_key
+        ON memory_embeddings_shadow (fact_id);
+    CREATE INDEX memory_embeddings_shadow_user_model_idx
+        ON memory_embeddings_shadow (user_id, embedding_model);
+    CREATE INDEX memory_embeddings_shadow_embedding_idx
+        ON memory_embeddings_shadow USING hnsw (embedding vector_cosine_ops);
+    ALTER TABLE memory_embeddings_shadow ENABLE ROW LEVEL SECURITY;
+END;
+$$;
+
+-- Swap the shadow table in and switch the active model in one transaction.
+-- The replaced table is kept as memory_embeddings_previous so callers still
+-- on the old model keep getting results until they pick up the new one.
+CREATE OR REPLACE FUNCTION cutover_embedding_shadow(p_model TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF to_regclass('memory_embeddings_shadow') IS NULL THEN
+        RAISE EXCEPTION 'No shadow table to cut over to';
+    END IF;
+
+    LOCK TABLE memory_embeddings, memory_embeddings_shadow IN ACCESS EXCLUSIVE MODE;
+    DROP TABLE IF EXISTS memory_embeddings_previous;
+    ALTER TABLE memory_embeddings RENAME TO memory_embeddings_previous;
+    ALTER TABLE memory_embeddings_shadow RENAME TO memory_embeddings;
+
+    UPDATE embedding_settings SET active_model = p_model, updated_at = NOW();
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION drop_previous_embeddings()
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    DROP TABLE IF EXISTS memory_embeddings_previous;
+$$;
+
+-- Model-aware similarity search. Queries embedded with a model that only the
+-- pre-cutover table holds are routed to memory_embeddings_previous.
+DROP FUNCTION IF EXISTS match_embeddings(vector, float, int, uuid);
+
+CREATE OR REPLACE FUNCTION match_embeddings(
+    query_embedding vector,
+    match_threshold float,
+    match_count int,
+    p_user_id uuid,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS TABLE (id uuid, content text, metadata jsonb, similarity float)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    source_table TEXT := 'memory_embeddings';
+BEGIN
+    IF p_embedding_model IS NOT NULL
+        AND to_regclass('memory_embeddings_previous') IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM memory_embeddings e
+            WHERE e.user_id = p_user_id AND e.embedding_model = p_embedding_model
+        )
+    THEN
+        source_table := 'memory_embeddings_previous';
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        'SELECT e.id, e.content, e.metadata, 1 - (e.embedding <=> $1) AS similarity
+         FROM %I e
+         WHERE e.user_id = $2
+           AND ($3 IS NULL OR e.embedding_model = $3)
+           AND 1 - (e.embedding <=> $1) > $4
+         ORDER BY e.embedding <=> $1
+         LIMIT $5',
+        source_table
+    )
+    USING query_embedding, p_user_id, p_embedding_model, match_threshold, match_count;
+END;
+$$;
@@ -0,0 +1,326 @@
+-- Compact embedding transfer and storage (layouts in app/database/vector_codec.py).
+--
+--   * Writes may send embedding_data (base64) + embedding_codec instead of a
+--     JSON number list; a trigger decodes them into the embedding column.
+--   * match_embeddings_compact takes the query vector in compact form.
+--   * get_embeddings_compact returns stored vectors as int8 base64.
+--   * compact_embedding_storage() optionally converts the column to halfvec,
+--     halving table and HNSW index size (requires pgvector >= 0.7).
+
+-- ── Codec Helpers ────────────────────────────────────────────────────
+
+CREATE OR REPLACE FUNCTION float32_from_bits(p_bits BIGINT)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT CASE WHEN (p_bits >> 31) = 1 THEN -1 ELSE 1 END
+         * CASE WHEN ((p_bits >> 23) & 255) = 0
+                THEN (p_bits & 8388607) * power(2::DOUBLE PRECISION, -149)
+                ELSE (1 + (p_bits & 8388607) / 8388608::DOUBLE PRECISION)
+                     * power(2::DOUBLE PRECISION, ((p_bits >> 23) & 255) - 127)
+           END
+$$;
+
+-- IEEE float32 bit pattern of a value in the normal range (used for int8 scales)
+CREATE OR REPLACE FUNCTION float32_to_bits(p_value DOUBLE PRECISION)
+RETURNS BIGINT
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    magnitude DOUBLE PRECISION := abs(p_value);
+    exponent INTEGER;
+    mantissa BIGINT;
+BEGIN
+    IF magnitude = 0 THEN
+        RETURN 0;
+    END IF;
+    exponent := floor(log(2, magnitude::NUMERIC));
+    mantissa := round((magnitude / power(2::DOUBLE PRECISION, exponent) - 1) * 8388608);
+    IF mantissa >= 8388608 THEN
+        exponent := exponent + 1;
+        mantissa := 0;
+    END IF;
+    RETURN (CASE WHEN p_value < 0 THEN 1::BIGINT << 31 ELSE 0 END)
+         | ((exponent + 127)::BIGINT << 23)
+         | mantissa;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION uint_from_le_bytes(p_data BYTEA, p_offset INTEGER, p_width INTEGER)
+RETURNS BIGINT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT coalesce(sum(get_byte(p_data, p_offset + i)::BIGINT << (8 * i)), 0)::BIGINT
+    FROM generate_series(0, p_width - 1) AS i
+$$;
+
+CREATE OR REPLACE FUNCTION uint_to_le_bytes(p_value BIGINT, p_width INTEGER)
+RETURNS BYTEA
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT decode(string_agg(lpad(to_hex((p_value >> (8 * i)) & 255), 2, '0'), '' ORDER BY i), 'hex')
+    FROM generate_series(0, p_width - 1) AS i
+$$;
+
+-- Base64 vector in the float32 / float16 / int8 layout -> real[]
+CREATE OR REPLACE FUNCTION decode_embedding(p_data TEXT, p_codec TEXT)
+RETURNS REAL[]
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    raw BYTEA := decode(p_data, 'base64');
+    scale DOUBLE PRECISION;
+BEGIN
+    IF p_codec = 'float32' THEN
+        RETURN ARRAY(
+            SELECT float32_from_bits(uint_from_le_bytes(raw, 4 * i, 4))
+            FROM generate_series(0, length(raw) / 4 - 1) AS i
+            ORDER BY i
+        )::REAL[];
+    ELSIF p_codec = 'float16' THEN
+        RETURN ARRAY(
+            SELECT CASE WHEN (h >> 15) = 1 THEN -1 ELSE 1 END
+                 * CASE WHEN ((h >> 10) & 31) = 0
+                        THEN (h & 1023) * power(2::DOUBLE PRECISION, -24)
+                        ELSE (1 + (h & 1023) / 1024::DOUBLE PRECISION)
+                             * power(2::DOUBLE PRECISION, ((h >> 10) & 31) - 15)
+                   END
+            FROM (
+                SELECT i, get_byte(raw, 2 * i) | (get_byte(raw, 2 * i + 1) << 8) AS h
+                FROM generate_series(0, length(raw) / 2 - 1) AS i
+            ) AS halves
+            ORDER BY i
+        )::REAL[];
+    ELSIF p_codec = 'int8' THEN
+        scale := float32_from_bits(uint_from_le_bytes(raw, 0, 4));
+        RETURN ARRAY(
+            SELECT (CASE WHEN b > 127 THEN b - 256 ELSE b END) * scale
+            FROM (
+                SELECT i, get_byte(raw, 4 + i) AS b
+                FROM generate_series(0, length(raw) - 5) AS i
+            ) AS quantized
+            ORDER BY i
+        )::REAL[];
+    END IF;
+    RAISE EXCEPTION 'Unknown embedding codec: %', p_codec;
+END;
+$$;
+
+-- real[] -> base64 int8 layout (float32 scale = max|x| / 127, then one byte per value)
+CREATE OR REPLACE FUNCTION encode_embedding_int8(p_values REAL[])
+RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    scale DOUBLE PRECISION;
+    quantized BYTEA;
+BEGIN
+    SELECT coalesce(max(abs(v)), 0) / 127 INTO scale FROM unnest(p_values) AS v;
+    -- Quantize with the float32-rounded scale the decoder will read back
+    scale := float32_from_bits(float32_to_bits(scale));
+    SELECT decode(
+        string_agg(
+            lpad(to_hex(CASE WHEN scale = 0 THEN 0 ELSE round(v / scale)::INTEGER END & 255), 2, '0'),
+            '' ORDER BY i
+        ),
+        'hex'
+    )
+    INTO quantized
+    FROM unnest(p_values) WITH ORDINALITY AS t(v, i);
+
+    RETURN replace(
+        encode(uint_to_le_bytes(float32_to_bits(scale), 4) || coalesce(quantized, ''::BYTEA), 'base64'),
+        E'\n',
+        ''
+    );
+END;
+$$;
+
+-- Type of the embedding column of a table: 'vector' or 'halfvec'
+CREATE OR REPLACE FUNCTION embedding_column_type(p_table TEXT)
+RETURNS TEXT
+LANGUAGE sql STABLE
+AS $$
+    SELECT t.typname::TEXT
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = to_regclass(p_table) AND a.attname = 'embedding'
+$$;
+
+-- ── Compact Writes ───────────────────────────────────────────────────
+
+ALTER TABLE memory_embeddings
+    ADD COLUMN IF NOT EXISTS embedding_data TEXT,
+    ADD COLUMN IF NOT EXISTS embedding_codec TEXT;
+
+-- Decode compact payloads into the embedding column; nothing compact is kept
+CREATE OR REPLACE FUNCTION decode_embedding_data()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.embedding_data IS NOT NULL THEN
+        NEW.embedding := decode_embedding(NEW.embedding_data, coalesce(NEW.embedding_codec, 'float32'));
+        NEW.embedding_data := NULL;
+        NEW.embedding_codec := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS memory_embeddings_decode_data ON memory_embeddings;
+CREATE TRIGGER memory_embeddings_decode_data
+    BEFORE INSERT OR UPDATE ON memory_embeddings
+    FOR EACH ROW EXECUTE FUNCTION decode_embedding_data();
+
+-- Shadow tables mirror the live column type (vector or halfvec) and decode trigger
+CREATE OR REPLACE FUNCTION prepare_embedding_shadow(p_dimensions INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    column_type TEXT := embedding_column_type('memory_embeddings');
+BEGIN
+    DROP TABLE IF EXISTS memory_embeddings_shadow;
+    CREATE TABLE memory_embeddings_shadow (LIKE memory_embeddings INCLUDING DEFAULTS);
+    EXECUTE format(
+        'ALTER TABLE memory_embeddings_shadow ALTER COLUMN embedding TYPE %s(%s)',
+        column_type, p_dimensions
+    );
+    ALTER TABLE memory_embeddings_shadow ADD PRIMARY KEY (id);
+    ALTER TABLE memory_embeddings_shadow
+        ADD CONSTRAINT memory_embeddings_shadow_fact_id_fkey
+        FOREIGN KEY (fact_id) REFERENCES user_memories(id) ON DELETE CASCADE;
+    CREATE UNIQUE INDEX memory_embeddings_shadow_fact_id_key
+        ON memory_embeddings_shadow (fact_id);
+    CREATE INDEX memory_embeddings_shadow_user_model_idx
+        ON memory_embeddings_shadow (user_id, embedding_model);
+    EXECUTE format(
+        'CREATE INDEX memory_embeddings_shadow_embedding_idx
+         ON memory_embeddings_shadow USING hnsw (embedding %s_cosine_ops)',
+        column_type
+    );
+    CREATE TRIGGER memory_embeddings_shadow_decode_data
+        BEFORE INSERT OR UPDATE ON memory_embeddings_shadow
+        FOR EACH ROW EXECUTE FUNCTION decode_embedding_data();
+    ALTER TABLE memory_embeddings_shadow ENABLE ROW LEVEL SECURITY;
+END;
+$$;
+
+-- ── Compact Reads ────────────────────────────────────────────────────
+
+-- Same routing as in 003, with the query cast to the column type of the source table
+CREATE OR REPLACE FUNCTION match_embeddings(
+    query_embedding vector,
+    match_threshold float,
+    match_count int,
+    p_user_id uuid,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS TABLE (id uuid, content text, metadata jsonb, similarity float)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    source_table TEXT := 'memory_embeddings';
+BEGIN
+    IF p_embedding_model IS NOT NULL
+        AND to_regclass('memory_embeddings_previous') IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM memory_embeddings e
+            WHERE e.user_id = p_user_id AND e.embedding_model = p_embedding_model
+        )
+    THEN
+        source_table := 'memory_embeddings_previous';
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        'SELECT e.id, e.content, e.metadata, 1 - (e.embedding <=> $1::%2$s) AS similarity
+         FROM %1$I e
+         WHERE e.user_id = $2
+           AND ($3 IS NULL OR e.embedding_model = $3)
+           AND 1 - (e.embedding <=> $1::%2$s) > $4
+         ORDER BY e.embedding <=> $1::%2$s
+         LIMIT $5',
+        source_table,
+        embedding_column_type(source_table)
+    )
+    USING query_embedding, p_user_id, p_embedding_model, match_threshold, match_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION match_embeddings_compact(
+    query_data text,
+    query_codec text,
+    match_threshold float,
+    match_count int,
+    p_user_id uuid,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS TABLE (id uuid, content text, metadata jsonb, similarity float)
+LANGUAGE sql
+AS $$
+    SELECT * FROM match_embeddings(
+        decode_embedding(query_data, query_codec)::vector,
+        match_threshold,
+        match_count,
+        p_user_id,
+        p_embedding_model
+    )
+$$;
+
+-- A user's vectors as int8 base64, keyset-paginated by id
+CREATE OR REPLACE FUNCTION get_embeddings_compact(
+    p_user_id uuid,
+    p_after uuid DEFAULT NULL,
+    p_limit int DEFAULT 500
+)
+RETURNS TABLE (id uuid, fact_id uuid, embedding_data text)
+LANGUAGE sql STABLE
+AS $$
+    SELECT e.id, e.fact_id, encode_embedding_int8(e.embedding::real[])
+    FROM memory_embeddings e
+    WHERE e.user_id = p_user_id
+      AND (p_after IS NULL OR e.id > p_after)
+    ORDER BY e.id
+    LIMIT p_limit
+$$;
+
+-- ── Optional: halfvec Storage ────────────────────────────────────────
+
+-- Convert the live column to halfvec and rebuild its HNSW index.
+-- Run once with: SELECT compact_embedding_storage();
+CREATE OR REPLACE FUNCTION compact_embedding_storage()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    dimensions INTEGER;
+    vector_index RECORD;
+BEGIN
+    IF embedding_column_type('memory_embeddings') = 'halfvec' THEN
+        RETURN;
+    END IF;
+
+    -- For vector columns the type modifier is the dimension count
+    SELECT atttypmod INTO dimensions
+    FROM pg_attribute
+    WHERE attrelid = 'memory_embeddings'::regclass AND attname = 'embedding';
+
+    FOR vector_index IN
+        SELECT indexname FROM pg_indexes
+        WHERE schemaname = 'public'
+          AND tablename = 'memory_embeddings'
+          AND (indexdef ILIKE '%using hnsw%' OR indexdef ILIKE '%using ivfflat%')
+    LOOP
+        EXECUTE format('DROP INDEX IF EXISTS %I', vector_index.indexname);
+    END LOOP;
+
+    EXECUTE format(
+        'ALTER TABLE memory_embeddings ALTER COLUMN embedding TYPE halfvec(%1$s)
+         USING embedding::halfvec(%1$s)',
+        dimensions
+    );
+    CREATE INDEX memory_embeddings_embedding_idx
+        ON memory_embeddings USING hnsw (embedding halfvec_cosine_ops);
+END;
+$$;
@@ -0,0 +1,22 @@
+-- Indexes behind GET /api/v1/memory/{user_id}/search: category + key filters,
+-- keyset pagination in each supported sort order, and substring text search.
+-- (user_id, key text_pattern_ops) from 002 already serves key-prefix scans.
+
+CREATE INDEX IF NOT EXISTS user_memories_user_category_key_idx
+    ON user_memories (user_id, category, key);
+
+-- Keyset pagination: WHERE (sort_col, id) < (last_value, last_id) ORDER BY sort_col, id
+CREATE INDEX IF NOT EXISTS user_memories_user_updated_idx
+    ON user_memories (user_id, updated_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS user_memories_user_importance_idx
+    ON user_memories (user_id, importance DESC, id DESC);
+
+-- ILIKE '%term%' on keys and values
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS user_memories_value_trgm_idx
+    ON user_memories USING gin (value gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS user_memories_key_trgm_idx
+    ON user_memories USING gin (key gin_trgm_ops);
@@ -0,0 +1,110 @@
+-- Hot/archive tiering for decayed facts (see app/memory/decay.py).
+-- Archived facts keep their rows and vectors but are left out of profiles,
+-- lexical/vector retrieval and search by default; restoring flips them back.
+
+ALTER TABLE user_memories
+    ADD COLUMN IF NOT EXISTS tier TEXT NOT NULL DEFAULT 'hot'
+        CHECK (tier IN ('hot', 'archive')),
+    ADD COLUMN IF NOT EXISTS retrieval_hits INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_retrieved_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ;
+
+-- Profile loads: hot facts of one category
+CREATE INDEX IF NOT EXISTS user_memories_user_tier_category_idx
+    ON user_memories (user_id, tier, category);
+
+-- Decay scan: hot facts across users, keyset-paged by id
+CREATE INDEX IF NOT EXISTS user_memories_hot_scan_idx
+    ON user_memories (id) WHERE tier = 'hot';
+
+ALTER TABLE memory_embeddings
+    ADD COLUMN IF NOT EXISTS archived BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- A table replaced by an earlier cutover is still read until finalize
+DO $$
+BEGIN
+    IF to_regclass('memory_embeddings_previous') IS NOT NULL THEN
+        ALTER TABLE memory_embeddings_previous
+            ADD COLUMN IF NOT EXISTS archived BOOLEAN NOT NULL DEFAULT FALSE;
+    END IF;
+END;
+$$;
+
+-- Count one retrieval of each key
+CREATE OR REPLACE FUNCTION record_memory_hits(p_user_id uuid, p_keys text[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE user_memories
+    SET retrieval_hits = retrieval_hits + 1, last_retrieved_at = NOW()
+    WHERE user_id = p_user_id AND key = ANY(p_keys);
+$$;
+
+-- Move facts and their vectors to a tier in one transaction; returns facts moved
+CREATE OR REPLACE FUNCTION set_memory_tier(p_user_id uuid, p_fact_ids uuid[], p_tier text)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    UPDATE user_memories
+    SET tier = p_tier,
+        archived_at = CASE WHEN p_tier = 'archive' THEN NOW() END
+    WHERE user_id = p_user_id AND id = ANY(p_fact_ids) AND tier <> p_tier;
+    GET DIAGNOSTICS moved = ROW_COUNT;
+
+    UPDATE memory_embeddings
+    SET archived = (p_tier = 'archive')
+    WHERE user_id = p_user_id AND fact_id = ANY(p_fact_ids);
+
+    RETURN moved;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION memory_tier_counts()
+RETURNS TABLE (tier text, facts bigint)
+LANGUAGE sql STABLE
+AS $$
+    SELECT m.tier, count(*) FROM user_memories m GROUP BY m.tier;
+$$;
+
+-- Same as 004, minus archived vectors
+CREATE OR REPLACE FUNCTION match_embeddings(
+    query_embedding vector,
+    match_threshold float,
+    match_count int,
+    p_user_id uuid,
+    p_embedding_model text DEFAULT NULL
+)
+RETURNS TABLE (id uuid, content text, metadata jsonb, similarity float)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    source_table TEXT := 'memory_embeddings';
+BEGIN
+    IF p_embedding_model IS NOT NULL
+        AND to_regclass('memory_embeddings_previous') IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM memory_embeddings e
+            WHERE e.user_id = p_user_id AND e.embedding_model = p_embedding_model
+        )
+    THEN
+        source_table := 'memory_embeddings_previous';
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        'SELECT e.id, e.content, e.metadata, 1 - (e.embedding <=> $1::%2$s) AS similarity
+         FROM %1$I e
+         WHERE e.user_id = $2
+           AND NOT e.archived
+           AND ($3 IS NULL OR e.embedding_model = $3)
+           AND 1 - (e.embedding <=> $1::%2$s) > $4
+         ORDER BY e.embedding <=> $1::%2$s
+         LIMIT $5',
+        source_table,
+        embedding_column_type(source_table)
+    )
+    USING query_embedding, p_user_id, p_embedding_model, match_threshold, match_count;
+END;
+$$;
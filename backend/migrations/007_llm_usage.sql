@@ -0,0 +1,81 @@
+-- Per-user LLM usage in hourly buckets per feature (chat, classification,
+-- embedding) and model. API workers aggregate calls in memory and add their
+-- deltas here in batches through record_llm_usage.
+
+CREATE TABLE IF NOT EXISTS llm_usage (
+    user_id TEXT NOT NULL,  -- 'anonymous' for calls made outside a user request
+    feature TEXT NOT NULL,
+    model TEXT NOT NULL,
+    bucket_start TIMESTAMPTZ NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    slow_calls INTEGER NOT NULL DEFAULT 0,
+    input_tokens BIGINT NOT NULL DEFAULT 0,
+    output_tokens BIGINT NOT NULL DEFAULT 0,
+    cost_usd NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    seconds_total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    seconds_max DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, feature, model, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS llm_usage_bucket_idx ON llm_usage (bucket_start);
+
+ALTER TABLE llm_usage ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION record_llm_usage(p_rows jsonb)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO llm_usage AS u (
+        user_id, feature, model, bucket_start, calls, errors, slow_calls,
+        input_tokens, output_tokens, cost_usd, seconds_total, seconds_max
+    )
+    SELECT r.user_id, r.feature, r.model, r.bucket_start, r.calls, r.errors, r.slow_calls,
+           r.input_tokens, r.output_tokens, r.cost_usd, r.seconds_total, r.seconds_max
+    FROM jsonb_to_recordset(p_rows) AS r (
+        user_id text, feature text, model text, bucket_start timestamptz, calls int,
+        errors int, slow_calls int, input_tokens bigint, output_tokens bigint,
+        cost_usd numeric, seconds_total double precision, seconds_max double precision
+    )
+    ON CONFLICT (user_id, feature, model, bucket_start) DO UPDATE SET
+        calls = u.calls + EXCLUDED.calls,
+        errors = u.errors + EXCLUDED.errors,
+        slow_calls = u.slow_calls + EXCLUDED.slow_calls,
+        input_tokens = u.input_tokens + EXCLUDED.input_tokens,
+        output_tokens = u.output_tokens + EXCLUDED.output_tokens,
+        cost_usd = u.cost_usd + EXCLUDED.cost_usd,
+        seconds_total = u.seconds_total + EXCLUDED.seconds_total,
+        seconds_max = GREATEST(u.seconds_max, EXCLUDED.seconds_max);
+$$;
+
+CREATE OR REPLACE FUNCTION llm_tokens_since(p_user_id text, p_since timestamptz)
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(sum(input_tokens + output_tokens), 0)
+    FROM llm_usage
+    WHERE user_id = p_user_id AND bucket_start >= p_since;
+$$;
+
+-- p_order: cost | tokens | seconds | slow_calls
+CREATE OR REPLACE FUNCTION top_llm_users(p_since timestamptz, p_order text, p_limit int)
+RETURNS TABLE (
+    user_id text, calls bigint, errors bigint, slow_calls bigint, tokens bigint,
+    cost_usd numeric, seconds_total double precision, seconds_max double precision
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT u.user_id, sum(u.calls), sum(u.errors), sum(u.slow_calls),
+           sum(u.input_tokens + u.output_tokens), sum(u.cost_usd),
+           sum(u.seconds_total), max(u.seconds_max)
+    FROM llm_usage u
+    WHERE u.bucket_start >= p_since
+    GROUP BY u.user_id
+    ORDER BY CASE p_order
+        WHEN 'tokens' THEN sum(u.input_tokens + u.output_tokens)::double precision
+        WHEN 'seconds' THEN sum(u.seconds_total)
+        WHEN 'slow_calls' THEN sum(u.slow_calls)::double precision
+        ELSE sum(u.cost_usd)::double precision
+    END DESC
+    LIMIT p_limit;
+$$;
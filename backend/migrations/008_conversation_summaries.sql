@@ -0,0 +1,78 @@
+-- Denormalized conversation summaries for the sidebar: last message preview,
+-- message count and last activity live on the conversation row, kept current
+-- by append_messages, so the list is one indexed, ordered, paginated query.
+
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS last_message TEXT,
+    ADD COLUMN IF NOT EXISTS last_message_role TEXT,
+    ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMPTZ;
+
+-- Backfill from existing messages (160-character previews, as the API default)
+WITH latest AS (
+    SELECT DISTINCT ON (conversation_id)
+        conversation_id,
+        role,
+        content,
+        created_at,
+        count(*) OVER (PARTITION BY conversation_id) AS total
+    FROM messages
+    ORDER BY conversation_id, created_at DESC
+)
+UPDATE conversations c
+SET last_message = left(l.content, 160),
+    last_message_role = l.role,
+    message_count = l.total,
+    last_activity_at = l.created_at
+FROM latest l
+WHERE c.id = l.conversation_id;
+
+UPDATE conversations
+SET last_activity_at = COALESCE(updated_at, created_at)
+WHERE last_activity_at IS NULL;
+
+ALTER TABLE conversations
+    ALTER COLUMN last_activity_at SET DEFAULT NOW(),
+    ALTER COLUMN last_activity_at SET NOT NULL;
+
+-- Sidebar: a user's conversations, most recently active first, keyset-paged
+CREATE INDEX IF NOT EXISTS conversations_user_activity_idx
+    ON conversations (user_id, last_activity_at DESC, id DESC);
+
+-- Message history of one conversation in order
+CREATE INDEX IF NOT EXISTS messages_conversation_created_idx
+    ON messages (conversation_id, created_at);
+
+-- Insert messages in order and update the conversation summary in one
+-- transaction. Locking the conversation row serializes concurrent appends,
+-- so message_count never loses an increment.
+CREATE OR REPLACE FUNCTION append_messages(
+    p_conversation_id uuid,
+    p_messages jsonb,  -- [{"role": ..., "content": ...}, ...]
+    p_preview_chars int DEFAULT 160
+)
+RETURNS SETOF messages
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    newest jsonb := p_messages -> -1;
+BEGIN
+    UPDATE conversations
+    SET message_count = message_count + jsonb_array_length(p_messages),
+        last_message = left(newest ->> 'content', p_preview_chars),
+        last_message_role = newest ->> 'role',
+        last_activity_at = clock_timestamp(),
+        updated_at = clock_timestamp()
+    WHERE id = p_conversation_id;
+
+    -- Rows of one call would share NOW(); the ordinal keeps their order stable
+    RETURN QUERY
+    INSERT INTO messages (conversation_id, role, content, created_at)
+    SELECT p_conversation_id,
+           m.value ->> 'role',
+           m.value ->> 'content',
+           clock_timestamp() + (m.ordinality * interval '1 microsecond')
+    FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m
+    RETURNING *;
+END;
+$$;
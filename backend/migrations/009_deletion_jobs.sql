@@ -0,0 +1,138 @@
+-- Background deletion (see app/services/deletion.py): deleting a conversation
+-- or purging a user enqueues a job, and workers delete its rows in small
+-- batches, each its own short transaction, recording progress as they go.
+-- A job whose worker died is picked up again once its lease expires and
+-- resumes at the step it had reached.
+
+CREATE TABLE IF NOT EXISTS deletion_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL CHECK (kind IN ('conversation', 'user')),
+    user_id UUID NOT NULL,
+    conversation_id UUID,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    step INTEGER NOT NULL DEFAULT 0,  -- Index of the dataset being deleted
+    deleted JSONB NOT NULL DEFAULT '{}'::jsonb,  -- Rows deleted per dataset
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until TIMESTAMPTZ,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+ALTER TABLE deletion_jobs ENABLE ROW LEVEL SECURITY;
+
+-- Queue scan: unfinished jobs, oldest first
+CREATE INDEX IF NOT EXISTS deletion_jobs_open_idx
+    ON deletion_jobs (created_at) WHERE status <> 'done';
+
+CREATE INDEX IF NOT EXISTS deletion_jobs_user_idx
+    ON deletion_jobs (user_id, created_at DESC);
+
+-- Hidden from the conversation list as soon as its deletion is enqueued
+ALTER TABLE conversations
+    ADD COLUMN IF NOT EXISTS deleting BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Batched deletes look up rows by these columns
+CREATE INDEX IF NOT EXISTS conversations_user_id_idx ON conversations (user_id);
+CREATE INDEX IF NOT EXISTS project_rollups_user_id_idx ON project_rollups (user_id);
+
+-- Enqueue a conversation's deletion; NULL when the conversation does not exist
+CREATE OR REPLACE FUNCTION enqueue_conversation_deletion(p_conversation_id uuid)
+RETURNS SETOF deletion_jobs
+LANGUAGE sql
+AS $$
+    WITH hidden AS (
+        UPDATE conversations SET deleting = TRUE
+        WHERE id = p_conversation_id
+        RETURNING user_id
+    )
+    INSERT INTO deletion_jobs (kind, user_id, conversation_id)
+    SELECT 'conversation', user_id, p_conversation_id FROM hidden
+    RETURNING *;
+$$;
+
+-- Take the oldest runnable job: pending, or running/failed with an expired lease
+CREATE OR REPLACE FUNCTION claim_deletion_job(
+    p_worker text, p_lease_seconds int, p_max_attempts int
+)
+RETURNS SETOF deletion_jobs
+LANGUAGE sql
+AS $$
+    UPDATE deletion_jobs
+    SET status = 'running',
+        worker = p_worker,
+        attempts = attempts + 1,
+        lease_until = NOW() + make_interval(secs => p_lease_seconds),
+        started_at = COALESCE(started_at, NOW()),
+        updated_at = NOW()
+    WHERE id = (
+        SELECT id FROM deletion_jobs
+        WHERE attempts < p_max_attempts
+          AND (status = 'pending'
+               OR (status IN ('running', 'failed') AND lease_until < NOW()))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
+
+-- Delete up to p_limit rows of one dataset; returns rows deleted (0 = dataset done)
+CREATE OR REPLACE FUNCTION purge_batch(
+    p_dataset text, p_user_id uuid, p_conversation_id uuid, p_limit int
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INTEGER := 0;
+BEGIN
+    IF p_dataset = 'messages' THEN
+        DELETE FROM messages WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM messages WHERE conversation_id = p_conversation_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'conversation' THEN
+        DELETE FROM conversations WHERE id = p_conversation_id AND user_id = p_user_id;
+    ELSIF p_dataset = 'user_messages' THEN
+        DELETE FROM messages WHERE ctid = ANY(ARRAY(
+            SELECT m.ctid FROM messages m
+            JOIN conversations c ON c.id = m.conversation_id
+            WHERE c.user_id = p_user_id
+            LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'conversations' THEN
+        DELETE FROM conversations WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM conversations WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'embeddings' THEN
+        DELETE FROM memory_embeddings WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM memory_embeddings WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'embeddings_previous' THEN
+        -- Only exists between an embedding model cutover and its finalize
+        IF to_regclass('memory_embeddings_previous') IS NOT NULL THEN
+            EXECUTE 'DELETE FROM memory_embeddings_previous WHERE ctid = ANY(ARRAY(
+                         SELECT ctid FROM memory_embeddings_previous
+                         WHERE user_id = $1 LIMIT $2))'
+            USING p_user_id, p_limit;
+        END IF;
+    ELSIF p_dataset = 'facts' THEN
+        DELETE FROM user_memories WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM user_memories WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'rollups' THEN
+        DELETE FROM project_rollups WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM project_rollups WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSE
+        RAISE EXCEPTION 'Unknown purge dataset %', p_dataset;
+    END IF;
+
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$;
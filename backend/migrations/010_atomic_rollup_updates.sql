@@ -0,0 +1,52 @@
+-- Fold a milestone into its project rollup in one statement. Reading the
+-- rollup, changing it in the app and upserting it back lost an increment
+-- (and a recent_milestones entry) whenever two milestones of the same
+-- project were stored at once; the row lock taken by ON CONFLICT DO UPDATE
+-- serializes concurrent folds instead.
+CREATE OR REPLACE FUNCTION record_project_milestone(
+    p_user_id uuid,
+    p_project_key text,
+    p_key text,
+    p_value text,
+    p_at timestamptz,
+    p_recent_limit int DEFAULT 5
+)
+RETURNS SETOF project_rollups
+LANGUAGE sql
+AS $$
+    INSERT INTO project_rollups AS r (
+        user_id, project_key, milestone_count, recent_milestones, last_milestone_at, updated_at
+    )
+    VALUES (
+        p_user_id,
+        p_project_key,
+        1,
+        jsonb_build_array(jsonb_build_object('key', p_key, 'value', p_value)),
+        p_at,
+        NOW()
+    )
+    ON CONFLICT (user_id, project_key) DO UPDATE
+    SET -- A restated milestone updates its entry instead of counting twice
+        milestone_count = r.milestone_count + CASE
+            WHEN r.recent_milestones @> jsonb_build_array(jsonb_build_object('key', p_key))
+            THEN 0 ELSE 1 END,
+        recent_milestones = (
+            SELECT coalesce(jsonb_agg(entry ORDER BY position), '[]'::jsonb)
+            FROM (
+                SELECT entry, position
+                FROM (
+                    SELECT jsonb_build_object('key', p_key, 'value', p_value) AS entry,
+                           0::bigint AS position
+                    UNION ALL
+                    SELECT e.value, e.ordinality
+                    FROM jsonb_array_elements(r.recent_milestones) WITH ORDINALITY AS e
+                    WHERE e.value ->> 'key' IS DISTINCT FROM p_key
+                ) merged
+                ORDER BY position
+                LIMIT p_recent_limit
+            ) newest
+        ),
+        last_milestone_at = EXCLUDED.last_milestone_at,
+        updated_at = NOW()
+    RETURNING *;
+$$;
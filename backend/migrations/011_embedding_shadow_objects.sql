@@ -0,0 +1,168 @@
+-- Keep index, constraint and trigger names in step with the table they belong
+-- to across re-embedding cutovers, and give shadow tables everything the live
+-- table has. Before this, a cutover renamed the tables but left the shadow's
+-- objects named memory_embeddings_shadow_*, so the next prepare failed with
+-- "relation already exists"; shadows also lacked the user_id index and the
+-- row level security policies.
+
+-- ── Helpers ──────────────────────────────────────────────────────────
+
+-- Rename the indexes, constraints and triggers of a table from one name
+-- prefix to another. Names already carrying a longer target prefix are left
+-- alone, so renaming to memory_embeddings_previous_* can be repeated.
+CREATE OR REPLACE FUNCTION rename_table_objects(p_table regclass, p_from text, p_to text)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    object_name TEXT;
+    index_oid OID;
+BEGIN
+    -- Renaming an index also renames the primary key / unique constraint it backs
+    FOR index_oid, object_name IN
+        SELECT c.oid, c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = p_table
+          AND starts_with(c.relname, p_from)
+          AND NOT (length(p_to) > length(p_from) AND starts_with(c.relname, p_to))
+    LOOP
+        EXECUTE format(
+            'ALTER INDEX %s RENAME TO %I',
+            index_oid::regclass, left(p_to || substr(object_name, length(p_from) + 1), 63)
+        );
+    END LOOP;
+
+    FOR object_name IN
+        SELECT conname
+        FROM pg_constraint
+        WHERE conrelid = p_table
+          AND contype NOT IN ('p', 'u', 'x')
+          AND starts_with(conname, p_from)
+          AND NOT (length(p_to) > length(p_from) AND starts_with(conname, p_to))
+    LOOP
+        EXECUTE format(
+            'ALTER TABLE %s RENAME CONSTRAINT %I TO %I',
+            p_table, object_name, left(p_to || substr(object_name, length(p_from) + 1), 63)
+        );
+    END LOOP;
+
+    FOR object_name IN
+        SELECT tgname
+        FROM pg_trigger
+        WHERE tgrelid = p_table
+          AND NOT tgisinternal
+          AND starts_with(tgname, p_from)
+          AND NOT (length(p_to) > length(p_from) AND starts_with(tgname, p_to))
+    LOOP
+        EXECUTE format(
+            'ALTER TRIGGER %I ON %s RENAME TO %I',
+            object_name, p_table, left(p_to || substr(object_name, length(p_from) + 1), 63)
+        );
+    END LOOP;
+END;
+$$;
+
+-- Recreate the row level security policies of one table on another
+CREATE OR REPLACE FUNCTION copy_table_policies(p_from regclass, p_to regclass)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    rule RECORD;
+BEGIN
+    FOR rule IN
+        SELECT p.*
+        FROM pg_policies p
+        WHERE format('%I.%I', p.schemaname, p.tablename)::regclass = p_from
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_policies existing
+              WHERE format('%I.%I', existing.schemaname, existing.tablename)::regclass = p_to
+                AND existing.policyname = p.policyname
+          )
+    LOOP
+        EXECUTE format(
+            'CREATE POLICY %I ON %s AS %s FOR %s TO %s%s%s',
+            rule.policyname,
+            p_to,
+            rule.permissive,
+            rule.cmd,
+            array_to_string(ARRAY(SELECT quote_ident(r) FROM unnest(rule.roles) AS r), ', '),
+            CASE WHEN rule.qual IS NOT NULL THEN format(' USING (%s)', rule.qual) ELSE '' END,
+            CASE WHEN rule.with_check IS NOT NULL
+                 THEN format(' WITH CHECK (%s)', rule.with_check) ELSE '' END
+        );
+    END LOOP;
+END;
+$$;
+
+-- ── Shadow Tables ────────────────────────────────────────────────────
+
+-- LIKE ... INCLUDING ALL brings the primary key and every index (fact_id,
+-- user_id, user/model, HNSW) along with defaults and checks; the foreign key,
+-- decode trigger and policies are added explicitly.
+CREATE OR REPLACE FUNCTION prepare_embedding_shadow(p_dimensions INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    column_type TEXT := embedding_column_type('memory_embeddings');
+BEGIN
+    DROP TABLE IF EXISTS memory_embeddings_shadow;
+    CREATE TABLE memory_embeddings_shadow (LIKE memory_embeddings INCLUDING ALL);
+    EXECUTE format(
+        'ALTER TABLE memory_embeddings_shadow ALTER COLUMN embedding TYPE %s(%s)',
+        column_type, p_dimensions
+    );
+    ALTER TABLE memory_embeddings_shadow
+        ADD CONSTRAINT memory_embeddings_shadow_fact_id_fkey
+        FOREIGN KEY (fact_id) REFERENCES user_memories(id) ON DELETE CASCADE;
+    CREATE TRIGGER memory_embeddings_shadow_decode_data
+        BEFORE INSERT OR UPDATE ON memory_embeddings_shadow
+        FOR EACH ROW EXECUTE FUNCTION decode_embedding_data();
+    ALTER TABLE memory_embeddings_shadow ENABLE ROW LEVEL SECURITY;
+    PERFORM copy_table_policies('memory_embeddings', 'memory_embeddings_shadow');
+END;
+$$;
+
+-- Same swap as in 003, with the objects of both tables renamed to match
+CREATE OR REPLACE FUNCTION cutover_embedding_shadow(p_model TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF to_regclass('memory_embeddings_shadow') IS NULL THEN
+        RAISE EXCEPTION 'No shadow table to cut over to';
+    END IF;
+
+    LOCK TABLE memory_embeddings, memory_embeddings_shadow IN ACCESS EXCLUSIVE MODE;
+    DROP TABLE IF EXISTS memory_embeddings_previous;
+    ALTER TABLE memory_embeddings RENAME TO memory_embeddings_previous;
+    PERFORM rename_table_objects(
+        'memory_embeddings_previous', 'memory_embeddings', 'memory_embeddings_previous'
+    );
+    ALTER TABLE memory_embeddings_shadow RENAME TO memory_embeddings;
+    PERFORM rename_table_objects('memory_embeddings', 'memory_embeddings_shadow', 'memory_embeddings');
+
+    UPDATE embedding_settings SET active_model = p_model, updated_at = NOW();
+END;
+$$;
+
+-- ── Repair Earlier Cutovers ──────────────────────────────────────────
+
+-- A table swapped in by the old cutover still carries memory_embeddings_shadow_*
+-- names, no user_id index and no policies (those remain on the previous table)
+DO $$
+BEGIN
+    IF to_regclass('memory_embeddings_previous') IS NOT NULL THEN
+        PERFORM rename_table_objects(
+            'memory_embeddings_previous', 'memory_embeddings', 'memory_embeddings_previous'
+        );
+        PERFORM copy_table_policies('memory_embeddings_previous', 'memory_embeddings');
+    END IF;
+    PERFORM rename_table_objects('memory_embeddings', 'memory_embeddings_shadow', 'memory_embeddings');
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS memory_embeddings_user_id_idx
+    ON memory_embeddings (user_id);
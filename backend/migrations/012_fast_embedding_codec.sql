@@ -0,0 +1,128 @@
+-- Faster SQL embedding codecs (same layouts as 004 / app/database/vector_codec.py).
+--
+-- 004 assembled every float32 word with uint_from_le_bytes, an aggregate over
+-- generate_series that the planner cannot inline, so decoding a 768-d vector
+-- ran 768 nested subqueries. Words are now assembled in one pass over the
+-- bytes, in a subquery fenced with OFFSET 0 so float32_from_bits sees a plain
+-- column and is inlined. The int8 encoder appends bytes with string_agg(bytea)
+-- instead of formatting and re-parsing hex text.
+--
+-- Measure with benchmarks/bench_sql_codec.py before and after applying this
+-- migration. Where pgvector >= 0.7 is available, compact_embedding_storage()
+-- (see 004) still halves what each decoded vector costs to store and index.
+
+-- ── Decode ───────────────────────────────────────────────────────────
+
+CREATE OR REPLACE FUNCTION decode_embedding(p_data TEXT, p_codec TEXT)
+RETURNS REAL[]
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    raw BYTEA := decode(p_data, 'base64');
+    scale DOUBLE PRECISION;
+BEGIN
+    IF p_codec = 'float32' THEN
+        RETURN ARRAY(
+            SELECT float32_from_bits(bits)
+            FROM (
+                SELECT i,
+                       get_byte(raw, 4 * i)::BIGINT
+                       | (get_byte(raw, 4 * i + 1)::BIGINT << 8)
+                       | (get_byte(raw, 4 * i + 2)::BIGINT << 16)
+                       | (get_byte(raw, 4 * i + 3)::BIGINT << 24) AS bits
+                FROM generate_series(0, length(raw) / 4 - 1) AS i
+                OFFSET 0
+            ) AS words
+            ORDER BY i
+        )::REAL[];
+    ELSIF p_codec = 'float16' THEN
+        RETURN ARRAY(
+            SELECT CASE WHEN (h >> 15) = 1 THEN -1 ELSE 1 END
+                 * CASE WHEN ((h >> 10) & 31) = 0
+                        THEN (h & 1023) * power(2::DOUBLE PRECISION, -24)
+                        ELSE (1 + (h & 1023) / 1024::DOUBLE PRECISION)
+                             * power(2::DOUBLE PRECISION, ((h >> 10) & 31) - 15)
+                   END
+            FROM (
+                SELECT i, get_byte(raw, 2 * i) | (get_byte(raw, 2 * i + 1) << 8) AS h
+                FROM generate_series(0, length(raw) / 2 - 1) AS i
+                OFFSET 0
+            ) AS halves
+            ORDER BY i
+        )::REAL[];
+    ELSIF p_codec = 'int8' THEN
+        scale := float32_from_bits(
+            get_byte(raw, 0)::BIGINT
+            | (get_byte(raw, 1)::BIGINT << 8)
+            | (get_byte(raw, 2)::BIGINT << 16)
+            | (get_byte(raw, 3)::BIGINT << 24)
+        );
+        RETURN ARRAY(
+            SELECT (CASE WHEN b > 127 THEN b - 256 ELSE b END) * scale
+            FROM (
+                SELECT i, get_byte(raw, 4 + i) AS b
+                FROM generate_series(0, length(raw) - 5) AS i
+            ) AS quantized
+            ORDER BY i
+        )::REAL[];
+    END IF;
+    RAISE EXCEPTION 'Unknown embedding codec: %', p_codec;
+END;
+$$;
+
+-- ── Encode ───────────────────────────────────────────────────────────
+
+-- The low byte of int4send (big-endian) is the value's two's complement int8 byte
+CREATE OR REPLACE FUNCTION encode_embedding_int8(p_values REAL[])
+RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    scale DOUBLE PRECISION;
+    quantized BYTEA;
+BEGIN
+    SELECT coalesce(max(abs(v)), 0) / 127 INTO scale FROM unnest(p_values) AS v;
+    -- Quantize with the float32-rounded scale the decoder will read back
+    scale := float32_from_bits(float32_to_bits(scale));
+    SELECT string_agg(
+        substring(int4send(CASE WHEN scale = 0 THEN 0 ELSE round(v / scale)::INTEGER END) FROM 4 FOR 1),
+        ''::BYTEA ORDER BY i
+    )
+    INTO quantized
+    FROM unnest(p_values) WITH ORDINALITY AS t(v, i);
+
+    RETURN replace(
+        encode(uint_to_le_bytes(float32_to_bits(scale), 4) || coalesce(quantized, ''::BYTEA), 'base64'),
+        E'\n',
+        ''
+    );
+END;
+$$;
+
+-- ── Benchmark ────────────────────────────────────────────────────────
+
+-- Server-side microseconds per decode_embedding / encode_embedding_int8 call,
+-- so the numbers leave out the round trip (see benchmarks/bench_sql_codec.py)
+CREATE OR REPLACE FUNCTION time_embedding_codec(p_data TEXT, p_codec TEXT, p_rounds INTEGER DEFAULT 200)
+RETURNS TABLE (decode_us DOUBLE PRECISION, encode_int8_us DOUBLE PRECISION)
+LANGUAGE plpgsql VOLATILE
+AS $$
+DECLARE
+    started TIMESTAMPTZ;
+    decoded REAL[];
+    encoded TEXT;
+BEGIN
+    started := clock_timestamp();
+    FOR attempt IN 1..p_rounds LOOP
+        decoded := decode_embedding(p_data, p_codec);
+    END LOOP;
+    decode_us := extract(EPOCH FROM clock_timestamp() - started) * 1e6 / p_rounds;
+
+    started := clock_timestamp();
+    FOR attempt IN 1..p_rounds LOOP
+        encoded := encode_embedding_int8(decoded);
+    END LOOP;
+    encode_int8_us := extract(EPOCH FROM clock_timestamp() - started) * 1e6 / p_rounds;
+    RETURN NEXT;
+END;
+$$;
@@ -0,0 +1,64 @@
+-- Account purges also delete the user's LLM usage rows (llm_usage, see 007),
+-- which 009 left behind. Its primary key leads with user_id, so the batched
+-- delete below is an index lookup.
+
+-- Same as in 009, plus the "usage" dataset
+CREATE OR REPLACE FUNCTION purge_batch(
+    p_dataset text, p_user_id uuid, p_conversation_id uuid, p_limit int
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INTEGER := 0;
+BEGIN
+    IF p_dataset = 'messages' THEN
+        DELETE FROM messages WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM messages WHERE conversation_id = p_conversation_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'conversation' THEN
+        DELETE FROM conversations WHERE id = p_conversation_id AND user_id = p_user_id;
+    ELSIF p_dataset = 'user_messages' THEN
+        DELETE FROM messages WHERE ctid = ANY(ARRAY(
+            SELECT m.ctid FROM messages m
+            JOIN conversations c ON c.id = m.conversation_id
+            WHERE c.user_id = p_user_id
+            LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'conversations' THEN
+        DELETE FROM conversations WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM conversations WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'embeddings' THEN
+        DELETE FROM memory_embeddings WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM memory_embeddings WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'embeddings_previous' THEN
+        -- Only exists between an embedding model cutover and its finalize
+        IF to_regclass('memory_embeddings_previous') IS NOT NULL THEN
+            EXECUTE 'DELETE FROM memory_embeddings_previous WHERE ctid = ANY(ARRAY(
+                         SELECT ctid FROM memory_embeddings_previous
+                         WHERE user_id = $1 LIMIT $2))'
+            USING p_user_id, p_limit;
+        END IF;
+    ELSIF p_dataset = 'facts' THEN
+        DELETE FROM user_memories WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM user_memories WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'rollups' THEN
+        DELETE FROM project_rollups WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM project_rollups WHERE user_id = p_user_id LIMIT p_limit
+        ));
+    ELSIF p_dataset = 'usage' THEN
+        -- llm_usage keys users by text ('anonymous' for calls outside a request)
+        DELETE FROM llm_usage WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM llm_usage WHERE user_id = p_user_id::text LIMIT p_limit
+        ));
+    ELSE
+        RAISE EXCEPTION 'Unknown purge dataset %', p_dataset;
+    END IF;
+
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$;
@@ -0,0 +1,23 @@
+-- Prune a user's orphaned vectors in one statement. The consolidation job used
+-- to list the user's facts, then delete every vector whose fact was missing
+-- from that list, so a fact stored in between lost its fresh vector. Checking
+-- user_memories inside the DELETE sees every fact committed by then.
+
+CREATE OR REPLACE FUNCTION delete_orphaned_embeddings(p_user_id uuid)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INTEGER;
+BEGIN
+    -- fact_id IS NULL: legacy rows written before embeddings were linked (001)
+    DELETE FROM memory_embeddings e
+    WHERE e.user_id = p_user_id
+      AND (
+          e.fact_id IS NULL
+          OR NOT EXISTS (SELECT 1 FROM user_memories m WHERE m.id = e.fact_id)
+      );
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$;
@@ -0,0 +1,100 @@
+-- Count each milestone once per project. 010 only recognised a restated
+-- milestone while it was still among the rollup's recent_milestones, so
+-- restating an older one incremented milestone_count again. Every milestone
+-- key a rollup has counted is now recorded, and only new keys add to the count.
+
+CREATE TABLE IF NOT EXISTS project_rollup_milestones (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    project_key TEXT NOT NULL,
+    milestone_key TEXT NOT NULL,
+    UNIQUE (user_id, project_key, milestone_key)
+);
+
+ALTER TABLE project_rollup_milestones ENABLE ROW LEVEL SECURITY;
+
+-- Backfill from the stored milestones the rollups were built from (see 002)
+INSERT INTO project_rollup_milestones (user_id, project_key, milestone_key)
+SELECT DISTINCT user_id, split_part(key, '_milestone_', 1), key
+FROM user_memories
+WHERE category = 'project_milestone'
+ON CONFLICT (user_id, project_key, milestone_key) DO NOTHING;
+
+-- A deleted milestone no longer counts (refresh_project recomputes the
+-- rollup itself), so stating it again later adds it back
+CREATE OR REPLACE FUNCTION forget_rollup_milestone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF OLD.category = 'project_milestone' THEN
+        DELETE FROM project_rollup_milestones
+        WHERE user_id = OLD.user_id
+          AND project_key = split_part(OLD.key, '_milestone_', 1)
+          AND milestone_key = OLD.key;
+    END IF;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS user_memories_forget_rollup_milestone ON user_memories;
+CREATE TRIGGER user_memories_forget_rollup_milestone
+    AFTER DELETE ON user_memories
+    FOR EACH ROW EXECUTE FUNCTION forget_rollup_milestone();
+
+-- Same fold as in 010; the count grows only when the key was not counted yet.
+-- A concurrent fold of the same key waits on the unique index, then inserts nothing.
+CREATE OR REPLACE FUNCTION record_project_milestone(
+    p_user_id uuid,
+    p_project_key text,
+    p_key text,
+    p_value text,
+    p_at timestamptz,
+    p_recent_limit int DEFAULT 5
+)
+RETURNS SETOF project_rollups
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    added INTEGER;
+BEGIN
+    INSERT INTO project_rollup_milestones (user_id, project_key, milestone_key)
+    VALUES (p_user_id, p_project_key, p_key)
+    ON CONFLICT (user_id, project_key, milestone_key) DO NOTHING;
+    GET DIAGNOSTICS added = ROW_COUNT;
+
+    RETURN QUERY
+    INSERT INTO project_rollups AS r (
+        user_id, project_key, milestone_count, recent_milestones, last_milestone_at, updated_at
+    )
+    VALUES (
+        p_user_id,
+        p_project_key,
+        1,
+        jsonb_build_array(jsonb_build_object('key', p_key, 'value', p_value)),
+        p_at,
+        NOW()
+    )
+    ON CONFLICT (user_id, project_key) DO UPDATE
+    SET milestone_count = r.milestone_count + added,
+        recent_milestones = (
+            SELECT coalesce(jsonb_agg(entry ORDER BY position), '[]'::jsonb)
+            FROM (
+                SELECT entry, position
+                FROM (
+                    SELECT jsonb_build_object('key', p_key, 'value', p_value) AS entry,
+                           0::bigint AS position
+                    UNION ALL
+                    SELECT e.value, e.ordinality
+                    FROM jsonb_array_elements(r.recent_milestones) WITH ORDINALITY AS e
+                    WHERE e.value ->> 'key' IS DISTINCT FROM p_key
+                ) merged
+                ORDER BY position
+                LIMIT p_recent_limit
+            ) newest
+        ),
+        last_milestone_at = EXCLUDED.last_milestone_at,
+        updated_at = NOW()
+    RETURNING r.*;
+END;
+$$;
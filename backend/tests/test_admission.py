@@ -0,0 +1,25 @@
+import asyncio
+
+from app.core.admission import AdmissionController, Priority
+
+
+def test_batch_work_waits_out_rejections():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, queue_size=1, queue_timeout=0.05)
+        order = []
+
+        async def batch():
+            async with controller.admit_batch():
+                order.append("batch")
+
+        async with controller.admit(priority=Priority.INTERACTIVE):
+            task = asyncio.create_task(batch())
+            await asyncio.sleep(0.2)  # Longer than the queue timeout
+            order.append("interactive")
+        await asyncio.wait_for(task, timeout=5)
+
+        assert order == ["interactive", "batch"]
+        assert controller.counters["timeouts"] >= 1
+        assert controller.active == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+from app.memory.consolidation import MemoryConsolidator
+from app.schemas.memory import MemoryFact, MemoryType
+
+
+def fact(fact_id: str, key: str, value: str, category=MemoryType.PERSONAL, importance=0.5):
+    return MemoryFact(
+        id=fact_id,
+        user_id="user-1",
+        category=category,
+        importance=importance,
+        key=key,
+        value=value,
+        updated_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def duplicates(facts, vectors=None, threshold=0.92):
+    consolidator = MemoryConsolidator.__new__(MemoryConsolidator)
+    consolidator.similarity_threshold = threshold
+    return {
+        survivor.id: sorted(d.id for d in dupes)
+        for survivor, dupes in consolidator._find_duplicates(facts, vectors or {})
+    }
+
+
+def test_equal_values_under_different_keys_are_kept():
+    facts = [fact("a", "job", "engineer"), fact("b", "dream_job", "Engineer")]
+    assert duplicates(facts) == {}
+
+
+def test_close_vectors_under_different_keys_are_kept():
+    facts = [fact("a", "home_city", "Lisbon"), fact("b", "birth_city", "Lisbon, Portugal")]
+    assert duplicates(facts, {"a": [1.0, 0.0], "b": [0.99, 0.01]}) == {}
+
+
+def test_same_value_under_a_respelled_key_is_merged():
+    facts = [
+        fact("a", "favorite_food", "sushi", importance=0.9),
+        fact("b", "favourite_food", "Sushi"),
+    ]
+    assert duplicates(facts) == {"a": ["b"]}
+
+
+def test_close_vectors_under_the_same_key_are_merged():
+    facts = [fact("a", "job", "software engineer", importance=0.9), fact("b", "job", "engineer")]
+    assert duplicates(facts, {"a": [1.0, 0.0], "b": [0.99, 0.01]}) == {"a": ["b"]}
+
+
+def test_milestones_compare_the_key_after_the_project():
+    milestone = MemoryType.PROJECT_MILESTONE
+    facts = [
+        fact("a", "apollo_milestone_v1_launch", "shipped", milestone, importance=0.9),
+        fact("b", "apollo_milestone_launch_v1", "Shipped", milestone),
+        fact("c", "apollo_milestone_beta", "shipped", milestone),
+    ]
+    assert duplicates(facts) == {"a": ["b"]}
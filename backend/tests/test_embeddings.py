@@ -0,0 +1,34 @@
+import threading
+import time
+
+import pytest
+
+from app.ai.embeddings import EmbeddingBackend, LocalEmbeddingBackend
+
+
+def test_backend_must_implement_embed():
+    class Incomplete(EmbeddingBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_concurrent_first_calls_open_the_model_once():
+    backend = LocalEmbeddingBackend(workers=1)
+    opened = []
+
+    def open_model(model):
+        opened.append(model)
+        time.sleep(0.05)  # Download and session start-up
+        return ("session", "tokenizer")
+
+    backend._open = open_model
+    threads = [threading.Thread(target=backend._load, args=("bge",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert opened == ["bge"]
+    assert backend._load("bge") == ("session", "tokenizer")
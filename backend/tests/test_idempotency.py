@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.core.idempotency import IdempotencyConflict, IdempotencyStore
+
+
+async def _concurrent(key: str, first_fingerprint: str, second_fingerprint: str):
+    store = IdempotencyStore()
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = []
+
+    async def answer(name: str):
+        calls.append(name)
+        started.set()
+        await release.wait()
+        return {"answer": name}
+
+    first = asyncio.create_task(
+        store.run("user-1", key, first_fingerprint, lambda: answer("first"))
+    )
+    await started.wait()
+    second = asyncio.create_task(
+        store.run("user-1", key, second_fingerprint, lambda: answer("second"))
+    )
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(first, second, return_exceptions=True)
+    return results, calls
+
+
+def test_concurrent_duplicate_shares_the_first_result():
+    results, calls = asyncio.run(_concurrent("same-body", "fp-a", "fp-a"))
+    assert results == [{"answer": "first"}, {"answer": "first"}]
+    assert calls == ["first"]
+
+
+def test_concurrent_call_with_another_body_is_rejected():
+    (first, second), calls = asyncio.run(_concurrent("other-body", "fp-a", "fp-b"))
+    assert first == {"answer": "first"}
+    assert isinstance(second, IdempotencyConflict)
+    assert second.status_code == 422
+    assert calls == ["first"]
+
+
+def test_completed_key_with_another_body_is_rejected():
+    async def scenario():
+        store = IdempotencyStore()
+
+        async def answer():
+            return {"answer": 1}
+
+        await store.run("user-1", "completed", "fp-a", answer)
+        with pytest.raises(IdempotencyConflict) as error:
+            await store.run("user-1", "completed", "fp-b", answer)
+        assert error.value.status_code == 422
+
+    asyncio.run(scenario())
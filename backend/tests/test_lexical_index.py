@@ -0,0 +1,52 @@
+from app.memory.lexical_index import LexicalIndex
+from app.schemas.memory import MemoryFact, MemoryType
+
+
+def fact(key: str, value: str) -> MemoryFact:
+    return MemoryFact(
+        user_id="user-1", category=MemoryType.PERSONAL, importance=0.5, key=key, value=value
+    )
+
+
+INDEX = LexicalIndex(
+    [
+        fact("job", "software engineer at Acme"),
+        fact("skill_python", "eight years, mostly data pipelines"),
+        fact("skill_rust", "learning it on weekends"),
+        fact("home_city", "Lisbon"),
+    ]
+)
+
+
+# ── Exact key shortcut ───────────────────────────────────────────────
+
+
+def test_query_only_about_a_key_is_answered_lexically():
+    assert INDEX.covering_match("what is my job?").key == "job"
+
+
+def test_multi_part_key_is_answered_lexically():
+    assert INDEX.covering_match("what is my skill_python?").key == "skill_python"
+
+
+def test_single_word_key_inside_a_larger_query_falls_back_to_fusion():
+    assert INDEX.covering_match("find a job near me") is None
+
+
+def test_two_named_keys_fall_back_to_fusion():
+    assert INDEX.covering_match("skill_python or skill_rust") is None
+
+
+def test_close_runner_up_falls_back_to_fusion():
+    index = LexicalIndex(
+        [
+            fact("skill_python", "expert"),
+            fact("python_notes", "skill_python cheatsheet"),
+            fact("job", "software engineer"),
+        ]
+    )
+    assert index.covering_match("skill_python") is None
+
+
+def test_no_key_in_query():
+    assert INDEX.covering_match("where do I live") is None
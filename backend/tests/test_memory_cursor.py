@@ -0,0 +1,37 @@
+import base64
+import json
+
+import pytest
+
+from app.database.repositories.memory import _decode_cursor, _encode_cursor
+
+
+def cursor_of(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def test_round_trip():
+    cursor = _encode_cursor("updated_at", "2026-01-01T00:00:00+00:00", "fact-1")
+    assert _decode_cursor(cursor, "updated_at") == ("2026-01-01T00:00:00+00:00", "fact-1")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        cursor_of({}),
+        cursor_of(1),
+        cursor_of("abc"),
+        cursor_of(["key", "a"]),
+        cursor_of(["key", "a", 2]),
+        cursor_of(["key", {"a": 1}, "fact-1"]),
+    ],
+)
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match="Malformed cursor"):
+        _decode_cursor(cursor, "key")
+
+
+def test_cursor_of_another_sort_is_rejected():
+    with pytest.raises(ValueError, match="different sort"):
+        _decode_cursor(_encode_cursor("key", "a", "fact-1"), "updated_at")
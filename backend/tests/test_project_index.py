@@ -0,0 +1,78 @@
+from app.memory.project_index import ProjectIndex, get_project_index
+
+PROJECTS = ["project_neuradesk", "project_alpha_tool", "project_beta", "project_ai"]
+
+
+def resolve(key: str, value: str = "", projects=PROJECTS):
+    return ProjectIndex(projects).resolve(key, value)
+
+
+# ── Individual rules ─────────────────────────────────────────────────
+
+
+def test_direct_key_match():
+    assert resolve("project_beta") == "project_beta"
+    assert resolve("Project_Beta") == "project_beta"
+
+
+def test_new_key_contains_base_key():
+    assert resolve("project_neuradesk_v2_launch") == "project_neuradesk"
+
+
+def test_project_phrase_in_value_or_key():
+    assert resolve("launch_update", "Shipped project alpha tool today") == "project_alpha_tool"
+    assert resolve("notes_project_alpha_tool_draft", "") == "project_alpha_tool"
+
+
+def test_project_name_is_a_key_part():
+    assert resolve("beta_release", "went out this morning") == "project_beta"
+
+
+def test_substring_match_needs_four_characters():
+    assert resolve("status", "the neuradesk backend is done") == "project_neuradesk"
+    # "ai" is too short to be matched inside free text
+    assert resolve("status", "I said hi to the maintainers") is None
+
+
+def test_no_match():
+    assert resolve("favourite_food", "pizza") is None
+    assert ProjectIndex([]).resolve("project_beta", "") is None
+
+
+def test_milestone_keys_are_reduced_to_their_project():
+    assert ProjectIndex.base_key("project_Beta_milestone_2026-01-01_abc") == "project_beta"
+    assert ProjectIndex.base_key("project_beta") == "project_beta"
+
+
+# ── Priority ─────────────────────────────────────────────────────────
+
+
+def test_earlier_rule_wins_over_later_rule_across_projects():
+    # Key part (rule 4) points at beta, the phrase (rule 3) at alpha tool
+    projects = ["project_beta", "project_alpha_tool"]
+    assert resolve("beta_notes", "about project alpha tool", projects) == "project_alpha_tool"
+
+
+def test_key_containment_wins_over_phrase_in_value():
+    assert resolve("project_beta_update", "moved from project alpha tool") == "project_beta"
+
+
+def test_key_part_wins_over_substring_in_value():
+    assert resolve("beta_notes", "the neuradesk team reviewed it") == "project_beta"
+
+
+def test_longest_key_wins_within_a_rule():
+    projects = ["project_alpha", "project_alpha_tool"]
+    assert resolve("project_alpha_tool_release", "", projects) == "project_alpha_tool"
+    assert resolve("project_alpha_tool_release", "", projects[::-1]) == "project_alpha_tool"
+
+
+# ── Cache ────────────────────────────────────────────────────────────
+
+
+def test_cached_index_is_rebuilt_when_projects_change():
+    first = get_project_index("user-1", ["project_beta"])
+    assert get_project_index("user-1", ["project_beta"]) is first
+    second = get_project_index("user-1", ["project_beta", "project_gamma"])
+    assert second is not first
+    assert second.resolve("gamma_launch", "") == "project_gamma"
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from app.ai.resilience import CircuitBreaker, ModelUnavailableError, ResilientInvoker
+
+
+def open_breaker(invoker: ResilientInvoker, model: str) -> CircuitBreaker:
+    breaker = invoker._breaker(model)
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = 0.0
+    return breaker
+
+
+# ── Deadlines ────────────────────────────────────────────────────────
+
+
+def test_timeout_falls_back_to_next_model():
+    release = threading.Event()
+    invoker = ResilientInvoker("test", deadline=0.05)
+
+    def call(model):
+        if model == "slow":
+            release.wait(5)
+        return model
+
+    try:
+        assert invoker.invoke(call, ["slow", "fast"]) == "fast"
+    finally:
+        release.set()
+
+
+def test_stateful_timeout_does_not_start_a_second_run():
+    release = threading.Event()
+    invoker = ResilientInvoker("test", deadline=0.05, fallback_after_timeout=False)
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        release.wait(5)
+        return model
+
+    try:
+        with pytest.raises(ModelUnavailableError):
+            invoker.invoke(call, ["slow", "fast"])
+    finally:
+        release.set()
+    assert calls == ["slow"]
+
+
+def test_stateful_error_still_falls_back():
+    invoker = ResilientInvoker("test", fallback_after_timeout=False)
+
+    def call(model):
+        if model == "broken":
+            raise RuntimeError("boom")
+        return model
+
+    assert invoker.invoke(call, ["broken", "fast"]) == "fast"
+
+
+# ── Streaming ────────────────────────────────────────────────────────
+
+
+def test_closed_stream_releases_half_open_probe():
+    invoker = ResilientInvoker("test", reset_timeout=0.0)
+    breaker = open_breaker(invoker, "model")
+
+    stream = invoker.stream(lambda model: iter(["a", "b", "c"]), ["model"])
+    assert next(stream) == "a"
+    stream.close()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_finished_stream_closes_circuit():
+    invoker = ResilientInvoker("test", reset_timeout=0.0)
+    breaker = open_breaker(invoker, "model")
+
+    assert list(invoker.stream(lambda model: iter(["a", "b"]), ["model"])) == ["a", "b"]
+    assert breaker.state == CircuitBreaker.CLOSED
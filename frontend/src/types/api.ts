@@ -20,6 +20,10 @@ export interface Conversation {
   is_archived: boolean;
   created_at: string;
   updated_at: string;
+  last_message?: string | null;
+  last_message_role?: string | null;
+  message_count?: number;
+  last_activity_at?: string | null;
 }
 
 export interface Message {